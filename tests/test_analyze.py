@@ -0,0 +1,102 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from trafaret_schema import Register, json_schema
+from trafaret_schema.analyze import analyze, analyze_schema, main, problems, regex_warnings
+
+
+class TestAnalyze(unittest.TestCase):
+    def test_regex_warnings(self):
+        for pattern, warns in (
+            ('^[a-z]+$', False),
+            ('^(a|b)$', False),
+            ('^(a+)+$', True),
+            ('^(\\w*)*x', True),
+            ('^(a|ab)*c', True),
+            ('^(ab){2}$', False),
+        ):
+            with self.subTest(pattern=pattern):
+                self.assertEqual(bool(regex_warnings(pattern)), warns)
+
+    def test_fanout_and_keywords(self):
+        report = analyze_schema(json_schema({
+            'type': 'object',
+            'properties': {
+                'a': {'anyOf': [{'type': 'integer'}, {'type': 'string'}, {'type': 'null'}]},
+                'b': {'type': 'string', 'minLength': 1, 'maxLength': 5, 'pattern': '^x'},
+            },
+        }))
+        self.assertEqual(report['max_fanout'], 3)
+        self.assertEqual(report['max_keywords'], 4)
+        self.assertEqual(report['cycles'], [])
+        self.assertEqual(report['regex_warnings'], [])
+
+    def test_cost_grows_with_branches(self):
+        small = analyze_schema(json_schema({'anyOf': [{'type': 'integer'}, {'type': 'string'}]}))
+        big = analyze_schema(json_schema({'anyOf': [{'type': 'integer', 'minimum': n} for n in range(20)]}))
+        self.assertGreater(big['cost'], small['cost'])
+
+    def test_backtracking_pattern_properties(self):
+        report = analyze_schema(json_schema({'patternProperties': {'^(a+)+$': {'type': 'string'}}}))
+        self.assertEqual(report['regex_warnings'], ['nested quantifier in `^(a+)+$`'])
+        self.assertTrue(problems(report, strict=True))
+
+    def test_recursion_cycle(self):
+        register = Register()
+        json_schema({
+            '$id': 'http://example.com/tree',
+            'type': 'object',
+            'properties': {'children': {'type': 'array', 'items': {'$ref': '#'}}},
+        }, context=register)
+        report = analyze(register)['http://example.com/tree']
+        self.assertEqual(report['cycles'], [['#', '#']])
+        self.assertEqual(problems(report), [])
+        self.assertEqual(problems(report, strict=True), ['recursive reference # -> #'])
+
+    def test_same_local_reference_in_two_schemas_is_not_cycle(self):
+        register = Register()
+        for name, other in (('a', {'$ref': 'http://example.com/b#'}), ('b', {'type': 'string'})):
+            json_schema({
+                '$id': 'http://example.com/%s' % name,
+                'properties': {'x': {'$ref': '#/definitions/n'}},
+                'definitions': {'n': other},
+            }, context=register)
+        report = analyze(register)['http://example.com/a']
+        self.assertEqual(report['cycles'], [])
+        self.assertEqual(problems(report, strict=True), [])
+
+
+class TestCommandLine(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, document):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as f:
+            json.dump(document, f)
+        return path
+
+    def main(self, args):
+        out = io.StringIO()
+        with redirect_stdout(out):
+            code = main(args)
+        return code, out.getvalue()
+
+    def test_cli(self):
+        cheap = self.write('cheap.json', {'type': 'string'})
+        costly = self.write('costly.json', {'anyOf': [{'type': 'integer', 'minimum': n} for n in range(50)]})
+        self.assertEqual(self.main([cheap, '--max-cost', '100'])[0], 0)
+        code, out = self.main([cheap, costly, '--max-cost', '100'])
+        self.assertEqual(code, 1)
+        self.assertIn('FAIL: cost', out)
+        code, out = self.main([cheap, '--json'])
+        self.assertEqual(code, 0)
+        self.assertEqual(json.loads(out)[cheap]['problems'], [])
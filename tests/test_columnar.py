@@ -0,0 +1,93 @@
+import unittest
+
+import trafaret as t
+import trafaret_schema
+from trafaret_schema.columnar import MISSING
+
+
+RECORD = {
+    'type': 'object',
+    'properties': {
+        'id': {'type': 'integer', 'minimum': 1},
+        'name': {'type': 'string', 'maxLength': 5, 'pattern': '^[a-z]+$'},
+        'state': {'enum': ['new', 'done']},
+        'price': {'type': ['number', 'null'], 'exclusiveMaximum': 100},
+    },
+    'required': ['id', 'name'],
+}
+
+
+COLUMNS = {
+    'id': [1, 2, 0, 4, 5],
+    'name': ['abc', 'toolong', 'x', MISSING, 'Abc'],
+    'state': ['new', 'done', 'lost', 'new', MISSING],
+    'price': [1.5, 5, 10, 100, 99],
+}
+
+
+def rows(columns):
+    count = len(next(iter(columns.values())))
+    return [
+        dict((name, column[row]) for name, column in columns.items() if column[row] is not MISSING)
+        for row in range(count)
+    ]
+
+
+class TestColumnar(unittest.TestCase):
+    def setUp(self):
+        self.register = trafaret_schema.Register(strict_numbers=True)
+        self.schema = trafaret_schema.json_schema(RECORD, context=self.register)
+
+    def test_mask_matches_record_validation(self):
+        mask, errors = self.schema.validate_columns(COLUMNS)
+        expected = []
+        for record in rows(COLUMNS):
+            try:
+                self.schema.validate(record)
+            except t.DataError:
+                expected.append(False)
+            else:
+                expected.append(True)
+        self.assertEqual(mask, expected)
+        self.assertEqual(mask, [True, False, False, False, False])
+
+    def test_errors_table(self):
+        mask, errors = self.schema.validate_columns(COLUMNS)
+        self.assertEqual(errors, [
+            (1, 'name', 'String is longer than 5 characters'),
+            (2, 'id', 'value is less than 1.0'),
+            (2, 'state', "value is not one of ('new', 'done')"),
+            (3, 'name', 'name is required'),
+            (3, 'price', 'value should be less than 100.0'),
+            (4, 'name', 'does not match pattern ^[a-z]+$'),
+        ])
+
+    def test_missing_column_is_required(self):
+        mask, errors = self.schema.validate_columns({'id': [1, 2]})
+        self.assertEqual(mask, [False, False])
+        self.assertEqual([error[1] for error in errors], ['name', 'name'])
+
+    def test_closed_object_and_dependencies(self):
+        schema = trafaret_schema.json_schema({
+            'type': 'object',
+            'properties': {'a': {'type': 'integer'}, 'b': {'type': 'integer'}},
+            'dependencies': {'a': ['b']},
+            'additionalProperties': False,
+        })
+        mask, errors = schema.validate_columns({'a': [1, 1], 'b': [MISSING, 2], 'c': [MISSING, 3]})
+        self.assertEqual(mask, [False, False])
+        self.assertEqual(errors, [(0, 'b', 'b is required'), (1, 'c', 'value is not allowed')])
+
+    def test_different_lengths(self):
+        with self.assertRaises(ValueError):
+            self.schema.validate_columns({'id': [1], 'name': []})
+
+    def test_numpy_columns(self):
+        numpy = __import__('pytest').importorskip('numpy')
+        mask, errors = self.schema.validate_columns({
+            'id': numpy.array([1, 0, 3]),
+            'name': numpy.array(['a', 'b', 'c'], dtype=object),
+            'price': numpy.array([1.0, 2.0, 200.0]),
+        })
+        self.assertEqual(mask, [True, False, False])
+        self.assertEqual([error[:2] for error in errors], [(1, 'id'), (2, 'price')])
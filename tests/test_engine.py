@@ -0,0 +1,221 @@
+import sys
+import unittest
+
+import trafaret as t
+import trafaret_schema
+
+
+TREE = {
+    'type': 'object',
+    'properties': {
+        'value': {'type': 'integer'},
+        'children': {
+            'type': 'array',
+            'items': {'$ref': '#'},
+        },
+    },
+    'required': ['value'],
+}
+
+
+def make_tree(depth, leaf=None):
+    node = leaf if leaf is not None else {'value': 0, 'children': []}
+    for level in range(depth):
+        node = {'value': level, 'children': [node]}
+    return node
+
+
+class TestEngine(unittest.TestCase):
+    def setUp(self):
+        self.schema = trafaret_schema.json_schema(TREE)
+
+    def test_deeper_than_recursion_limit(self):
+        data = make_tree(sys.getrecursionlimit() * 2)
+        self.assertIs(self.schema(data), data)
+
+    def test_deep_error(self):
+        data = make_tree(sys.getrecursionlimit() * 2, leaf={'children': []})
+        with self.assertRaises(t.DataError):
+            self.schema(data)
+
+    def test_max_depth(self):
+        data = make_tree(10)
+        self.assertIs(self.schema.validate(data, max_depth=30), data)
+        with self.assertRaises(t.DataError) as ctx:
+            self.schema.validate(data, max_depth=5)
+        self.assertIn('Maximum nesting depth', str(ctx.exception))
+
+    def test_validate(self):
+        check = trafaret_schema.json_schema({'type': 'array', 'items': {'type': 'string'}})
+        self.assertEqual(trafaret_schema.validate(check, ['a']), ['a'])
+        with self.assertRaises(t.DataError):
+            trafaret_schema.validate(check, ['a', ['b']], max_depth=1)
+
+
+class TestBudget(unittest.TestCase):
+    def setUp(self):
+        self.schema = trafaret_schema.json_schema(TREE)
+
+    def test_max_nodes(self):
+        self.schema.validate(make_tree(10), budget=trafaret_schema.Budget(max_nodes=1000))
+        with self.assertRaises(trafaret_schema.BudgetExceeded) as ctx:
+            self.schema.validate(make_tree(100), budget=trafaret_schema.Budget(max_nodes=1000))
+        self.assertEqual(ctx.exception.limit, 'max_nodes')
+        self.assertIsInstance(ctx.exception, t.DataError)
+
+    def test_max_depth(self):
+        self.schema.validate(make_tree(5), budget=trafaret_schema.Budget(max_depth=20))
+        with self.assertRaises(trafaret_schema.BudgetExceeded):
+            self.schema.validate(make_tree(20), budget=trafaret_schema.Budget(max_depth=20))
+
+    def test_max_string(self):
+        check = trafaret_schema.json_schema({
+            'type': 'object',
+            'properties': {'name': {'type': 'string', 'pattern': '^(a+)+$'}, 'mail': {'format': 'email'}},
+            'patternProperties': {'^x-': {'type': 'string'}},
+        })
+        budget = trafaret_schema.Budget(max_string=20)
+        check.validate({'name': 'aaa', 'mail': 'a@example.com', 'x-a': 'b'}, budget=budget)
+        for data in ({'name': 'a' * 30 + 'b'}, {'mail': 'a' * 30}, {'y' * 30: 1}):
+            with self.assertRaises(trafaret_schema.BudgetExceeded):
+                check.validate(data, budget=budget)
+        # long strings without regexes are fine
+        with self.assertRaises(t.DataError):
+            check.validate({'name': 1, 'x-' + 'a' * 10: 'b' * 30}, budget=budget)
+
+    def test_max_seconds(self):
+        budget = trafaret_schema.Budget(max_seconds=0)
+        self.schema.validate(make_tree(10), budget=budget)  # clock is not read yet
+        with self.assertRaises(trafaret_schema.BudgetExceeded) as ctx:
+            self.schema.validate(make_tree(100), budget=budget)
+        self.assertEqual(ctx.exception.limit, 'max_seconds')
+
+    def test_errors_are_not_collected(self):
+        tree = make_tree(100, leaf={'value': 'a'})
+        with self.assertRaises(trafaret_schema.BudgetExceeded):
+            self.schema.validate(tree, budget=trafaret_schema.Budget(max_nodes=50))
+
+
+class TestValidateOnly(unittest.TestCase):
+    def test_returns_same_object(self):
+        check = trafaret_schema.json_schema({
+            'type': 'object',
+            'properties': {
+                'when': {'type': 'string', 'format': 'date-time'},
+                'tags': {'type': 'array', 'items': {'type': 'string', 'format': 'time'}},
+                'pair': {'items': [{'type': 'integer'}, {'type': 'string'}]},
+            },
+            'propertyNames': {'type': 'string'},
+        })
+        data = {'when': '2012-01-01T10:00:00', 'tags': ['11:59'], 'pair': [1, 'a']}
+        self.assertIs(check.validate(data, validate_only=True), data)
+        self.assertIs(trafaret_schema.validate(check, data, validate_only=True), data)
+        with self.assertRaises(t.DataError):
+            check.validate({'when': 'not a date'}, validate_only=True)
+
+    def test_format_is_not_applied(self):
+        check = trafaret_schema.json_schema({'type': 'string', 'format': 'time'})
+        self.assertEqual(check.validate('11:59', validate_only=True), '11:59')
+        self.assertNotEqual(check.validate('11:59'), '11:59')
+
+
+class TestFillDefaults(unittest.TestCase):
+    def setUp(self):
+        self.check = trafaret_schema.json_schema({
+            'type': 'object',
+            'properties': {
+                'name': {'type': 'string'},
+                'retries': {'type': 'integer', 'default': 3},
+                'proxy': {'type': ['string', 'null'], 'default': None},
+                'tags': {'type': 'array', 'items': {'type': 'string'}, 'default': ['a']},
+                'server': {
+                    'type': 'object',
+                    'properties': {'port': {'type': 'integer', 'default': 80}},
+                    'default': {},
+                },
+                'broken': {'type': 'integer', 'default': 'x'},
+            },
+        })
+
+    def test_fills_missing_properties(self):
+        data = {'name': 'app', 'broken': 1}
+        result = self.check.validate(data, fill_defaults=True, validate_only=True)
+        self.assertIs(result, data)
+        self.assertEqual(data, {
+            'name': 'app',
+            'broken': 1,
+            'retries': 3,
+            'proxy': None,
+            'tags': ['a'],
+            'server': {'port': 80},
+        })
+
+    def test_mutable_defaults_are_copied(self):
+        first = {'broken': 1}
+        second = {'broken': 1}
+        self.check.validate(first, fill_defaults=True)
+        self.check.validate(second, fill_defaults=True)
+        first['tags'].append('b')
+        self.assertEqual(second['tags'], ['a'])
+        self.assertIsNot(first['server'], second['server'])
+
+    def test_filled_values_are_validated(self):
+        with self.assertRaises(t.DataError) as ctx:
+            self.check.validate({}, fill_defaults=True)
+        self.assertIn('broken', ctx.exception.as_dict())
+
+    def test_failed_branches_do_not_fill(self):
+        check = trafaret_schema.json_schema({
+            'anyOf': [
+                {'type': 'object', 'properties': {'x': {'default': 1}, 'j': {'type': 'integer'}}},
+                {'type': 'object', 'required': ['j']},
+            ],
+        })
+        data = {'j': 'b'}
+        check.validate(data, fill_defaults=True)
+        self.assertEqual(data, {'j': 'b'})
+
+    def test_not_does_not_fill(self):
+        check = trafaret_schema.json_schema({
+            'not': {'type': 'object', 'properties': {'x': {'default': 1}}, 'required': ['y']},
+        })
+        data = {}
+        check.validate(data, fill_defaults=True)
+        self.assertEqual(data, {})
+
+    def test_invalid_object_is_not_filled(self):
+        data = {'name': 1}
+        with self.assertRaises(t.DataError):
+            self.check.validate(data, fill_defaults=True)
+        self.assertEqual(data, {'name': 1})
+
+    def test_contains_does_not_fill_failed_items(self):
+        check = trafaret_schema.json_schema({
+            'type': 'array',
+            'contains': {'type': 'object', 'properties': {'a': {'default': 1}}, 'required': ['b']},
+        })
+        data = [{}, {'b': 2}]
+        check.validate(data, fill_defaults=True)
+        self.assertEqual(data, [{}, {'b': 2, 'a': 1}])
+
+    def test_failed_sibling_keyword_takes_defaults_back(self):
+        check = trafaret_schema.json_schema({
+            'properties': {
+                'x': {'type': 'object', 'properties': {'a': {'default': 1}}, 'required': ['b']},
+            },
+        })
+        data = {'x': {}}
+        with self.assertRaises(t.DataError):
+            check.validate(data, fill_defaults=True)
+        self.assertEqual(data, {'x': {}})
+
+    def test_failed_document_is_not_filled(self):
+        data = {'server': {}, 'name': 1}
+        with self.assertRaises(t.DataError):
+            self.check.validate(data, fill_defaults=True)
+        self.assertEqual(data, {'server': {}, 'name': 1})
+
+    def test_off_by_default(self):
+        data = {'name': 'app'}
+        self.check.validate(data)
+        self.assertEqual(data, {'name': 'app'})
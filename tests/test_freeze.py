@@ -0,0 +1,108 @@
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+import trafaret as t
+import trafaret_schema
+
+
+# builds a register, validates with it in a forked worker before and after `freeze` and prints
+# growth of private and shared memory of the worker in kB
+MEASURE = '''
+import gc
+import json
+import os
+import trafaret_schema
+
+
+def rollup():
+    fields = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return fields
+
+
+def worker():
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        before = rollup()
+        for _ in range(3):
+            for schema, document in zip(schemas, documents):
+                schema.validate(document)
+        gc.collect()
+        after = rollup()
+        os.write(write, json.dumps({
+            'private': after['Private_Dirty'] - before['Private_Dirty'],
+            'shared': after['Shared_Clean'] + after['Shared_Dirty'],
+        }).encode())
+        os._exit(0)
+    os.waitpid(pid, 0)
+    return json.loads(os.read(read, 4096))
+
+
+register = trafaret_schema.Register()
+for n in range(300):
+    register.compile({
+        '$id': 'http://example.com/s%d' % n,
+        'type': 'object',
+        'properties': dict(('p%d' % i, {'type': 'string', 'maxLength': n + i + 1}) for i in range(30)),
+        'required': ['p0'],
+    })
+schemas = [register.get_schema('http://example.com/s%d#' % n) for n in range(300)]
+documents = [{'p0': 'x'}] * 300
+gc.collect()
+plain = worker()
+register.freeze()
+frozen = worker()
+print(json.dumps({'plain': plain, 'frozen': frozen}))
+'''
+
+
+class TestFreeze(unittest.TestCase):
+    def setUp(self):
+        self.register = trafaret_schema.Register(resolvers=[self.resolve])
+        self.register.compile({
+            '$id': 'http://example.com/user',
+            'type': 'object',
+            'properties': {'address': {'$ref': 'http://example.com/address'}},
+        })
+
+    def resolve(self, schema_id):
+        if schema_id == 'http://example.com/address':
+            return {'type': 'object', 'properties': {'city': {'$ref': 'http://example.com/city'}}}
+        if schema_id == 'http://example.com/city':
+            return {'type': 'string'}
+
+    def test_loads_references(self):
+        self.register.freeze(gc_freeze=False)
+        self.assertEqual(
+            set(self.register.schemas),
+            {'http://example.com/user', 'http://example.com/address', 'http://example.com/city'},
+        )
+        self.register.get_schema('http://example.com/user#').validate({'address': {'city': 'Paris'}})
+
+    def test_immutable(self):
+        self.register.freeze(gc_freeze=False)
+        with self.assertRaises(RuntimeError):
+            self.register.compile({'$id': 'http://example.com/other'})
+        with self.assertRaises(RuntimeError):
+            self.register.reg_format('code', t.String())
+        with self.assertRaises(t.DataError):
+            self.register.get_schema('http://example.com/missing#')
+        # overlays of frozen register can be changed
+        self.register.overlay().compile({'$id': 'http://example.com/other'})
+
+    @unittest.skipUnless(os.path.exists('/proc/self/smaps_rollup') and hasattr(os, 'fork'), 'needs Linux fork')
+    def test_forked_workers_share_memory(self):
+        repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        python_path = os.pathsep.join(filter(None, [repo, os.environ.get('PYTHONPATH')]))
+        output = subprocess.check_output([sys.executable, '-c', MEASURE], env=dict(os.environ, PYTHONPATH=python_path))
+        report = json.loads(output.decode())
+        self.assertLess(report['frozen']['private'], report['plain']['private'])
+        self.assertGreater(report['frozen']['shared'], report['frozen']['private'])
@@ -0,0 +1,123 @@
+import json
+import os
+import os.path as op
+import random
+import re
+import unittest
+
+import trafaret as t
+import trafaret_schema
+from trafaret_schema.generate import Generator, from_regex, generate
+
+
+ORDER = {
+    'type': 'object',
+    'properties': {
+        'id': {'type': 'integer', 'minimum': 1, 'maximum': 1000},
+        'status': {'enum': ['new', 'paid', 'sent']},
+        'code': {'type': 'string', 'pattern': '^[A-Z]{3}-\\d{2,4}$'},
+        'price': {'type': 'number', 'exclusiveMinimum': 0, 'maximum': 50, 'multipleOf': 0.01},
+        'note': {'type': 'string', 'maxLength': 5},
+        'created': {'type': 'string', 'format': 'date-time'},
+        'items': {
+            'type': 'array',
+            'minItems': 1,
+            'maxItems': 3,
+            'uniqueItems': True,
+            'items': {'$ref': '#/definitions/item'},
+        },
+        'kind': {'oneOf': [{'type': 'string', 'const': 'gift'}, {'type': 'null'}]},
+    },
+    'required': ['id', 'status', 'code', 'items'],
+    'additionalProperties': False,
+    'definitions': {
+        'item': {
+            'type': 'object',
+            'properties': {'sku': {'type': 'string', 'minLength': 2}, 'qty': {'type': 'integer', 'minimum': 1}},
+            'required': ['sku', 'qty'],
+        },
+    },
+}
+
+
+class TestGenerator(unittest.TestCase):
+    def setUp(self):
+        self.schema = trafaret_schema.json_schema(ORDER)
+
+    def test_documents_are_valid(self):
+        documents = list(generate(self.schema, count=200, seed=1))
+        self.assertEqual(len(documents), 200)
+        for document in documents:
+            self.schema.validate(document)
+            self.assertTrue({'id', 'status', 'code', 'items'} <= set(document))
+
+    def test_seed_repeats_documents(self):
+        self.assertEqual(
+            list(generate(self.schema, count=20, seed=7)),
+            list(generate(self.schema, count=20, seed=7)),
+        )
+        self.assertNotEqual(
+            list(generate(self.schema, count=20, seed=7)),
+            list(generate(self.schema, count=20, seed=8)),
+        )
+
+    def test_stream_is_lazy(self):
+        stream = iter(Generator(self.schema, seed=1))
+        for _ in range(5):
+            self.schema.validate(next(stream))
+
+    def test_invalid_documents_fail(self):
+        for document in generate(self.schema, count=100, seed=3, invalid=True):
+            with self.assertRaises(t.DataError):
+                self.schema.validate(document)
+
+    def test_unsatisfiable_schema(self):
+        with self.assertRaises(ValueError):
+            list(generate(trafaret_schema.json_schema({'not': {}}), count=1))
+        with self.assertRaises(ValueError):
+            list(generate(trafaret_schema.json_schema({}), count=1, invalid=True))
+
+    def test_constraints_are_collected_once(self):
+        generator = Generator(self.schema, seed=1)
+        items = generator.collect(self.schema).properties['items']
+        self.assertIs(generator.collect(items), generator.collect(items))
+        kind = generator.collect(self.schema).properties['kind']
+        kinds = set()
+        for _ in range(20):
+            constraints = generator.collect(kind)
+            kinds.add(frozenset(constraints.kinds))
+        self.assertEqual(kinds, {frozenset(['string']), frozenset(['null'])})
+        list(generator.stream(count=50))
+        plans = dict(generator.plans)
+        list(generator.stream(count=50))
+        self.assertEqual(generator.plans, plans)
+
+    def test_register(self):
+        register = trafaret_schema.Register()
+        register.compile(dict(ORDER, **{'$id': 'http://example.com/order'}))
+        for document in generate(register, schema_id='http://example.com/order#', count=10, seed=1):
+            register.get_schema('http://example.com/order#').validate(document)
+
+
+class TestSamples(unittest.TestCase):
+    schema_dir = op.join(op.dirname(__file__), '../schemas')
+
+    def test_repo_schemas(self):
+        register = trafaret_schema.Register()
+        schemas = {}
+        for filename in sorted(os.listdir(self.schema_dir)):
+            with open(op.join(self.schema_dir, filename)) as f:
+                schemas[filename] = register.compile(json.load(f))
+        for filename, schema in schemas.items():
+            documents = list(generate(schema, count=20, seed=1))
+            self.assertEqual(len(documents), 20, filename)
+            for document in documents:
+                schema.validate(document)
+
+
+class TestFromRegex(unittest.TestCase):
+    def test_matches(self):
+        rnd = random.Random(0)
+        for pattern in ('^[a-f0-9]{8}$', '^(foo|bar)+\\.txt$', '^\\w+@\\w+\\.com$', '^[^x]?y*$'):
+            for _ in range(20):
+                self.assertTrue(re.match(pattern, from_regex(pattern, rnd)), pattern)
@@ -0,0 +1,42 @@
+import subprocess
+import sys
+import unittest
+
+
+def run(code):
+    return subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+
+
+class TestImport(unittest.TestCase):
+    def test_import_does_not_build_meta_schema(self):
+        code = (
+            'import sys, trafaret_schema\n'
+            'print(trafaret_schema.META_SCHEMA is None)\n'
+            'heavy = ("json", "uuid", "arrow", "trafaret_schema.format")\n'
+            'print(sorted(m for m in heavy if m in sys.modules))\n'
+        )
+        self.assertEqual(run(code).stdout.splitlines(), ['True', '[]'])
+
+    def test_meta_schema_is_built_on_first_use(self):
+        code = (
+            'import trafaret_schema\n'
+            'trafaret_schema.json_schema({"type": "string"})\n'
+            'print(trafaret_schema.META_SCHEMA is not None, len(trafaret_schema.all_keywords) > 0)\n'
+        )
+        self.assertEqual(run(code).stdout.split(), ['True', 'True'])
+
+    def test_import_time(self):
+        # own modules only, dependencies are not ours to measure; bound is generous to not flap on slow CI
+        lines = run('import trafaret_schema').stderr.splitlines()
+        own = sum(
+            int(line.split('|')[0].split(':')[1])
+            for line in lines
+            if line.split('|')[-1].strip().startswith('trafaret_schema')
+        )
+        self.assertLess(own, 100000, '%s us' % own)
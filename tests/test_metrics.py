@@ -0,0 +1,100 @@
+import threading
+import unittest
+
+import trafaret as t
+import trafaret_schema
+from trafaret_schema.metrics import Metrics
+
+
+SCHEMA = {
+    '$id': 'http://example.com/order',
+    'type': 'object',
+    'properties': {'id': {'type': 'integer'}, 'name': {'type': 'string'}},
+}
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.metrics = Metrics(sample_every=2)
+        self.register = trafaret_schema.Register(metrics=self.metrics)
+        trafaret_schema.json_schema(SCHEMA, context=self.register)
+
+    def validate(self, value):
+        try:
+            self.register.validate_by('http://example.com/order', value)
+        except t.DataError:
+            pass
+
+    def test_counts(self):
+        for n in range(10):
+            self.validate({'id': n if n % 5 else 'bad', 'name': 'x'})
+        stats = self.metrics.as_dict()['http://example.com/order']
+        self.assertEqual(stats['validations'], 10)
+        self.assertEqual(stats['failures'], 2)
+        self.assertEqual(stats['latency']['count'], 5)
+        self.assertEqual(stats['top_failures'], [('id', 2)])
+
+    def test_threads_are_summed(self):
+        def work():
+            for n in range(100):
+                self.validate({'id': n})
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.metrics.as_dict()['http://example.com/order']['validations'], 400)
+
+    def test_prometheus(self):
+        self.validate({'id': 'bad'})
+        self.validate({'id': 1})
+        text = self.metrics.prometheus()
+        self.assertIn('trafaret_schema_validations_total{schema="http://example.com/order"} 2', text)
+        self.assertIn('trafaret_schema_failures_total{schema="http://example.com/order"} 1', text)
+        self.assertIn('trafaret_schema_validation_seconds_count{schema="http://example.com/order"} 1', text)
+        self.assertIn('le="+Inf"', text)
+        self.assertIn('trafaret_schema_path_failures_total{schema="http://example.com/order",path="id"} 1', text)
+
+    def test_export(self):
+        self.validate({'id': 1})
+        exported = []
+        text = self.metrics.export(callback=exported.append)
+        self.assertEqual(exported, [text])
+
+    def test_export_file(self):
+        import tempfile
+        import os.path as op
+        self.validate({'id': 1})
+        with tempfile.TemporaryDirectory() as directory:
+            path = op.join(directory, 'schemas.prom')
+            self.metrics.export(path=path)
+            with open(path) as f:
+                self.assertEqual(f.read(), self.metrics.prometheus())
+
+    def test_without_metrics(self):
+        register = trafaret_schema.Register()
+        trafaret_schema.json_schema(SCHEMA, context=register)
+        self.assertEqual(register.validate_by('http://example.com/order', {'id': 1}), {'id': 1})
+
+    def test_keyed_by_schema_id(self):
+        self.register.validate_by('http://example.com/order#', {'id': 1})
+        self.register.validate_by('http://example.com/order#/properties/id', 1)
+        self.assertEqual(list(self.metrics.as_dict()), ['http://example.com/order'])
+        self.assertEqual(self.metrics.as_dict()['http://example.com/order']['validations'], 2)
+
+    def test_paths_are_bounded(self):
+        register = trafaret_schema.Register(metrics=Metrics(max_paths=2))
+        trafaret_schema.json_schema({
+            '$id': 'http://example.com/list',
+            'type': 'array',
+            'items': {'type': 'object', 'additionalProperties': {'type': 'integer'}},
+        }, context=register)
+        for n in range(20):
+            try:
+                register.validate_by('http://example.com/list', [{}] * n + [{'a%d' % n: 'bad', 'b': 'bad'}])
+            except t.DataError:
+                pass
+        self.assertEqual(
+            sorted(register.metrics.as_dict()['http://example.com/list']['top_failures']),
+            [('*/a0', 1), ('*/b', 20), ('<other>', 19)],
+        )
@@ -0,0 +1,97 @@
+import gc
+import sys
+import unittest
+
+import trafaret as t
+import trafaret_schema
+from trafaret_schema.nodes import Enum, UniqueItems, deep_sizeof
+
+
+class TestNodes(unittest.TestCase):
+    def test_enum(self):
+        check = Enum(['a', 1, [1, 2], {'b': 1}])
+        for value in ('a', 1, 1.0, [1, 2], {'b': 1}):
+            self.assertEqual(check(value), value)
+        for value in ('b', [1], {}):
+            with self.assertRaises(t.DataError):
+                check(value)
+
+    def test_unique_unhashable_items(self):
+        self.assertEqual(UniqueItems()([{'a': 1}, {'a': 2}]), [{'a': 1}, {'a': 2}])
+        with self.assertRaises(t.DataError):
+            UniqueItems()([{'a': 1}, {'a': 1}])
+
+    def test_unique_items_follow_json_equality(self):
+        check = UniqueItems()
+        for value in ([1, True], [0, False], [[1], [True]], [{'a': 1}, {'a': True}], [{'a': [1, 2]}, {'a': [2, 1]}]):
+            self.assertEqual(check(value), value)
+        for value in ([1, 1.0], [[1], [1.0]], [{'a': 1, 'b': [{}]}, {'b': [{}], 'a': 1.0}], [True, True]):
+            with self.assertRaises(t.DataError):
+                check(value)
+        items = [{'id': n, 'tags': ['a', n]} for n in range(20000)]
+        self.assertIs(check(items), items)
+
+    def test_keyword_is_single_node(self):
+        check = trafaret_schema.json_schema({'maxLength': 5, 'type': 'string'})
+        self.assertEqual(
+            [type(trafaret).__name__ for trafaret in check.trafarets],
+            ['String', 'StringLength'],
+        )
+
+    def test_nodes_do_not_make_dict(self):
+        check = trafaret_schema.json_schema({
+            'type': 'object',
+            'properties': {
+                'a': {'type': 'string', 'pattern': '^a', 'maxLength': 3},
+                'b': {'enum': [1, 2], 'multipleOf': 1},
+                'c': {'anyOf': [{'type': 'array', 'items': [{'minimum': 0}, {}]}, {'not': {'type': 'null'}}]},
+            },
+            'required': ['a'],
+        })
+        check.validate({'a': 'ab', 'b': 1, 'c': [1]})
+        nodes = []
+        stack = [check]
+        while stack:
+            node = stack.pop()
+            slots = [
+                getattr(node, name, None)
+                for cls in type(node).__mro__ for name in cls.__dict__.get('__slots__', ())
+            ]
+            if type(node).__module__.startswith('trafaret_schema') and type(node).__dict__.get('__slots__') is not None:
+                nodes.append(node)
+                dicts = [
+                    ref for ref in gc.get_referents(node)
+                    if type(ref) is dict and not any(ref is value for value in slots)
+                ]
+                self.assertEqual(dicts, [], type(node).__name__)
+                # object header, `__dict__` and `__weakref__` pointers and slots
+                self.assertLessEqual(sys.getsizeof(node), 56 + 8 * len(slots), type(node).__name__)
+            for value in slots:
+                if isinstance(value, t.Trafaret):
+                    stack.append(value)
+                elif isinstance(value, tuple):
+                    stack.extend(item for item in value if isinstance(item, t.Trafaret))
+                    stack.extend(item[1] for item in value if isinstance(item, tuple) and len(item) == 2)
+        names = set(type(node).__name__ for node in nodes)
+        self.assertLessEqual({'Schema', 'Properties', 'Required', 'Any', 'Not', 'Items', 'PatternMatch', 'Enum'}, names)
+
+
+class TestMemoryReport(unittest.TestCase):
+    def test_memory_report(self):
+        register = trafaret_schema.Register()
+        trafaret_schema.json_schema({
+            '$id': 'http://example.com/a',
+            'type': 'object',
+            'properties': {'a': {'type': 'string'}, 'b': {'enum': [1, 2, 3]}},
+        }, context=register)
+        trafaret_schema.json_schema({'$id': 'http://example.com/b', 'type': 'string'}, context=register)
+        report = register.memory_report()
+        a = report['schemas']['http://example.com/a']
+        b = report['schemas']['http://example.com/b']
+        self.assertGreater(a['bytes'], b['bytes'])
+        self.assertLessEqual(report['total']['bytes'], a['bytes'] + b['bytes'])
+
+    def test_shared_objects_counted_once(self):
+        shared = Enum([1, 2])
+        count, size = deep_sizeof([shared, shared])
+        self.assertEqual((count, size), deep_sizeof([shared]))
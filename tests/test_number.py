@@ -0,0 +1,76 @@
+import decimal
+import unittest
+
+import trafaret as t
+import trafaret_schema
+
+
+def strict_schema(schema):
+    return trafaret_schema.json_schema(schema, context=trafaret_schema.Register(strict_numbers=True))
+
+
+class TestStrictNumbers(unittest.TestCase):
+    def test_number(self):
+        check = strict_schema({'type': 'number'})
+        self.assertEqual(check(1), 1)
+        self.assertEqual(check(1.5), 1.5)
+        self.assertEqual(check(decimal.Decimal('1.5')), decimal.Decimal('1.5'))
+        for value in ('1.5', True, None):
+            with self.assertRaises(t.DataError):
+                check(value)
+
+    def test_integer(self):
+        check = strict_schema({'type': 'integer'})
+        self.assertIs(type(check(10)), int)
+        self.assertEqual(check(10.0), 10.0)
+        for value in (10.5, '10', False):
+            with self.assertRaises(t.DataError):
+                check(value)
+
+    def test_bounds(self):
+        check = strict_schema({'minimum': 1, 'exclusiveMaximum': 5})
+        self.assertEqual(check(1), 1)
+        self.assertEqual(check(4.9), 4.9)
+        for value in (0, 5, '3'):
+            with self.assertRaises(t.DataError):
+                check(value)
+
+    def test_multiple_of_decimal_multiplier(self):
+        check = strict_schema({'multipleOf': 0.01})
+        for value in (0.07, 1.1, 19.99, 3, decimal.Decimal('0.07')):
+            self.assertEqual(check(value), value)
+        for value in (0.001, 1.005):
+            with self.assertRaises(t.DataError):
+                check(value)
+
+    def test_multiple_of_near_misses(self):
+        check = strict_schema({'multipleOf': 0.01})
+        for value in (12345678.0000001, 0.0100000001, decimal.Decimal('0.0100001'), float('inf'), float('nan')):
+            with self.assertRaises(t.DataError):
+                check(value)
+        check = trafaret_schema.json_schema({'multipleOf': 1})
+        self.assertEqual(check(3.0), 3.0)
+        for value in (1e-10, 1.0000000001, 3.0000000005):
+            with self.assertRaises(t.DataError):
+                check(value)
+
+    def test_multiple_of_floats_use_integers(self):
+        from trafaret_schema import number
+        check = strict_schema({'multipleOf': 0.01})
+        original = number.Fraction
+        number.Fraction = None  # fractions are not needed for floats of usual size
+        try:
+            for value in (0.07, -19.99, 12345678.91, 0.0):
+                self.assertEqual(check(value), value)
+            for value in (1.005, 12345678.0000001, 0.0100000001):
+                with self.assertRaises(t.DataError):
+                    check(value)
+        finally:
+            number.Fraction = original
+        self.assertEqual(check(1e300), 1e300)
+
+    def test_coerce_is_default(self):
+        check = trafaret_schema.json_schema({'type': 'number', 'multipleOf': 0.1})
+        self.assertEqual(check('0.3'), '0.3')
+        with self.assertRaises(t.DataError):
+            check('0.35')
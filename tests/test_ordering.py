@@ -0,0 +1,105 @@
+import json
+import unittest
+
+import trafaret as t
+import trafaret_schema
+from trafaret_schema import ordering
+
+
+SHAPE = {
+    '$id': 'http://example.com/shape',
+    'type': 'object',
+    'properties': {
+        'shape': {
+            'anyOf': [
+                {'type': 'object', 'required': ['radius']},
+                {'type': 'object', 'required': ['side']},
+                {'type': 'object', 'required': ['width', 'height']},
+            ],
+        },
+        'id': {'type': ['integer', 'string']},
+    },
+}
+
+
+class TestOrdering(unittest.TestCase):
+    def setUp(self):
+        self.register = trafaret_schema.Register()
+        self.check = self.register.compile(SHAPE)
+        self.any = dict(ordering.any_nodes(self.register))
+
+    def test_names(self):
+        self.assertEqual(sorted(self.any), [
+            'http://example.com/shape#/properties/id@0',
+            'http://example.com/shape#/properties/shape@0',
+        ])
+
+    def test_branches_are_reordered(self):
+        ordering.adapt(self.register, every=10)
+        shape = self.any['http://example.com/shape#/properties/shape@0']
+        for _ in range(10):
+            self.check.validate({'shape': {'width': 1, 'height': 2}})
+        self.assertEqual(shape.stats.order, (2, 0, 1))
+        tried = []
+        original = shape.trafarets
+        shape.trafarets = tuple(t.Call(lambda value, index=index: tried.append(index) or value) for index in range(3))
+        try:
+            self.check.validate({'shape': {}})
+        finally:
+            shape.trafarets = original
+        self.assertEqual(tried, [2])
+
+    def test_results_do_not_depend_on_order(self):
+        data = {'shape': {'side': 1}, 'id': 'a'}
+        bad = {'shape': {}, 'id': 1.5}
+        expected = self.check.validate(data)
+        with self.assertRaises(t.DataError) as declared:
+            self.check.validate(bad)
+        ordering.load(self.register, {
+            'http://example.com/shape#/properties/shape@0': [2, 1, 0],
+            'http://example.com/shape#/properties/id@0': [1, 0],
+        })
+        self.assertEqual(self.check.validate(data), expected)
+        with self.assertRaises(t.DataError) as adapted:
+            self.check.validate(bad)
+        self.assertEqual(adapted.exception.as_dict(), declared.exception.as_dict())
+
+    def test_export_and_load(self):
+        ordering.adapt(self.register, every=5)
+        for _ in range(5):
+            self.check.validate({'shape': {'side': 1}, 'id': 'a'})
+        orders = json.loads(json.dumps(ordering.export(self.register)))
+        self.assertEqual(orders, {
+            'http://example.com/shape#/properties/shape@0': [1, 0, 2],
+            'http://example.com/shape#/properties/id@0': [1, 0],
+        })
+        register = trafaret_schema.Register()
+        register.compile(SHAPE)
+        missing = ordering.load(register, dict(orders, **{'http://example.com/gone#@0': [0]}))
+        self.assertEqual(missing, ['http://example.com/gone#@0'])
+        self.assertEqual(ordering.export(register), orders)
+
+    def test_reset(self):
+        ordering.adapt(self.register)
+        ordering.reset(self.register)
+        self.assertEqual(ordering.export(self.register), {})
+
+    def test_nested_unions(self):
+        register = trafaret_schema.Register()
+        check = register.compile({
+            '$id': 'http://example.com/nested',
+            'type': 'array',
+            'items': {'anyOf': [{'type': 'integer'}, {'type': 'string'}]},
+            'allOf': [{'type': ['string', 'null', 'array']}, {'not': {'oneOf': [{'type': 'null'}, {'const': 1}]}}],
+        })
+        nodes = dict(ordering.any_nodes(register))
+        self.assertEqual(sorted(nodes), [
+            'http://example.com/nested#@2/0/0',
+            'http://example.com/nested#@2/1/0/0/0',
+            'http://example.com/nested#@3/0/0',
+        ])
+        ordering.adapt(register, every=4)
+        for _ in range(4):
+            check.validate(['a', 'b'])
+        self.assertEqual(nodes['http://example.com/nested#@3/0/0'].stats.order, (1, 0))
+        self.assertEqual(nodes['http://example.com/nested#@2/0/0'].stats.order, (2, 0, 1))
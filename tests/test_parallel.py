@@ -0,0 +1,129 @@
+import unittest
+
+import trafaret as t
+import trafaret_schema
+from trafaret_schema.parallel import Parallel
+
+
+ITEMS = {
+    'type': 'array',
+    'maxItems': 100,
+    'uniqueItems': True,
+    'items': {'type': 'object', 'properties': {'n': {'type': 'integer'}, 'tag': {'default': 'x'}}},
+    'contains': {'type': 'object', 'properties': {'n': {'const': 42}}, 'required': ['n']},
+}
+
+
+def items(count):
+    return [{'n': n} for n in range(count)]
+
+
+class ParallelMixin(object):
+    mode = None
+
+    def setUp(self):
+        self.check = trafaret_schema.json_schema(ITEMS)
+        self.parallel = Parallel(threshold=10, chunk_size=7, workers=2, mode=self.mode)
+
+    def test_valid(self):
+        data = items(50)
+        self.assertEqual(self.check.validate(data, parallel=self.parallel), items(50))
+
+    def test_errors_have_offsets(self):
+        data = items(50)
+        data[3]['n'] = 'a'
+        data[45]['n'] = 'b'
+        with self.assertRaises(t.DataError) as ctx:
+            self.check.validate(data, parallel=self.parallel)
+        sequential = None
+        try:
+            self.check.validate(data)
+        except t.DataError as error:
+            sequential = error
+        self.assertEqual(ctx.exception.as_dict(), sequential.as_dict())
+        self.assertIn('3', str(ctx.exception.as_dict()))
+        self.assertIn('45', str(ctx.exception.as_dict()))
+
+    def test_array_constraints_see_all_chunks(self):
+        data = items(50)
+        data.append({'n': 1})  # duplicate of item in the first chunk
+        with self.assertRaises(t.DataError):
+            self.check.validate(data, parallel=self.parallel)
+        with self.assertRaises(t.DataError):
+            self.check.validate(items(101), parallel=self.parallel)
+        with self.assertRaises(t.DataError):
+            self.check.validate(items(40), parallel=self.parallel)  # no 42
+
+    def test_fill_defaults(self):
+        data = items(50)
+        self.check.validate(data, parallel=self.parallel, validate_only=True, fill_defaults=True)
+        self.assertEqual(data[49], {'n': 49, 'tag': 'x'})
+
+    def test_failed_array_is_not_filled(self):
+        data = items(40)  # no 42
+        with self.assertRaises(t.DataError):
+            self.check.validate(data, parallel=self.parallel, validate_only=True, fill_defaults=True)
+        self.assertEqual(data, items(40))
+
+    def test_max_depth(self):
+        check = trafaret_schema.json_schema({'type': 'array', 'items': {'type': 'array'}})
+        data = [[[1]]] * 20
+        self.assertIs(check.validate(data, parallel=self.parallel, max_depth=2, validate_only=True), data)
+        with self.assertRaises(t.DataError):
+            check.validate(data, parallel=self.parallel, max_depth=0)
+
+    def test_additional_items(self):
+        check = trafaret_schema.json_schema({
+            'type': 'array',
+            'items': [{'type': 'string'}, {'type': 'string'}],
+            'additionalItems': {'type': 'integer'},
+        })
+        data = ['a', 'b'] + list(range(30))
+        data[20] = 'c'
+        with self.assertRaises(t.DataError) as ctx:
+            check.validate(data, parallel=self.parallel)
+        with self.assertRaises(t.DataError) as sequential:
+            check.validate(data)
+        self.assertEqual(str(ctx.exception), str(sequential.exception))
+        self.assertIn('{20: ', str(ctx.exception))
+
+    def test_budget(self):
+        check = trafaret_schema.json_schema({'type': 'array', 'items': {'type': 'string', 'pattern': '^a'}})
+        data = ['a'] * 30
+        check.validate(data, parallel=self.parallel, budget=trafaret_schema.Budget(max_nodes=100, max_string=5))
+        with self.assertRaises(trafaret_schema.BudgetExceeded):
+            check.validate(data, parallel=self.parallel, budget=trafaret_schema.Budget(max_nodes=20))
+        data[25] = 'a' * 10
+        with self.assertRaises(trafaret_schema.BudgetExceeded) as ctx:
+            check.validate(data, parallel=self.parallel, budget=trafaret_schema.Budget(max_string=5))
+        self.assertEqual(ctx.exception.limit, 'max_string')
+
+    def test_additional_items_max_depth(self):
+        check = trafaret_schema.json_schema({'type': 'array', 'items': [], 'additionalItems': {'type': 'array'}})
+        data = [[1]] * 20
+        with self.assertRaises(t.DataError) as ctx:
+            check.validate(data, parallel=self.parallel, max_depth=0)
+        self.assertIn('Maximum nesting depth', str(ctx.exception))
+
+    def test_additional_items_budget(self):
+        check = trafaret_schema.json_schema({
+            'type': 'array',
+            'items': [{'type': 'string'}, {'type': 'string'}],
+            'additionalItems': {'type': 'string', 'pattern': '^a'},
+        })
+        data = ['a'] * 30
+        check.validate(data, parallel=self.parallel, budget=trafaret_schema.Budget(max_string=5))
+        data[25] = 'a' * 10
+        with self.assertRaises(trafaret_schema.BudgetExceeded) as ctx:
+            check.validate(data, parallel=self.parallel, budget=trafaret_schema.Budget(max_string=5))
+        self.assertEqual(ctx.exception.limit, 'max_string')
+        with self.assertRaises(trafaret_schema.BudgetExceeded):
+            check.validate(data, parallel=self.parallel, budget=trafaret_schema.Budget(max_nodes=20))
+
+
+class TestThreads(ParallelMixin, unittest.TestCase):
+    mode = 'threads'
+
+
+class TestFork(ParallelMixin, unittest.TestCase):
+    mode = 'fork'
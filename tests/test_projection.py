@@ -0,0 +1,85 @@
+import unittest
+
+import trafaret as t
+import trafaret_schema
+from trafaret_schema.projection import make_trie, parse_pointer, SELECTED
+
+
+ORDER = {
+    'type': 'object',
+    'properties': {
+        'customer': {
+            'type': 'object',
+            'properties': {'id': {'type': 'integer'}, 'name': {'type': 'string'}},
+            'required': ['id', 'name'],
+        },
+        'items': {'type': 'array', 'items': {'$ref': '#/definitions/item'}},
+        'note': {'type': 'string', 'maxLength': 3},
+    },
+    'required': ['customer'],
+    'definitions': {
+        'item': {
+            'type': 'object',
+            'properties': {'sku': {'type': 'string', 'pattern': '^[A-Z]+$'}, 'qty': {'type': 'integer'}},
+            'required': ['sku'],
+        },
+    },
+}
+
+
+class TestProjection(unittest.TestCase):
+    def setUp(self):
+        self.schema = trafaret_schema.json_schema(ORDER)
+        self.projected = self.schema.project(['/customer/id', '/items/*/sku'])
+
+    def test_only_selected_values_are_checked(self):
+        data = {
+            'customer': {'id': 1, 'name': 5},
+            'items': [{'sku': 'AB', 'qty': 'many'}],
+            'note': 'too long',
+        }
+        self.assertIs(self.projected.validate(data), data)
+        with self.assertRaises(t.DataError):
+            self.schema.validate(data)
+
+    def test_selected_values_are_validated(self):
+        with self.assertRaises(t.DataError) as ctx:
+            self.projected.validate({'customer': {'id': 'x'}, 'items': [{'sku': 'AB'}, {'sku': 'ab'}]})
+        errors = ctx.exception.as_dict()
+        self.assertIn('customer', str(errors))
+        self.assertIn('does not match pattern', str(errors))
+
+    def test_required_of_selected_names(self):
+        with self.assertRaises(t.DataError):
+            self.projected.validate({'customer': {'name': 'x'}, 'items': []})
+        with self.assertRaises(t.DataError):
+            self.projected.validate({'items': []})
+        with self.assertRaises(t.DataError):
+            self.projected.validate({'customer': {'id': 1}, 'items': [{'qty': 1}]})
+        self.projected.validate({'customer': {'id': 1}})
+
+    def test_types_on_the_way(self):
+        with self.assertRaises(t.DataError):
+            self.projected.validate({'customer': [], 'items': []})
+
+    def test_index_and_whole_document(self):
+        projected = self.schema.project(['/items/1'])
+        projected.validate({'customer': {'id': 1}, 'items': [{'sku': 1}, {'sku': 'A'}]})
+        with self.assertRaises(t.DataError):
+            projected.validate({'customer': {'id': 1}, 'items': [{'sku': 'A'}, {'sku': 1}]})
+        self.assertIs(self.schema.project(['']), self.schema)
+
+    def test_recursive_refs(self):
+        schema = trafaret_schema.json_schema({
+            'type': 'object',
+            'properties': {'value': {'type': 'integer'}, 'next': {'$ref': '#'}},
+        })
+        projected = schema.project(['/next/next/value'])
+        projected.validate({'value': 'x', 'next': {'next': {'value': 1}}})
+        with self.assertRaises(t.DataError):
+            projected.validate({'next': {'next': {'value': 'x'}}})
+
+    def test_pointers(self):
+        self.assertEqual(parse_pointer('/a~1b/c~0d'), ['a/b', 'c~d'])
+        self.assertEqual(make_trie(['/a/b', '/a']), {'a': {SELECTED: True}})
+        self.assertEqual(make_trie(['/a', '/a/b']), {'a': {SELECTED: True}})
@@ -0,0 +1,109 @@
+import json
+import os
+import unittest
+import tempfile
+import shutil
+import threading
+import time
+
+import trafaret as t
+import trafaret_schema
+from trafaret_schema.resolvers import DirectoryResolver, read_text
+
+
+ADDRESS = {
+    'type': 'object',
+    'properties': {'city': {'type': 'string'}},
+    'required': ['city'],
+}
+
+PERSON = {
+    'type': 'object',
+    'properties': {
+        'name': {'type': 'string'},
+        'address': {'$ref': 'http://example.com/schemas/address#'},
+    },
+}
+
+
+class TestDirectoryResolver(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.write('address.json', ADDRESS)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, document, mtime=None):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as f:
+            json.dump(document, f)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+
+    def test_load_on_first_use(self):
+        resolver = DirectoryResolver('http://example.com/schemas/', self.directory)
+        register = trafaret_schema.Register(resolvers=[resolver])
+        person = trafaret_schema.json_schema(PERSON, context=register)
+        self.assertNotIn('http://example.com/schemas/address', register.schemas)
+        person({'name': 'Peotr', 'address': {'city': 'Moscow'}})
+        self.assertIn('http://example.com/schemas/address', register.schemas)
+        with self.assertRaises(t.DataError):
+            person({'address': {}})
+
+    def test_unknown_reference(self):
+        resolver = DirectoryResolver('http://example.com/schemas/', self.directory)
+        register = trafaret_schema.Register(resolvers=[resolver])
+        with self.assertRaises(t.DataError):
+            register.get_schema('http://example.com/schemas/missing#')
+        self.assertIsNone(resolver('http://example.com/schemas/../secret'))
+        self.assertIsNone(resolver('http://other.com/schemas/address'))
+
+    def test_invalid_json(self):
+        with open(os.path.join(self.directory, 'broken.json'), 'w') as f:
+            f.write('{"type": ')
+        resolver = DirectoryResolver('http://example.com/schemas/', self.directory)
+        register = trafaret_schema.Register(resolvers=[resolver])
+        with self.assertRaises(t.DataError):
+            register.get_schema('http://example.com/schemas/broken#')
+
+    def test_poll_refreshes_once(self):
+        self.write('address.json', ADDRESS, mtime=1000)
+        resolver = DirectoryResolver('http://example.com/schemas/', self.directory)
+        register = trafaret_schema.Register(resolvers=[resolver], poll_interval=60)
+        register.get_schema('http://example.com/schemas/address#')
+        refreshed = []
+        refresh = register.refresh
+
+        def slow_refresh():
+            time.sleep(0.05)
+            refreshed.append(refresh())
+        register.refresh = slow_refresh
+        register.polled = 0
+        threads = [
+            threading.Thread(target=register.get_schema, args=('http://example.com/schemas/address#',))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(refreshed, [[]])
+
+    def test_refresh_changed_file(self):
+        self.write('address.json', ADDRESS, mtime=1000)
+        resolver = DirectoryResolver('http://example.com/schemas/', self.directory)
+        register = trafaret_schema.Register(resolvers=[resolver])
+        person = trafaret_schema.json_schema(PERSON, context=register)
+        person({'address': {'city': 'Moscow'}})
+        self.assertEqual(register.refresh(), [])
+
+        self.write('address.json', dict(ADDRESS, required=['city', 'street']), mtime=2000)
+        self.assertEqual(register.refresh(), ['http://example.com/schemas/address'])
+        with self.assertRaises(t.DataError):
+            person({'address': {'city': 'Moscow'}})
+
+    def test_read_text_with_mmap(self):
+        self.write('big.json', {'description': 'x' * 1000})
+        path = os.path.join(self.directory, 'big.json')
+        self.assertEqual(read_text(path, mmap_threshold=10), read_text(path, mmap_threshold=1 << 20))
@@ -0,0 +1,75 @@
+import unittest
+
+import trafaret as t
+import trafaret_schema
+from trafaret_schema.sampling import SampledValidator
+from trafaret_schema.utils import error_paths
+
+
+SCHEMA = {
+    'type': 'object',
+    'properties': {'id': {'type': 'integer'}, 'name': {'type': 'string'}},
+}
+
+
+class TestSampledValidator(unittest.TestCase):
+    def setUp(self):
+        self.schema = trafaret_schema.json_schema(SCHEMA)
+
+    def test_picked_by_key_hash(self):
+        sampled = SampledValidator(self.schema, 0.25, key='id')
+        records = [{'id': n, 'name': 'x'} for n in range(1000)]
+        for record in records:
+            sampled(record)
+        first = sampled.stats()['validated']
+        for record in records:
+            sampled(record)
+        # same records are picked again, plus the first record of the new key set only once
+        self.assertEqual(sampled.stats()['validated'], 2 * first - 1)
+        self.assertTrue(150 < first < 350)
+
+    def test_new_key_sets_are_always_validated(self):
+        sampled = SampledValidator(self.schema, 0.0, key='id')
+        sampled({'id': 1, 'name': 'x'})
+        sampled({'id': 2, 'name': 'y'})
+        with self.assertRaises(t.DataError):
+            sampled({'id': 'bad', 'extra': 1})
+        self.assertEqual(sampled.stats()['validated'], 2)
+
+    def test_key_sets_over_limit_are_sampled(self):
+        sampled = SampledValidator(self.schema, 0.0, key='id', max_key_sets=2)
+        for n in range(10):
+            sampled({'id': n, 'field%d' % n: 1})
+        self.assertEqual(sampled.stats()['validated'], 2)
+
+    def test_without_key(self):
+        sampled = SampledValidator(self.schema, 0.1)
+        for n in range(100):
+            sampled({'id': n})
+        # every tenth record and the first one with new key set
+        self.assertEqual(sampled.stats()['validated'], 11)
+
+    def test_drift_rates(self):
+        sampled = SampledValidator(self.schema, 1.0, key='id')
+        for n in range(10):
+            try:
+                sampled({'id': n, 'name': n if n % 5 == 0 else 'x'})
+            except t.DataError:
+                pass
+        stats = sampled.stats()
+        self.assertEqual(stats['failed'], 2)
+        self.assertEqual(stats['failure_rate'], 0.2)
+        self.assertEqual(list(stats['paths']), ['name'])
+        sampled.reset()
+        self.assertEqual(sampled.stats()['seen'], 0)
+
+    def test_always(self):
+        sampled = SampledValidator(self.schema, 0.0, key='id', always=lambda record: record.get('id') == 7)
+        sampled({'id': 1})
+        sampled({'id': 2})
+        sampled({'id': 7})
+        self.assertEqual(sampled.stats()['validated'], 2)
+
+    def test_error_paths(self):
+        error = t.DataError({'a': t.DataError({'b': t.DataError('bad')}), 'c': t.DataError([t.DataError('x')])})
+        self.assertEqual(sorted(error_paths(error)), ['a/b', 'c'])
@@ -1,7 +1,9 @@
+import gc
 import os
 import os.path as op
 import unittest
 import json
+import trafaret as t
 import trafaret_schema
 
 
@@ -18,3 +20,292 @@ class TestSchemas(unittest.TestCase):
                     schema = json.load(f)
                     print('Check', path)
                     trafaret_schema.json_schema(schema)
+
+
+class TestInterning(unittest.TestCase):
+    def test_identical_subschemas_are_shared(self):
+        register = trafaret_schema.Register()
+        check = trafaret_schema.json_schema({
+            'type': 'object',
+            'properties': {
+                'a': {'type': 'integer', 'minimum': 0},
+                'b': {'type': 'integer', 'minimum': 0},
+                'c': {'type': 'array', 'items': {'type': 'integer', 'minimum': 0}},
+            },
+        }, context=register)
+        properties = check.trafarets[-1]
+        a, b = [trafaret for name, trafaret in sorted(properties.properties)][:2]
+        self.assertIs(a, b)
+        stats = register.intern_stats()
+        self.assertEqual(stats['reused'], 2)
+        self.assertTrue(0 < stats['ratio'] < 1)
+        self.assertEqual(check({'a': 1, 'b': 2, 'c': [3]}), {'a': 1, 'b': 2, 'c': [3]})
+
+    def test_paths_are_kept_for_reused_subschemas(self):
+        register = trafaret_schema.Register()
+        inner = {'type': 'object', 'properties': {'x': {'type': 'string'}}}
+        check = trafaret_schema.json_schema({
+            'type': 'object',
+            'properties': {
+                'a': inner,
+                'b': inner,
+                'c': {'$ref': '#/properties/b/properties/x'},
+            },
+        }, context=register)
+        self.assertEqual(check({'c': 'str'}), {'c': 'str'})
+        register.validate_references()
+
+    def test_references_are_not_interned(self):
+        register = trafaret_schema.Register()
+        trafaret_schema.json_schema({
+            'properties': {
+                'a': {'$ref': '#/definitions/x'},
+                'b': {'$ref': '#/definitions/x'},
+            },
+            'definitions': {'x': {'type': 'string'}},
+        }, context=register)
+        self.assertEqual(register.intern_stats()['reused'], 0)
+
+    def test_reregistered_format_is_not_reused(self):
+        register = trafaret_schema.Register()
+        register.reg_format('code', t.Regexp('^[A-Z]+$'))
+        schema = {'type': 'object', 'properties': {'code': {'type': 'string', 'format': 'code'}}}
+        register.compile(schema)
+        register.reg_format('code', t.Regexp('^[0-9]+$'))
+        check = register.compile(schema)
+        self.assertEqual(check({'code': '12'}), {'code': '12'})
+        with self.assertRaises(t.DataError):
+            check({'code': 'AB'})
+
+    def test_keys_are_built_bottom_up(self):
+        shapes = []
+
+        def shape(items):
+            shapes.append(items)
+            return len(shapes)
+
+        keys = {}
+        inner = {'type': 'integer', 'enum': [1, 1.0, True]}
+        schema = {'properties': {'a': inner, 'b': {'items': [inner, {'$ref': '#'}]}}}
+        trafaret_schema.intern_keys(schema, shape, keys)
+        # every dict is shaped once, dicts with `$ref` and dicts around them are not interned
+        self.assertEqual(len(shapes), 1)
+        self.assertEqual(keys[id(inner)], 1)
+        self.assertEqual(keys[id(schema)], None)
+        self.assertEqual(shapes[0][0], ('enum', ('list', (('int', 1), ('float', 1.0), ('bool', True)))))
+
+    def test_disabled(self):
+        register = trafaret_schema.Register(intern=False)
+        trafaret_schema.json_schema({
+            'properties': {'a': {'type': 'string'}, 'b': {'type': 'string'}},
+        }, context=register)
+        self.assertEqual(register.intern_stats()['reused'], 0)
+
+
+class TestConcurrentCompilation(unittest.TestCase):
+    def make_schema(self, index):
+        return {
+            '$id': 'http://example.com/schema%s' % (index % 10),
+            'type': 'object',
+            'properties': {
+                'a': {'type': 'integer', 'minimum': index},
+                'b': {'$ref': '#/definitions/b'},
+            },
+            'definitions': {'b': {'type': 'string', 'maxLength': index + 1}},
+        }
+
+    def test_compile_in_threads(self):
+        from concurrent.futures import ThreadPoolExecutor
+
+        register = trafaret_schema.Register()
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            compiled = list(pool.map(
+                lambda index: trafaret_schema.json_schema(self.make_schema(index), context=register),
+                range(200),
+            ))
+        self.assertEqual(len(register.schemas), 10)
+        for schema_register in register.schemas.values():
+            self.assertEqual(
+                sorted(schema_register.schemas),
+                ['#', '#/definitions/b', '#/properties/a', '#/properties/b'],
+            )
+        register.validate_references()
+        for index, check in enumerate(compiled):
+            self.assertEqual(check({'a': index, 'b': 'x'}), {'a': index, 'b': 'x'})
+
+
+class TestReload(unittest.TestCase):
+    def setUp(self):
+        self.register = trafaret_schema.Register()
+        self.address = trafaret_schema.json_schema({
+            '$id': 'http://example.com/address',
+            'type': 'object',
+            'properties': {'zip': {'type': 'string'}},
+            'definitions': {'zip': {'type': 'string'}},
+        }, context=self.register)
+        self.user = trafaret_schema.json_schema({
+            '$id': 'http://example.com/user',
+            'type': 'object',
+            'properties': {
+                'address': {'$ref': 'http://example.com/address'},
+                'zip': {'$ref': 'http://example.com/address#/definitions/zip'},
+            },
+        }, context=self.register)
+
+    def test_dependents_index(self):
+        self.assertEqual(self.register.dependents['http://example.com/address'], frozenset(['http://example.com/user']))
+
+    def test_reload_relinks_dependents(self):
+        with self.assertRaises(t.DataError):
+            self.user.validate({'address': {'zip': 123}})
+        user_register = self.register.schemas['http://example.com/user']
+        dependents = self.register.reload('http://example.com/address', {
+            'type': 'object',
+            'properties': {'zip': {'type': 'integer'}},
+            'definitions': {'zip': {'type': 'integer'}},
+        })
+        self.assertEqual(dependents, frozenset(['http://example.com/user']))
+        # dependent schema is not recompiled, but uses the new one
+        self.assertIs(self.register.schemas['http://example.com/user'], user_register)
+        self.user.validate({'address': {'zip': 123}, 'zip': 1})
+        with self.assertRaises(t.DataError):
+            self.user.validate({'address': {'zip': 'abc'}})
+
+    def test_reload_keeps_references_valid(self):
+        with self.assertRaises(t.DataError):
+            self.register.reload('http://example.com/address', {'type': 'object'})
+        # old schema is still in place
+        self.user.validate({'address': {'zip': 'a'}, 'zip': 'b'})
+
+    def test_validation_sees_one_version(self):
+        register = self.register
+
+        def reload(value):
+            register.reload('http://example.com/address', {
+                'type': 'object',
+                'properties': {'zip': {'type': 'integer'}},
+                'definitions': {'zip': {'type': 'integer'}},
+            })
+            return value
+        register.reg_format('reload', t.Call(reload))
+        check = trafaret_schema.json_schema({
+            'type': 'array',
+            'items': [
+                {'$ref': 'http://example.com/address'},
+                {'format': 'reload'},
+                {'$ref': 'http://example.com/address'},
+            ],
+        }, context=register)
+        data = [{'zip': 'a'}, 1, {'zip': 'b'}]
+        check.validate(data)
+        with self.assertRaises(t.DataError):
+            check.validate(data)
+
+    def test_snapshot_is_taken_before_lookup(self):
+        register = self.register
+        get_schema = register.get_schema
+
+        def get_schema_then_reload(ref):
+            schema = get_schema(ref)
+            # other thread swaps the schema right after the lookup
+            register.reload('http://example.com/address', {
+                'type': 'object',
+                'properties': {'zip': {'type': 'integer'}},
+                'definitions': {'zip': {'type': 'integer'}},
+            })
+            return schema
+        register.get_schema = get_schema_then_reload
+        check = trafaret_schema.json_schema({
+            'type': 'array',
+            'items': [{'$ref': 'http://example.com/address'}, {'$ref': 'http://example.com/address'}],
+        }, context=register)
+        check.validate([{'zip': 'a'}, {'zip': 'b'}])
+
+    def test_reloads_do_not_grow_intern_table(self):
+        from trafaret_schema.nodes import Schema
+
+        def document(n):
+            return {
+                'type': 'object',
+                'properties': {
+                    'zip': {'type': 'string', 'maxLength': n + 1},
+                    'lines': {'type': 'array', 'items': {'type': 'string', 'minLength': n}},
+                },
+                'definitions': {'zip': {'type': 'string'}},
+            }
+
+        def live_schemas():
+            gc.collect()
+            return sum(1 for obj in gc.get_objects() if isinstance(obj, Schema))
+        self.register.reload('http://example.com/address', document(0))
+        sizes = (len(self.register.interned), len(self.register.shapes), live_schemas())
+        for n in range(1, 50):
+            self.register.reload('http://example.com/address', document(n))
+        self.assertEqual((len(self.register.interned), len(self.register.shapes), live_schemas()), sizes)
+        self.user.validate({'address': {'zip': 'a' * 50}})
+
+    def test_reload_drops_stale_dependents(self):
+        self.register.reload('http://example.com/user', {'type': 'object'})
+        self.assertNotIn('http://example.com/address', self.register.dependents)
+        self.assertEqual(self.register.reload('http://example.com/address', {'type': 'object'}), frozenset())
+
+
+class TestOverlay(unittest.TestCase):
+    def setUp(self):
+        self.base = trafaret_schema.Register()
+        self.base.reg_format('code', t.Regexp('^[A-Z]+$'))
+        self.base.compile({
+            '$id': 'http://example.com/address',
+            'type': 'object',
+            'properties': {'zip': {'type': 'string'}},
+        })
+        self.base.compile({
+            '$id': 'http://example.com/user',
+            'type': 'object',
+            'properties': {'address': {'$ref': 'http://example.com/address'}},
+        })
+        self.base.compile({
+            '$id': 'http://example.com/order',
+            'type': 'object',
+            'properties': {'user': {'$ref': 'http://example.com/user'}, 'code': {'format': 'code'}},
+        })
+        self.base.compile({'$id': 'http://example.com/note', 'type': 'string'})
+        self.tenant = self.base.overlay()
+
+    def test_inherits_schemas(self):
+        self.assertEqual(self.tenant.schemas, {})
+        note = 'http://example.com/note#'
+        self.assertIs(self.tenant.get_schema(note), self.base.get_schema(note))
+        self.assertIs(self.tenant.get_format('code'), self.base.get_format('code'))
+
+    def test_override_compiles_dependents(self):
+        self.tenant.compile({
+            '$id': 'http://example.com/address',
+            'type': 'object',
+            'properties': {'zip': {'type': 'integer'}},
+        })
+        self.assertEqual(
+            set(self.tenant.schemas),
+            {'http://example.com/address', 'http://example.com/user', 'http://example.com/order'},
+        )
+        order = {'user': {'address': {'zip': 1}}, 'code': 'AB'}
+        self.tenant.get_schema('http://example.com/order#').validate(order)
+        with self.assertRaises(t.DataError):
+            self.base.get_schema('http://example.com/order#').validate(order)
+
+    def test_override_format(self):
+        self.tenant.reg_format('code', t.Regexp('^[0-9]+$'))
+        self.assertEqual(set(self.tenant.schemas), {'http://example.com/order'})
+        self.tenant.get_schema('http://example.com/order#').validate({'code': '12'})
+        self.base.get_schema('http://example.com/order#').validate({'code': 'AB'})
+        with self.assertRaises(t.DataError):
+            self.tenant.get_schema('http://example.com/order#').validate({'code': 'AB'})
+
+    def test_overlay_of_overlay(self):
+        self.tenant.compile({'$id': 'http://example.com/address', 'type': 'object', 'required': ['zip']})
+        nested = self.tenant.overlay()
+        nested.compile({'$id': 'http://example.com/user', 'type': 'object', 'required': ['name']})
+        self.assertEqual(set(nested.schemas), {'http://example.com/user', 'http://example.com/order'})
+        nested.get_schema('http://example.com/order#').validate({'user': {'name': 'x'}})
+        with self.assertRaises(t.DataError):
+            self.tenant.get_schema('http://example.com/order#').validate({'user': {'address': {}}})
@@ -0,0 +1,85 @@
+import json
+import unittest
+
+import trafaret as t
+import trafaret_schema
+from trafaret_schema import stream
+
+
+ORDER = {
+    'type': 'object',
+    'properties': {
+        'id': {'type': 'integer'},
+        'customer': {
+            'type': 'object',
+            'properties': {'name': {'type': 'string', 'maxLength': 5}},
+            'additionalProperties': False,
+        },
+        'items': {
+            'type': 'array',
+            'maxItems': 2,
+            'items': {'$ref': '#/definitions/item'},
+        },
+    },
+    'required': ['id'],
+    'definitions': {
+        'item': {'type': 'object', 'properties': {'sku': {'type': 'string'}}},
+    },
+}
+
+
+class TestParse(unittest.TestCase):
+    def setUp(self):
+        self.schema = trafaret_schema.json_schema(ORDER, context=trafaret_schema.Register(strict_numbers=True))
+
+    def assertError(self, buf, error):
+        with self.assertRaises(t.DataError) as ctx:
+            self.schema.validate_bytes(buf)
+        self.assertEqual(ctx.exception.as_dict(), error)
+
+    def test_same_as_json_loads(self):
+        for document in (
+            {'id': 1, 'customer': {'name': 'Ann'}, 'items': [{'sku': 'a'}, {'sku': 'b'}]},
+            {'id': 1.0, 'items': [], 'extra': [1, {'a': [None, True, 'x\\u0441']}]},
+        ):
+            buf = json.dumps(document).encode('utf-8')
+            self.assertEqual(stream.parse(buf, self.schema), json.loads(buf))
+            self.assertEqual(stream.parse(memoryview(buf), self.schema), json.loads(buf))
+            self.assertEqual(self.schema.validate_bytes(buf), document)
+
+    def test_stops_on_first_violation(self):
+        # the rest of the buffer is not even valid JSON, so parser must stop before it
+        self.assertError(b'[1, 2', 'value type list is not allowed')
+        self.assertError(b'{"customer": {"age": 10, ', {'customer': {'age': 'age is not allowed key'}})
+        self.assertError(
+            b'{"customer": {"name": "Alexander"}, ',
+            {'customer': {'name': 'String is longer than 5 characters'}},
+        )
+        self.assertError(b'{"items": [{}, {}, {', {'items': 'list length is greater than 2'})
+        self.assertError(b'{"items": [{"sku": 10}, ', {'items': {0: {'sku': 'value type int is not allowed'}}})
+
+    def test_full_validation_after_parse(self):
+        with self.assertRaises(t.DataError):
+            self.schema.validate_bytes(b'{"items": []}')
+
+    def test_invalid_json(self):
+        for buf in (b'', b'{"id": 1', b'{"id" 1}', b'{"id": 1} 2', b'[1 2]'):
+            with self.assertRaises(t.DataError):
+                stream.parse(buf, self.schema)
+
+    def test_max_depth(self):
+        check = trafaret_schema.json_schema({})
+        self.assertEqual(check.validate_bytes(b'[[[1]]]', max_depth=3), [[[1]]])
+        with self.assertRaises(t.DataError):
+            check.validate_bytes(b'[[[[1', max_depth=3)
+
+
+class TestBooleanSchema(unittest.TestCase):
+    def test_additional_properties_false(self):
+        check = trafaret_schema.json_schema({
+            'properties': {'a': {'type': 'string'}},
+            'additionalProperties': False,
+        })
+        self.assertEqual(check({'a': 'x'}), {'a': 'x'})
+        with self.assertRaises(t.DataError):
+            check({'a': 'x', 'b': 1})
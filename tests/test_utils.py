@@ -6,6 +6,7 @@ from trafaret_schema.utils import (
     Pattern,
     all_strings_unique,
 )
+from trafaret_schema.patterns import PatternPool, pool
 
 
 RE_TYPE = type(re.compile('__stub__'))
@@ -24,3 +25,28 @@ def test_all_strings_uniq():
 
     with pytest.raises(t.DataError):
         all_strings_unique(['a', 'a', 'a'])
+
+
+@pytest.mark.parametrize('pattern', [
+    'abc', '^abc', '^abc$', 'abc$', '', '^$', '.*abc', '.*abc$',
+    '[0-9]+$', '^\\d+$', '[a-z]*$', '[A-Z]+$', '^[a-zA-Z0-9]+$', 'a+b', '(ab)+',
+])
+@pytest.mark.parametrize('value', [
+    '', 'abc', 'abcd', 'xabc', 'abc\n', 'x\nabc', '123', '12a', '٣', '²', 'ABC', 'aB', 'ab', 'abab',
+])
+def test_fast_check_matches_regexp(pattern, value):
+    assert pool.matcher(pattern).match(value) == (re.match(pattern, value) is not None)
+
+
+def test_pattern_pool():
+    pool = PatternPool(maxsize=2)
+    assert pool.matcher('a+') is pool.matcher('a+')
+    assert pool.matcher('abc').fast is not None
+    assert pool.matcher('a+').fast is None
+    pool.compile('b+')
+    pool.compile('c+')
+    stats = pool.stats()
+    assert stats['size'] == 2
+    assert stats['hits'] == 2
+    assert stats['misses'] == 4
+    assert stats['evictions'] == 2
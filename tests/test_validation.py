@@ -263,6 +263,8 @@ class TestObjects(unittest.TestCase):
         })
         with self.assertRaises(t.DataError):
             check({'a': 1})
+        with self.assertRaises(t.DataError):
+            check(None)
         self.assertEqual(check({'a': 1, 'b': 2}), {'a': 1, 'b': 2})
 
     def test_properties(self):
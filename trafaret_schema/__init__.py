@@ -1,21 +1,50 @@
-import re
+import gc
+import itertools
+import threading
+import time
 import weakref
-from uuid import uuid4
 
 import trafaret as t
 
 from .utils import (
     then,
     just,
-    Any,
-    All,
-    Not,
     Pattern,
     unique_strings_list,
     ensure_list,
 )
 from .decimal import Decimal
-from .format import format_trafaret
+from .engine import validate, Budget, BudgetExceeded  # noqa: F401
+from .nodes import (
+    All,
+    Any,
+    Not,
+    Schema,
+    Nothing,
+    NO_DEFAULT,
+    Enum,
+    StringLength,
+    ArrayLength,
+    UniqueItems,
+    ObjectSize,
+    Required,
+    Contains,
+    PropertyNames,
+    Items,
+    Properties,
+    Ref,
+    deep_sizeof,
+)
+from .patterns import pool, PatternMatch
+from .number import (
+    Number,
+    Integer,
+    Maximum,
+    ExclusiveMaximum,
+    Minimum,
+    ExclusiveMinimum,
+    MultipleOf,
+)
 
 
 __VERSION__ = (0, 2, 1)
@@ -23,123 +52,38 @@ __VERSION__ = (0, 2, 1)
 
 check_number = t.OnError(t.Float() | Decimal(), 'Not a number')
 
-json_schema_type = (
-    t.Atom('null') & just(t.Null())
-    | t.Atom('boolean') & just(t.Bool())
-    | t.Atom('object') & just(t.Type(dict))
-    | t.Atom('array') & just(t.Type(list))
-    | t.Atom('number') & just(check_number)
-    | t.Atom('integer') & just(t.Int())
-    | t.Atom('string') & just(t.String())
-)
+
+def numbers_mode(coerce, strict):
+    """Picks keyword trafaret by `Register.strict_numbers` option"""
+    def create(value, context=None):
+        if context.get_register().strict_numbers:
+            return strict(value)
+        return coerce(value)
+    return create
 
 
-def multipleOf(multiplier):
-    def check(value):
-        if value % multiplier != 0:
-            return t.DataError('%s is not devisible by %s' % (value, multiplier))
-        return value
-    return check
+ANY = t.Any()
 
 
-def uniq(lst):
-    if len(set(lst)) < len(lst):
-        return t.DataError('Array elements are not uniq')
-    return lst
+def one_or_any(trafarets):
+    if len(trafarets) == 1:
+        return trafarets[0]
+    return Any(trafarets)
 
 
 def required(names):
-    def check(value):
-        errors = {}
-        for name in names:
-            if name not in value:
-                errors[name] = t.DataError('%s is required' % name)
-        if errors:
-            return t.DataError(errors)
-        return value
-    return check
+    return Required(names)
 
 
 def contains(trafaret):
-    def check(data):
-        for v in data:
-            try:
-                trafaret(v)
-            except t.DataError:
-                pass
-            else:
-                return data
-        raise t.DataError('Array does not contains any value that completes test')
-    return check
+    return Contains(trafaret)
 
 
 def property_names(trafaret):
-    checker = t.List(trafaret)
-
-    def check(data):
-        return checker(list(data.keys()))
-
-    return check
-
-
-# simple keys that does not provide $ref headache
-keywords = (
-    t.Key('enum', optional=True, trafaret=t.List(t.Any) & (lambda consts: t.Or(*(t.Atom(cnst) for cnst in consts)))),
-    t.Key('const', optional=True, trafaret=t.Any() & then(t.Atom)),
-    t.Key('type', optional=True, trafaret=ensure_list(json_schema_type) & then(Any)),
-
-    # number validation
-    t.Key('multipleOf', optional=True, trafaret=t.Float(gt=0) & then(multipleOf)),
-    t.Key('maximum', optional=True, trafaret=t.Float() & (lambda maximum: t.Float(lte=maximum))),
-    t.Key('exclusiveMaximum', optional=True, trafaret=t.Float() & (lambda maximum: t.Float(lt=maximum))),
-    t.Key('minimum', optional=True, trafaret=t.Float() & (lambda minimum: t.Float(gte=minimum))),
-    t.Key('exclusiveMinimum', optional=True, trafaret=t.Float() & (lambda minimum: t.Float(gt=minimum))),
-
-    # string
-    t.Key('maxLength', optional=True, trafaret=t.Int(gte=0) & (lambda length: t.String(max_length=length))),
-    t.Key('minLength', optional=True, trafaret=t.Int(gte=0) & (lambda length: t.String(min_length=length))),
-    t.Key('pattern', optional=True, trafaret=Pattern() & (lambda pattern: t.Regexp(pattern))),
-
-    # array
-    t.Key('maxItems', optional=True, trafaret=t.Int(gte=0) & (lambda length: t.List(t.Any, max_length=length))),
-    t.Key('minItems', optional=True, trafaret=t.Int(gte=0) & (lambda length: t.List(t.Any, min_length=length))),
-    t.Key(
-        'uniqueItems',
-        optional=True,
-        trafaret=t.Bool() & (lambda need_check: t.List(t.Any) & uniq if need_check else t.Any)
-    ),
-
-    # object
-    t.Key(
-        'maxProperties',
-        optional=True,
-        trafaret=(
-            t.Int(gte=0)
-            & (lambda max_props: (
-                t.Type(dict)
-                & (lambda props: props if len(props) <= max_props else t.DataError('Too many properties'))
-            ))
-        )
-    ),
-    t.Key(
-        'minProperties',
-        optional=True,
-        trafaret=(
-            t.Int(gte=0)
-            & (lambda min_props: (
-                t.Type(dict)
-                & (lambda props: props if len(props) >= min_props else t.DataError('Too few properties'))
-            ))
-        )
-    ),
-    t.Key('required', optional=True, trafaret=unique_strings_list & required),
-
-    t.Key('format', optional=True, trafaret=format_trafaret),
-)
+    return PropertyNames(trafaret)
 
 
-def subdict(name, *keys, **kw):
-    trafaret = kw.pop('trafaret')  # coz py2k
+def subdict(name, *keys, trafaret):
 
     def inner(data, context=None):
         errors = False
@@ -166,113 +110,411 @@ def subdict(name, *keys, **kw):
 def check_array(items=[], additionalItems=None):
     if len(items) == 1:
         return t.List(items[0])
-
-    def inner(data):
-        errors = {}
-        values = []
-        for index, schema in enumerate(items):
-            try:
-                value = schema(data[index])
-                values.append(value)
-            except t.DataError as de:
-                errors[index] = de
-            except IndexError:
-                errors[index] = t.DataError('value with this index is required')
-        if len(items) < len(data):
-            if additionalItems:
-                for index in range(len(items), len(data)):
-                    try:
-                        value = additionalItems(data[index])
-                        values.append(value)
-                    except t.DataError as de:
-                        errors[index] = de
-            else:
-                raise t.DataError('Too many items in array')
-        if errors:
-            raise t.DataError(errors)
-        return values
-    return inner
-
-
-def pattern_key(regexp_str, trafaret):
-    regexp = re.compile(regexp_str)
-
-    def inner(data, context=None):
-        for k, v in data.items():
-            if regexp.match(k):
-                yield k, t.catch(trafaret, v, context=context), (k,)
-    return inner
+    return Items(items, additionalItems)
 
 
 def check_object(properties={}, patternProperties={}, additionalProperties=None, dependencies={}):
-    keys = []
-    for name, trafaret in properties.items():
-        keys.append(t.Key(name, optional=True, trafaret=trafaret))
-    for pattern, trafaret in patternProperties.items():
-        keys.append(pattern_key(pattern, trafaret))
-    additionals_trafaret = additionalProperties or t.Any
-    dict_trafaret = t.Dict(*keys, allow_extra='*', allow_extra_trafaret=additionals_trafaret)
-
-    def inner(data, context=None):
-        errors = {}
-        try:
-            value = dict_trafaret(data, context=context)
-        except t.DataError:
-            raise
-        for k, schema in dependencies.items():
-            if k not in value:
-                continue
-            try:
-                schema(value)
-            except t.DataError as de:
-                errors.update(de.as_dict())
-        if errors:
-            raise t.DataError(errors)
-        return value
-
-    return inner
+    return Properties(
+        properties.items(),
+        [(pool.matcher(pattern), trafaret) for pattern, trafaret in patternProperties.items()],
+        additionalProperties,
+        dependencies.items(),
+    )
+
+
+# subschemas with this keys depend on the place in the document, so they are not interned
+PATH_SENSITIVE = frozenset(('$ref', '$id', 'definitions'))
+
+
+def intern_keys(value, shapes, keys):
+    """
+    Puts intern keys of dicts of `value` to `keys` by dict id and returns key of `value`. Key of a dict
+    is a number that `shapes` gives to its items with keys of nested values, so every dict is looked at
+    once. Dicts with `PATH_SENSITIVE` keys, dicts around them and not JSON values get None.
+    """
+    typ = type(value)
+    if typ is dict:
+        if id(value) in keys:  # same dict in many places
+            return keys[id(value)]
+        items = []
+        internable = True
+        for name, item in value.items():
+            key = intern_keys(item, shapes, keys)
+            if key is None or type(name) is not str or name in PATH_SENSITIVE:
+                internable = False
+            elif internable:
+                items.append((name, key))
+        key = shapes(tuple(sorted(items))) if internable else None
+        keys[id(value)] = key
+        return key
+    if typ is list or typ is tuple:
+        nested = tuple(intern_keys(item, shapes, keys) for item in value)
+        return None if None in nested else ('list', nested)
+    if typ is str or typ is int or typ is float or typ is bool or value is None:
+        # `1`, `1.0` and `True` compile to different checks
+        return (typ.__name__, value)
+    return None
+
+
+def used_formats(document):
+    """Names of formats a schema document may use, values of data keywords can give extra names"""
+    names = set()
+    stack = [document]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if isinstance(node.get('format'), str):
+                names.add(node['format'])
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return frozenset(names)
 
 
 class Register(object):
-    def __init__(self):
+    """
+    Registry of compiled schemas and custom formats. Register with `parent` is an overlay, it uses schemas
+    and formats of the parent and compiles only own schemas and formats and inherited schemas that
+    depend on them through `$ref` or `format`, see `overlay`.
+    """
+    def __init__(self, intern=True, strict_numbers=False, resolvers=(), poll_interval=None, metrics=None,
+                 parent=None):
+        self.parent = parent
         self.schemas = {}
         self.custom_formats = {}
+        self.resolvers = list(resolvers)
+        self.poll_interval = poll_interval
+        self.polled = time.time()
+        self.strict_numbers = strict_numbers
+        self.intern = intern
+        self.interned = {}
+        # intern key to number of published schemas that use it, entries nobody uses are dropped on reload
+        self.intern_users = {}
+        # dict shapes of interned subschemas to numbers, see `intern_keys`
+        self.shapes = {}
+        self.shape_numbers = itertools.count()
+        self.reused = 0
+        self.metrics = metrics
+        # schema id to ids of schemas that have `$ref`s into it
+        self.dependents = {}
+        # format name to ids of schemas that use it
+        self.format_users = {}
+        self.frozen = False
+        # registry dicts are copied on write under lock, so readers never see them half updated
+        self.lock = threading.RLock()
 
     def reg_schema(self, name):
-        self.schemas[name] = SchemaRegister(name, self)
-        return self.schemas[name]
+        return self.publish(SchemaRegister(name, self))
+
+    def publish(self, schema_register):
+        name = schema_register.name
+        with self.lock:
+            if self.frozen:
+                raise RuntimeError('Register is frozen, schema %s can not be added' % name)
+            replaced = self.schemas.get(name)
+            schemas = dict(self.schemas)
+            schemas[name] = schema_register
+            dependents = dict(self.dependents)
+            format_users = dict(self.format_users)
+            if replaced is not None:
+                # reloaded schema may not refer to some schemas or use some formats anymore
+                for index, names in ((dependents, replaced.targets()), (format_users, replaced.formats)):
+                    for key in names:
+                        users = index.get(key, frozenset()) - frozenset((name,))
+                        if users:
+                            index[key] = users
+                        else:
+                            index.pop(key, None)
+            for key in schema_register.interned_keys:
+                self.intern_users[key] = self.intern_users.get(key, 0) + 1
+            if replaced is not None and replaced is not schema_register:
+                self.release_interned(replaced.interned_keys)
+            for target in schema_register.targets():
+                dependents[target] = dependents.get(target, frozenset()) | frozenset((name,))
+            for format_name in schema_register.formats:
+                format_users[format_name] = format_users.get(format_name, frozenset()) | frozenset((name,))
+            self.schemas = schemas
+            self.dependents = dependents
+            self.format_users = format_users
+        return schema_register
+
+    def overlay(self, **options):
+        """
+        Returns register that inherits compiled schemas and formats of this one. Schemas compiled and formats
+        registered in the overlay replace inherited ones only in it, inherited schemas that refer to them
+        are compiled again in the overlay, the rest are shared with this register.
+        """
+        options.setdefault('intern', self.intern)
+        options.setdefault('strict_numbers', self.strict_numbers)
+        return Register(parent=self, **options)
+
+    def lookup(self, schema_id):
+        """Returns `SchemaRegister` of schema id from this register or its parents, or None"""
+        schema_register = self.schemas.get(schema_id)
+        if schema_register is None and self.parent is not None:
+            return self.parent.lookup(schema_id)
+        return schema_register
+
+    def dependents_of(self, schema_id):
+        dependents = self.dependents.get(schema_id, frozenset())
+        if self.parent is not None:
+            dependents = dependents | self.parent.dependents_of(schema_id)
+        return dependents
+
+    def users_of_format(self, name):
+        users = self.format_users.get(name, frozenset())
+        if self.parent is not None:
+            users = users | self.parent.users_of_format(name)
+        return users
+
+    def localize(self, schema_ids=(), formats=()):
+        """
+        Compiles again in this overlay inherited schemas that refer to `schema_ids` and all schemas that use
+        `formats`, then inherited schemas that refer to compiled ones, returns their ids.
+        """
+        pending = [(dependent, False) for schema_id in schema_ids for dependent in self.dependents_of(schema_id)]
+        for name in formats:
+            pending.extend((user, True) for user in self.users_of_format(name))
+        done = set(schema_ids)
+        compiled = []
+        while pending:
+            schema_id, force = pending.pop()
+            if schema_id in done or schema_id in self.schemas and not force:
+                continue
+            done.add(schema_id)
+            schema_register = self.lookup(schema_id)
+            if schema_register is None or schema_register.document is None:
+                continue
+            self.publish(self.build(schema_register.document, name=schema_id))
+            compiled.append(schema_id)
+            pending.extend((dependent, False) for dependent in self.dependents_of(schema_id))
+        return compiled
+
+    def build(self, schema, name=None):
+        """Compiles schema into new `SchemaRegister` without publishing it"""
+        from uuid import uuid4
+        compilation = Compilation(SchemaRegister(name or schema.get('$id') or uuid4().urn, self))
+        schema_trafaret = compile_schema(schema, context=compilation)
+        compilation.schemas['#'] = schema_trafaret
+        schema_register = compilation.finish()
+        schema_register.document = schema
+        schema_register.formats = used_formats(schema)
+        return schema_register
+
+    def compile(self, schema, name=None):
+        schema_register = self.publish(self.build(schema, name=name))
+        if self.parent is not None:
+            self.localize([schema_register.name])
+        return schema_register.get_schema('#')
+
+    def reload(self, schema_id, document):
+        """
+        Recompiles one schema and swaps it in, other schemas are not recompiled. `$ref`s are resolved
+        by schema id on use, so schemas that refer to the new one use it at once, references of them are
+        checked before the swap. Validations that already resolved a `$ref` into the old schema keep using
+        it till the end. Returns ids of dependent schemas.
+        """
+        schema_register = self.build(document, name=schema_id)
+        with self.lock:
+            dependents = self.dependents.get(schema_id, frozenset())
+            for dependent in dependents:
+                if dependent == schema_id or dependent not in self.schemas:
+                    continue
+                for reference in self.schemas[dependent].references:
+                    target, _, local = reference.partition('#')
+                    if target == schema_id and '#' + local not in schema_register.schemas:
+                        raise t.DataError('Bad reference `%s` in schema %s' % (reference, dependent))
+            self.publish(schema_register)
+            if self.parent is not None:
+                self.localize([schema_id])
+        return dependents
 
     def get_schema(self, ref):
-        schema_id, reference = ref.split('#', 1)
-        if schema_id not in self.schemas:
-            raise t.DataError('Bad reference `%s` in schema' % ref)
-        return self.schemas[schema_id].get_schema('#' + reference)
+        schema_id, _, reference = ref.partition('#')
+        if self.poll_interval is not None and time.time() - self.polled > self.poll_interval:
+            with self.lock:  # one thread refreshes, the others see new `polled` after it
+                if self.poll_interval is not None and time.time() - self.polled > self.poll_interval:
+                    self.refresh()
+        schema_register = self.lookup(schema_id)
+        if schema_register is None:
+            self.resolve(schema_id, ref)
+            schema_register = self.lookup(schema_id)
+        return schema_register.get_schema('#' + reference)
+
+    def validate_by(self, ref, value, **options):
+        """Validates `value` by registered schema, it is counted in `metrics` by schema id if they are set"""
+        schema = self.get_schema(ref)
+        if self.metrics is None:
+            return schema.validate(value, **options)
+        return self.metrics.observe(ref.partition('#')[0], schema, value, options)
+
+    def add_resolver(self, resolver):
+        self.resolvers.append(resolver)
+
+    def resolve(self, schema_id, ref=None):
+        with self.lock:  # other threads wait for the first one to load schema
+            if self.lookup(schema_id) is not None:
+                return self.lookup(schema_id).get_schema('#')
+            for resolver in () if self.frozen else self.resolvers:
+                document = resolver(schema_id)
+                if document is not None:
+                    return self.load_schema(schema_id, document)
+            if self.parent is not None:
+                return self.parent.resolve(schema_id, ref)
+        raise t.DataError('Bad reference `%s` in schema' % (ref or schema_id))
+
+    def load_schema(self, schema_id, document):
+        return self.compile(document, name=schema_id)
+
+    def refresh(self):
+        """Recompiles resolved schemas whose files were changed, returns their ids"""
+        self.polled = time.time()
+        reloaded = []
+        for resolver in self.resolvers:
+            changed = getattr(resolver, 'changed', None)
+            for schema_id in (changed() if changed else ()):
+                document = resolver(schema_id)
+                if document is not None:
+                    self.reload(schema_id, document)
+                    reloaded.append(schema_id)
+        return reloaded
 
     def validate_references(self):
         for schema in self.schemas.values():
             schema.validate_references()
 
+    def freeze(self, gc_freeze=True):
+        """
+        Prepares register to be shared by forked workers: loads every referenced schema, builds what is
+        built on first use and forbids changes, so workers do not write to pages of compiled schemas
+        except for reference counts. With `gc_freeze` all objects that exist now go to the permanent
+        generation (`gc.freeze`), so collections in workers do not touch them. Call it after all
+        registers are built, right before fork.
+        """
+        meta_schema()
+        try:
+            import arrow  # noqa: F401, date formats import it on the first check
+        except ImportError:
+            pass
+        with self.lock:
+            loaded = None
+            while loaded != len(self.schemas):  # loaded schemas can refer to more schemas
+                loaded = len(self.schemas)
+                self.validate_references()
+            self.frozen = True
+            self.poll_interval = None
+            self.interned = {}
+            self.intern_users = {}
+            self.shapes = {}
+        if gc_freeze and hasattr(gc, 'freeze'):
+            gc.collect()
+            gc.freeze()
+
     def get_format(self, name):
-        return self.custom_formats.get(name)
+        custom_format = self.custom_formats.get(name)
+        if custom_format is None and self.parent is not None:
+            return self.parent.get_format(name)
+        return custom_format
 
     def reg_format(self, name, trafaret):
-        self.custom_formats[name] = trafaret
+        if self.frozen:
+            raise RuntimeError('Register is frozen, format %s can not be added' % name)
+        with self.lock:
+            self.custom_formats[name] = trafaret
+            # interned subschemas can hold the old format
+            self.interned = {}
+            self.intern_users = {}
+        if self.parent is not None:
+            self.localize(formats=[name])
 
     def get_register(self):
         return self
 
+    def memory_report(self):
+        """
+        Size of compiled trees of every registered schema, objects shared by schemas are counted in each of
+        them and once in `total`.
+        """
+        skip = (Register, SchemaRegister)
+        report = {}
+        for schema_id, schema_register in self.schemas.items():
+            count, size = deep_sizeof(schema_register.schemas.values(), skip=skip)
+            report[schema_id] = {'objects': count, 'bytes': size}
+        count, size = deep_sizeof(
+            [schema for schema_register in self.schemas.values() for schema in schema_register.schemas.values()],
+            skip=skip,
+        )
+        return {'schemas': report, 'total': {'objects': count, 'bytes': size}}
+
+    def shape(self, items):
+        with self.lock:
+            number = self.shapes.get(items)
+            if number is None:
+                # numbers are not reused after shapes are dropped, so old keys never match new shapes
+                number = self.shapes[items] = next(self.shape_numbers)
+            return number
+
+    def release_interned(self, keys):
+        """
+        Drops interned subschemas of a replaced schema that no published schema uses, and shapes that
+        no kept key is made of, so reloads do not keep old compiled trees alive.
+        """
+        with self.lock:
+            for key in keys:
+                users = self.intern_users.get(key, 0) - 1
+                if users > 0:
+                    self.intern_users[key] = users
+                else:
+                    self.intern_users.pop(key, None)
+            # entries of builds that were never published are dropped too
+            self.interned = dict(
+                (key, interned) for key, interned in self.interned.items() if key in self.intern_users
+            )
+            items_of = dict((number, items) for items, number in self.shapes.items())
+            kept = set()
+            pending = list(self.interned)
+            while pending:
+                key = pending.pop()
+                if type(key) is int:
+                    if key not in kept and key in items_of:
+                        kept.add(key)
+                        pending.extend(nested for name, nested in items_of[key])
+                elif key[0] == 'list':
+                    pending.extend(key[1])
+            self.shapes = dict((items, number) for items, number in self.shapes.items() if number in kept)
+
+    def add_interned(self, key, schema_trafaret, saved):
+        with self.lock:
+            self.interned.setdefault(key, (schema_trafaret, saved))
+
+    def get_interned(self, key):
+        with self.lock:
+            interned = self.interned.get(key)
+            if interned is not None:
+                self.reused += 1
+            return interned
+
+    def intern_stats(self):
+        compiled = len(self.interned)
+        total = compiled + self.reused
+        return {
+            'compiled': compiled,
+            'reused': self.reused,
+            'ratio': float(self.reused) / total if total else 0.0,
+        }
+
 
 class SchemaRegister(object):
     def __init__(self, name, register):
         self.name = name
-        self.current_path = []
         self.schemas = {}
-        self.references = set()
+        self.references = frozenset()
         self.register = weakref.ref(register)
-
-    def save_schema(self, schema):
-        assert self.str_path() not in self.schemas
-        self.schemas[self.str_path()] = schema
+        # source document and names of formats it uses, to compile it again in overlays
+        self.document = None
+        self.formats = frozenset()
+        # intern keys of subschemas compiled or reused by this schema, see `Register.release_interned`
+        self.interned_keys = frozenset()
 
     def get_schema(self, ref):
         if ref.startswith('#'):  # local reference
@@ -283,13 +525,74 @@ class SchemaRegister(object):
         else:
             return self.register().get_schema(ref)
 
-    def reg_reference(self, ref):
-        self.references.add(ref)
-
     def validate_references(self):
         for reference in self.references:
             self.get_schema(reference)
 
+    def targets(self):
+        """Ids of other schemas this one refers to"""
+        return set(
+            reference.partition('#')[0]
+            for reference in self.references
+            if not reference.startswith('#') and reference.partition('#')[0] != self.name
+        )
+
+    def get_register(self):
+        return self.register()
+
+
+class Compilation(object):
+    """
+    State of one schema compilation. It is the `context` of meta schema trafarets, so threads
+    compiling into one `Register` never share it. Compiled subschemas go to `SchemaRegister`
+    only in `finish`.
+    """
+    def __init__(self, schema_register):
+        self.schema_register = schema_register
+        self.current_path = []
+        self.schemas = {}
+        # `(path, schema)` in order of saving, interned subschemas keep ranges of it
+        self.saved = []
+        self.references = set()
+        self.keys = {}
+        self.interned_keys = set()
+
+    def finish(self):
+        schema_register = self.schema_register
+        schemas = dict(schema_register.schemas)
+        schemas.update(self.schemas)
+        schema_register.schemas = schemas
+        schema_register.references = schema_register.references | self.references
+        schema_register.interned_keys = schema_register.interned_keys | self.interned_keys
+        return schema_register
+
+    def save_schema(self, schema):
+        path = self.str_path()
+        assert path not in self.schemas
+        self.schemas[path] = schema
+        self.saved.append((path, schema))
+
+    def saved_below(self, since):
+        """Subschemas saved since `since`, all of them are below current path"""
+        return self.saved, since, len(self.saved), len(self.str_path())
+
+    def restore_below(self, saved):
+        entries, start, end, length = saved
+        prefix = self.str_path()
+        for index in range(start, end):
+            path, schema = entries[index]
+            path = prefix + path[length:]
+            self.schemas[path] = schema
+            self.saved.append((path, schema))
+
+    def intern_key(self, schema):
+        if id(schema) not in self.keys:
+            intern_keys(schema, self.get_register().shape, self.keys)
+        return self.keys[id(schema)]
+
+    def reg_reference(self, ref):
+        self.references.add(ref)
+
     def str_path(self):
         return '#/' + '/'.join(path for path in self.current_path)
 
@@ -301,7 +604,7 @@ class SchemaRegister(object):
             self.current_path.pop()
 
     def get_register(self):
-        return self.register()
+        return self.schema_register.get_register()
 
 
 def deep_schema(key):
@@ -356,96 +659,208 @@ def deep_schema_mapping(path, key_trafaret):
 
 
 def ref_field(reference, context=None):
-    register = context
-    register.reg_reference(reference)
-
-    def inner(value, context=None):
-        schema = register.get_schema(reference)
-        return schema(value, context=context)
-
-    return inner
+    compilation = context
+    compilation.reg_reference(reference)
+    return Ref(reference, compilation.schema_register)
 
 
 json_schema = t.Forward()
 
 noop = just(t.Any())
 
-metadata = (
-    t.Key('$id', optional=True, trafaret=t.URL & noop),
-    t.Key('$schema', optional=True, trafaret=t.URL & noop),
-    t.Key('$ref', optional=True, trafaret=t.String & ref_field),
-    t.Key('title', optional=True, trafaret=t.String & noop),
-    t.Key('description', optional=True, trafaret=t.String & noop),
-    t.Key('definitions', optional=True, trafaret=deep_schema_mapping('definitions', t.String()) & noop),
-    t.Key('examples', optional=True, trafaret=t.List(t.Any) & noop),
-    t.Key('default', optional=True, trafaret=t.Any & noop),
-)
 
-schema_keywords = (
-    # predicates
-    t.Key('allOf', optional=True, trafaret=t.List(json_schema) & then(All)),
-    t.Key('anyOf', optional=True, trafaret=t.List(json_schema) & then(Any)),
-    t.Key('oneOf', optional=True, trafaret=t.List(json_schema) & then(Any)),
-    t.Key('not', optional=True, trafaret=json_schema & then(Not)),
-    # array
-    t.Key('contains', optional=True, trafaret=deep_schema('contains') & then(contains)),
-    subdict(
-        'array',
-        t.Key('items', optional=True, trafaret=ensure_list(json_schema)),
-        t.Key('additionalItems', optional=True, trafaret=json_schema),
-        trafaret=check_array,
-    ),
-    # object
-    t.Key('propertyNames', optional=True, trafaret=deep_schema('propertyNames') & then(property_names)),
-    subdict(
-        'object',
-        t.Key('properties', optional=True, trafaret=deep_schema_mapping('properties', t.String())),
-        t.Key('patternProperties', optional=True, trafaret=deep_schema_mapping('patternProperties', Pattern())),
-        t.Key('additionalProperties', optional=True, trafaret=deep_schema('additionalProperties')),
+def build_meta_schema():
+    from .format import format_trafaret
+
+    json_schema_type = (
+        t.Atom('null') & just(t.Null())
+        | t.Atom('boolean') & just(t.Bool())
+        | t.Atom('object') & just(t.Type(dict))
+        | t.Atom('array') & just(t.Type(list))
+        | t.Atom('number') & numbers_mode(just(check_number), just(Number()))
+        | t.Atom('integer') & numbers_mode(just(t.Int()), just(Integer()))
+        | t.Atom('string') & just(t.String())
+    )
+
+    # simple keys that does not provide $ref headache
+    keywords = (
+        t.Key('enum', optional=True, trafaret=t.List(t.Any) & then(Enum)),
+        t.Key('const', optional=True, trafaret=t.Any() & then(t.Atom)),
+        t.Key('type', optional=True, trafaret=ensure_list(json_schema_type) & then(one_or_any)),
+
+        # number validation
         t.Key(
-            'dependencies',
+            'multipleOf',
             optional=True,
-            trafaret=t.Mapping(t.String, unique_strings_list & required | deep_schema('dependencies'))
+            trafaret=t.Float(gt=0) & numbers_mode(lambda multiplier: MultipleOf(multiplier, coerce=True), MultipleOf),
+        ),
+        t.Key(
+            'maximum',
+            optional=True,
+            trafaret=t.Float() & numbers_mode(lambda maximum: t.Float(lte=maximum), Maximum),
+        ),
+        t.Key(
+            'exclusiveMaximum',
+            optional=True,
+            trafaret=t.Float() & numbers_mode(lambda maximum: t.Float(lt=maximum), ExclusiveMaximum),
+        ),
+        t.Key(
+            'minimum',
+            optional=True,
+            trafaret=t.Float() & numbers_mode(lambda minimum: t.Float(gte=minimum), Minimum),
+        ),
+        t.Key(
+            'exclusiveMinimum',
+            optional=True,
+            trafaret=t.Float() & numbers_mode(lambda minimum: t.Float(gt=minimum), ExclusiveMinimum),
         ),
-        trafaret=check_object,
-    ),
-)
+
+        # string
+        t.Key('maxLength', optional=True, trafaret=t.Int(gte=0) & (lambda length: StringLength(max_length=length))),
+        t.Key('minLength', optional=True, trafaret=t.Int(gte=0) & (lambda length: StringLength(min_length=length))),
+        t.Key('pattern', optional=True, trafaret=Pattern() & then(PatternMatch)),
+
+        # array
+        t.Key('maxItems', optional=True, trafaret=t.Int(gte=0) & (lambda length: ArrayLength(max_length=length))),
+        t.Key('minItems', optional=True, trafaret=t.Int(gte=0) & (lambda length: ArrayLength(min_length=length))),
+        t.Key('uniqueItems', optional=True, trafaret=t.Bool() & (lambda check: UniqueItems() if check else ANY)),
+
+        # object
+        t.Key('maxProperties', optional=True, trafaret=t.Int(gte=0) & (lambda size: ObjectSize(max_props=size))),
+        t.Key('minProperties', optional=True, trafaret=t.Int(gte=0) & (lambda size: ObjectSize(min_props=size))),
+        t.Key('required', optional=True, trafaret=unique_strings_list & required),
+
+        t.Key('format', optional=True, trafaret=format_trafaret),
+    )
+
+    metadata = (
+        t.Key('$id', optional=True, trafaret=t.URL & noop),
+        t.Key('$schema', optional=True, trafaret=t.URL & noop),
+        t.Key('$ref', optional=True, trafaret=t.String & ref_field),
+        t.Key('title', optional=True, trafaret=t.String & noop),
+        t.Key('description', optional=True, trafaret=t.String & noop),
+        t.Key('definitions', optional=True, trafaret=deep_schema_mapping('definitions', t.String()) & noop),
+        t.Key('examples', optional=True, trafaret=t.List(t.Any) & noop),
+        t.Key('default', optional=True, trafaret=t.Any()),
+    )
+
+    schema_keywords = (
+        # predicates
+        t.Key('allOf', optional=True, trafaret=t.List(json_schema) & then(All)),
+        t.Key('anyOf', optional=True, trafaret=t.List(json_schema) & then(Any)),
+        t.Key('oneOf', optional=True, trafaret=t.List(json_schema) & then(Any)),
+        t.Key('not', optional=True, trafaret=json_schema & then(Not)),
+        # array
+        t.Key('contains', optional=True, trafaret=deep_schema('contains') & then(contains)),
+        subdict(
+            'array',
+            t.Key('items', optional=True, trafaret=ensure_list(json_schema)),
+            t.Key('additionalItems', optional=True, trafaret=json_schema),
+            trafaret=check_array,
+        ),
+        # object
+        t.Key('propertyNames', optional=True, trafaret=deep_schema('propertyNames') & then(property_names)),
+        subdict(
+            'object',
+            t.Key('properties', optional=True, trafaret=deep_schema_mapping('properties', t.String())),
+            t.Key('patternProperties', optional=True, trafaret=deep_schema_mapping('patternProperties', Pattern())),
+            t.Key('additionalProperties', optional=True, trafaret=deep_schema('additionalProperties')),
+            t.Key(
+                'dependencies',
+                optional=True,
+                trafaret=t.Mapping(t.String, unique_strings_list & required | deep_schema('dependencies'))
+            ),
+            trafaret=check_object,
+        ),
+    )
+
+    return {
+        'json_schema_type': json_schema_type,
+        'format_trafaret': format_trafaret,
+        'keywords': keywords,
+        'metadata': metadata,
+        'schema_keywords': schema_keywords,
+        'all_keywords': metadata + keywords + schema_keywords,
+    }
+
+
+META_SCHEMA = None
+META_SCHEMA_LOCK = threading.Lock()
 
 
-all_keywords = () + metadata + keywords + schema_keywords
+def meta_schema():
+    """Keyword tables are built on the first compilation, so import of the package stays cheap"""
+    global META_SCHEMA
+    if META_SCHEMA is None:
+        with META_SCHEMA_LOCK:
+            if META_SCHEMA is None:
+                META_SCHEMA = build_meta_schema()
+    return META_SCHEMA
+
+
+def __getattr__(name):
+    # keyword tables used to be module attributes
+    if name in ('json_schema_type', 'format_trafaret', 'keywords', 'metadata', 'schema_keywords', 'all_keywords'):
+        return meta_schema()[name]
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
 
 
 def validate_schema(schema, context=None):
+    if isinstance(schema, bool):
+        return Schema(() if schema else (Nothing(),))
+    if not isinstance(schema, dict):
+        raise t.DataError('value is not dict', value=schema)
     # we use `context` to provide register to deep schemas
     if context is None or isinstance(context, Register):
         register = context or Register()
-        schema_name = schema.get('$id') or uuid4().urn
-        schema_register = register.reg_schema(schema_name)
+        return register.compile(schema)
     elif isinstance(context, SchemaRegister):
-        schema_register = context
-    else:
-        ValueError('You need to provide Register instance to json_schema and nothing else')
+        register = context.get_register()
+        return register.compile(schema, name=context.name)
+    elif not isinstance(context, Compilation):
+        raise ValueError('You need to provide Register instance to json_schema and nothing else')
+    register = context.get_register()
+    key = context.intern_key(schema) if register.intern else None
+    if key is None:
+        return compile_schema(schema, context=context)
+    # identical subschemas of one register share compiled trafaret
+    context.interned_keys.add(key)
+    interned = register.get_interned(key)
+    if interned is not None:
+        schema_trafaret, saved = interned
+        context.restore_below(saved)
+        return schema_trafaret
+    since = len(context.saved)
+    schema_trafaret = compile_schema(schema, context=context)
+    register.add_interned(key, schema_trafaret, context.saved_below(since))
+    return schema_trafaret
 
+
+def compile_schema(schema, context=None):
+    compilation = context
     touched_names = set()
     errors = {}
     keywords_checks = []
-    format_transform = t.Any
-    for key in all_keywords:
-        for k, v, names in key(schema, context=schema_register):
+    format_transform = None
+    default = NO_DEFAULT
+    for key in meta_schema()['all_keywords']:
+        for k, v, names in key(schema, context=compilation):
             if isinstance(v, t.DataError):
                 errors[k] = v
             else:
                 if k == 'format':
                     format_transform = v
-                keywords_checks.append(v)
+                elif k == 'default':
+                    default = v
+                else:
+                    keywords_checks.append(v)
             touched_names = touched_names.union(names)
     schema_keys = set(schema.keys())
     for key in schema_keys - touched_names:
         errors[key] = '%s is not allowed key' % key
     if errors:
         raise t.DataError(errors)
-    schema_trafaret = All(keywords_checks) & format_transform
-    return schema_trafaret
+    return Schema(keywords_checks, format_transform, default)
 
 
-json_schema << (t.Type(dict) & t.Call(validate_schema))
+json_schema << t.Call(validate_schema)
@@ -0,0 +1,240 @@
+"""
+Static analysis of compiled schemas to find the ones that are costly at runtime.
+
+    python -m trafaret_schema.analyze schemas/*.json --max-cost 1000
+
+Reports per schema: number of nodes, largest `anyOf`/`oneOf`/`type` fan-out, largest number of keywords
+in one subschema, regexps with catastrophic backtracking risk, `$ref` cycles and estimated relative
+cost of validation of one document. Exits with 1 if any limit is exceeded, so it can run in CI.
+"""
+import argparse
+import json
+import sys
+
+import trafaret as t
+
+from .nodes import (
+    All,
+    Any,
+    Not,
+    Schema,
+    Contains,
+    PropertyNames,
+    Items,
+    Properties,
+    Ref,
+)
+from .patterns import Matcher, PatternMatch
+
+try:
+    import re._parser as sre_parse
+except ImportError:  # before 3.11
+    import sre_parse
+
+
+# how many times we suppose array items and object values are validated per one container
+CONTAINER_FACTOR = 10
+REGEX_COST = 5
+BACKTRACKING_COST = 100
+RECURSION_COST = 100
+
+REPEATS = (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT)
+
+
+def regex_warnings(pattern):
+    """Finds nested unbounded quantifiers like `(a+)+` and quantified alternations like `(a|ab)*`"""
+    try:
+        parsed = sre_parse.parse(pattern)
+    except Exception:  # noqa pattern was checked on compile, parser internals may differ
+        return []
+    warnings = []
+
+    def visit(items, repeated):
+        for op, av in items:
+            if op in REPEATS:
+                low, high, sub = av
+                unbounded = high == sre_parse.MAXREPEAT or high > 1
+                if unbounded and repeated:
+                    warnings.append('nested quantifier in `%s`' % pattern)
+                visit(sub, repeated or unbounded)
+            elif op is sre_parse.SUBPATTERN:
+                visit(av[-1], repeated)
+            elif op is sre_parse.BRANCH:
+                if repeated and len(av[1]) > 1:
+                    warnings.append('quantified alternation in `%s`' % pattern)
+                for branch in av[1]:
+                    visit(branch, repeated)
+    visit(parsed, False)
+    return sorted(set(warnings))
+
+
+def children(node):
+    """Returns `(child, factor)` pairs, factor is how many times child is validated per node validation"""
+    if isinstance(node, Schema):
+        result = [(trafaret, 1) for trafaret in node.trafarets]
+        if node.format is not None:
+            result.append((node.format, 1))
+        return result
+    if isinstance(node, (All, Any)):
+        return [(trafaret, 1) for trafaret in node.trafarets]
+    if isinstance(node, Not):
+        return [(node.trafaret, 1)]
+    if isinstance(node, (Contains, PropertyNames)):
+        return [(node.trafaret, CONTAINER_FACTOR)]
+    if isinstance(node, Items):
+        result = [(trafaret, 1) for trafaret in node.items]
+        if node.additional is not None:
+            result.append((node.additional, CONTAINER_FACTOR))
+        return result
+    if isinstance(node, Properties):
+        result = [(trafaret, 1) for name, trafaret in node.properties]
+        result.extend((matcher, CONTAINER_FACTOR) for matcher, trafaret in node.patterns)
+        result.extend((trafaret, CONTAINER_FACTOR) for matcher, trafaret in node.patterns)
+        if node.additional is not None:
+            result.append((node.additional, CONTAINER_FACTOR))
+        result.extend((trafaret, 1) for name, trafaret in node.dependencies)
+        return result
+    if isinstance(node, t.List):
+        return [(node.trafaret, CONTAINER_FACTOR)]
+    if isinstance(node, t.And):
+        return [(node.trafaret, 1), (node.other, 1)]
+    if isinstance(node, t.Or):
+        return [(trafaret, 1) for trafaret in node.trafarets]
+    if isinstance(node, PatternMatch):
+        return [(node.matcher, 1)]
+    return []
+
+
+class Analysis(object):
+    def __init__(self):
+        self.nodes = 0
+        self.max_fanout = 0
+        self.max_keywords = 0
+        self.regex_warnings = []
+        self.cycles = []
+        self.unresolved = []
+        self.costs = {}
+
+    def cost(self, node, path=()):
+        """Relative cost of node, `path` is the chain of `(id(target), $ref)` that led here"""
+        if id(node) in self.costs:
+            return self.costs[id(node)][1]
+        if isinstance(node, Ref):
+            try:
+                target = node.register.get_schema(node.reference)
+            except t.DataError:
+                self.unresolved.append(node.reference)
+                return 1
+            # same local `$ref` text in other schema is other target, so path is keyed by target
+            targets = [target_id for target_id, reference in path]
+            if id(target) in targets:
+                cycle = [reference for target_id, reference in path[targets.index(id(target)):]] + [node.reference]
+                if cycle not in self.cycles:
+                    self.cycles.append(cycle)
+                return RECURSION_COST
+            return 1 + self.cost(target, path + ((id(target), node.reference),))
+        self.nodes += 1
+        if isinstance(node, Any):
+            self.max_fanout = max(self.max_fanout, len(node.trafarets))
+        elif isinstance(node, t.Or):
+            self.max_fanout = max(self.max_fanout, len(node.trafarets))
+        if isinstance(node, Schema):
+            self.max_keywords = max(self.max_keywords, len(node.trafarets))
+        if isinstance(node, Matcher):
+            cost = 1 if node.fast is not None else REGEX_COST
+            warnings = regex_warnings(node.pattern)
+            if warnings:
+                cost = BACKTRACKING_COST
+                self.regex_warnings.extend(warning for warning in warnings if warning not in self.regex_warnings)
+        else:
+            cost = 1 + sum(factor * self.cost(child, path) for child, factor in children(node))
+        # keep node alive while its id is a key
+        self.costs[id(node)] = (node, cost)
+        return cost
+
+    def report(self, schema):
+        cost = self.cost(schema)
+        return {
+            'nodes': self.nodes,
+            'max_fanout': self.max_fanout,
+            'max_keywords': self.max_keywords,
+            'regex_warnings': self.regex_warnings,
+            'cycles': self.cycles,
+            'unresolved': sorted(set(self.unresolved)),
+            'cost': cost,
+        }
+
+
+def analyze_schema(schema):
+    return Analysis().report(schema)
+
+
+def analyze(register):
+    """Reports for all schemas of `Register` by schema id"""
+    return dict(
+        (schema_id, analyze_schema(schema_register.get_schema('#')))
+        for schema_id, schema_register in register.schemas.items()
+        if '#' in schema_register.schemas
+    )
+
+
+def problems(report, max_cost=None, max_fanout=None, max_keywords=None, strict=False):
+    found = []
+    if max_cost is not None and report['cost'] > max_cost:
+        found.append('cost %s is greater than %s' % (report['cost'], max_cost))
+    if max_fanout is not None and report['max_fanout'] > max_fanout:
+        found.append('fan-out %s is greater than %s' % (report['max_fanout'], max_fanout))
+    if max_keywords is not None and report['max_keywords'] > max_keywords:
+        found.append('%s keywords in one subschema, more than %s' % (report['max_keywords'], max_keywords))
+    if strict:
+        found.extend(report['regex_warnings'])
+        found.extend('recursive reference %s' % ' -> '.join(cycle) for cycle in report['cycles'])
+        found.extend('unresolved reference %s' % ref for ref in report['unresolved'])
+    return found
+
+
+def main(argv=None):
+    from . import Register
+
+    parser = argparse.ArgumentParser(prog='python -m trafaret_schema.analyze', description=__doc__.split('\n')[1])
+    parser.add_argument('files', nargs='+', help='JSON schema files, compiled into one register')
+    parser.add_argument('--max-cost', type=int)
+    parser.add_argument('--max-fanout', type=int)
+    parser.add_argument('--max-keywords', type=int)
+    parser.add_argument('--strict', action='store_true', help='fail on regexp warnings, cycles and bad refs')
+    parser.add_argument('--json', action='store_true', help='print reports as JSON')
+    args = parser.parse_args(argv)
+
+    register = Register()
+    names = {}
+    for path in args.files:
+        with open(path) as f:
+            document = json.load(f)
+        names[path] = document.get('$id') or path
+        register.compile(document, name=names[path])
+    reports = analyze(register)
+
+    failed = False
+    output = {}
+    for path in args.files:
+        report = reports[names[path]]
+        found = problems(report, args.max_cost, args.max_fanout, args.max_keywords, args.strict)
+        failed = failed or bool(found)
+        output[path] = dict(report, problems=found)
+        if not args.json:
+            print('%s: cost %s, %s nodes, fan-out %s, keywords %s' % (
+                path, report['cost'], report['nodes'], report['max_fanout'], report['max_keywords'],
+            ))
+            for warning in report['regex_warnings']:
+                print('  warning: %s' % warning)
+            for cycle in report['cycles']:
+                print('  warning: recursive reference %s' % ' -> '.join(cycle))
+            for problem in found:
+                print('  FAIL: %s' % problem)
+    if args.json:
+        print(json.dumps(output, indent=2, sort_keys=True))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
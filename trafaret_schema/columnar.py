@@ -0,0 +1,227 @@
+"""
+Validation of flat record sets given in columnar form, a dict of equal length lists or NumPy arrays.
+
+Every keyword of a property subschema is checked over the whole column at once: a cheap predicate
+finds rows that surely pass and only the rest go through the keyword trafaret, which gives the same
+error as record validation. Numeric NumPy columns are compared with vectorized operations.
+Keywords that need the whole record (`dependencies`, `anyOf` of objects, ...) are checked record by record.
+"""
+import trafaret as t
+
+from .engine import validate
+from .nodes import (
+    Any,
+    Enum,
+    Nothing,
+    Properties,
+    Ref,
+    Required,
+    Schema,
+    StringLength,
+)
+from .number import NUMBERS, Bound, Integer, Number
+from .patterns import PatternMatch
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class Missing(object):
+    __slots__ = ()
+
+    def __repr__(self):
+        return '<MISSING>'
+
+
+# marks rows where record has no such property
+MISSING = Missing()
+
+
+def predicate(trafaret):
+    """Returns check that is true only for values that surely pass `trafaret`, or None"""
+    if isinstance(trafaret, t.Null):
+        return lambda value: value is None
+    if isinstance(trafaret, t.Bool):
+        return lambda value: type(value) is bool
+    if isinstance(trafaret, Number):
+        return lambda value: type(value) in NUMBERS
+    if isinstance(trafaret, Integer):
+        return lambda value: type(value) is int
+    if isinstance(trafaret, Bound):
+        compare, limit = trafaret.compare, trafaret.limit
+        return lambda value: type(value) in NUMBERS and compare(value, limit)
+    if isinstance(trafaret, Enum):
+        hashable = trafaret.hashable
+
+        def check(value):
+            try:
+                return value in hashable
+            except TypeError:
+                return False
+        return check
+    if isinstance(trafaret, StringLength):
+        low = max(trafaret.min_length or 0, 1)
+        high = trafaret.max_length
+        return lambda value: type(value) is str and low <= len(value) and (high is None or len(value) <= high)
+    if isinstance(trafaret, PatternMatch):
+        match = trafaret.matcher.match
+        return lambda value: type(value) is str and match(value)
+    if isinstance(trafaret, Any):
+        checks = [predicate(branch) for branch in trafaret.trafarets]
+        if None in checks:
+            return None
+        return lambda value: any(check(value) for check in checks)
+    return None
+
+
+def vector_predicate(trafaret, array):
+    """Returns boolean array of rows that surely pass `trafaret`, or None"""
+    kind = array.dtype.kind
+    if kind not in 'iuf':
+        return None
+    if isinstance(trafaret, Number):
+        return numpy.ones(len(array), dtype=bool)
+    if isinstance(trafaret, Integer):
+        return numpy.ones(len(array), dtype=bool) if kind in 'iu' else numpy.equal(numpy.mod(array, 1), 0)
+    if isinstance(trafaret, Bound):
+        return trafaret.compare(array, trafaret.limit)
+    return None
+
+
+def leaves(schema):
+    """Keyword checks of property subschema, `$ref`s and nested `Schema` nodes are expanded"""
+    nodes = [schema]
+    result = []
+    seen = set()
+    while nodes:
+        node = nodes.pop(0)
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+        if isinstance(node, Ref):
+            nodes.append(node.register.get_schema(node.reference))
+        elif isinstance(node, Schema):
+            nodes.extend(node.trafarets)
+            if node.format is not None:
+                result.append(node.format)
+        else:
+            result.append(node)
+    return result
+
+
+class Table(object):
+    def __init__(self, rows):
+        self.mask = [True] * rows
+        self.errors = []
+
+    def add(self, row, path, error):
+        self.mask[row] = False
+        if not isinstance(error, t.DataError):  # `as_dict` leftovers
+            error = t.DataError(error)
+        if isinstance(error.error, dict):
+            for key, nested in error.error.items():
+                self.add(row, '%s/%s' % (path, key) if path else str(key), nested)
+            return
+        if isinstance(error.error, list):
+            for nested in error.error:
+                self.add(row, path, nested)
+            return
+        self.errors.append((row, path, error.as_dict()))
+
+
+def check_column(table, name, column, trafaret, context):
+    if numpy is not None and isinstance(column, numpy.ndarray):
+        passed = vector_predicate(trafaret, column)
+        column = column.tolist()
+        if passed is not None:
+            rows = numpy.flatnonzero(~passed).tolist()
+        else:
+            rows = range(len(column))
+    else:
+        rows = range(len(column))
+        passed = None
+    check = predicate(trafaret) if passed is None else None
+    walkable = hasattr(trafaret, 'walk') or isinstance(trafaret, (t.And, t.Or, t.List))
+    for row in rows:
+        value = column[row]
+        if value is MISSING or check is not None and check(value):
+            continue
+        if walkable:
+            try:
+                validate(trafaret, value, context=context, validate_only=True)
+            except t.DataError as error:
+                table.add(row, name, error)
+            continue
+        res = t.catch_error(trafaret, value, context=context)
+        if isinstance(res, t.DataError):
+            table.add(row, name, res)
+
+
+def records(columns, rows):
+    lists = dict(
+        (name, column.tolist() if hasattr(column, 'tolist') else column)
+        for name, column in columns.items()
+    )
+    for row in range(rows):
+        yield dict((name, column[row]) for name, column in lists.items() if column[row] is not MISSING)
+
+
+def validate_columns(schema, columns, context=None):
+    """
+    Validates records given as `{property: column}` against compiled object `schema`.
+    Use `MISSING` in a column for records without this property.
+
+    Returns `(mask, errors)`: list of row validity flags and list of `(row, path, error)`
+    for every failed keyword.
+    """
+    lengths = set(len(column) for column in columns.values())
+    if len(lengths) > 1:
+        raise ValueError('columns have different lengths')
+    rows = lengths.pop() if lengths else 0
+    table = Table(rows)
+    per_record = []
+    for trafaret in leaves(schema):
+        if isinstance(trafaret, t.Type) and trafaret.type_ is dict:
+            continue
+        if isinstance(trafaret, Required):
+            for name in trafaret.names:
+                column = columns.get(name)
+                for row in range(rows):
+                    if column is None or column[row] is MISSING:
+                        table.add(row, name, t.DataError('%s is required' % name))
+        elif isinstance(trafaret, Properties):
+            touched = set()
+            for name, subschema in trafaret.properties:
+                if name in columns:
+                    touched.add(name)
+                    for check in leaves(subschema):
+                        check_column(table, name, columns[name], check, context)
+            for matcher, subschema in trafaret.patterns:
+                for name in columns:
+                    if matcher.match(name):
+                        touched.add(name)
+                        for check in leaves(subschema):
+                            check_column(table, name, columns[name], check, context)
+            if trafaret.additional is not None:
+                for name in columns:
+                    if name not in touched:
+                        for check in leaves(trafaret.additional):
+                            check_column(table, name, columns[name], check, context)
+            if trafaret.dependencies:
+                per_record.append(Properties(dependencies=trafaret.dependencies))
+        elif isinstance(trafaret, Nothing):
+            for row in range(rows):
+                table.add(row, '', t.DataError('value is not allowed'))
+        else:
+            per_record.append(trafaret)
+    if per_record:
+        record_schema = Schema(per_record)
+        for row, record in enumerate(records(columns, rows)):
+            try:
+                validate(record_schema, record, context=context, validate_only=True)
+            except t.DataError as error:
+                table.add(row, '', error)
+    table.errors.sort(key=lambda error: error[0])
+    return table.mask, table.errors
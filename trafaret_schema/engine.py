@@ -0,0 +1,223 @@
+import time
+
+import trafaret as t
+
+from .patterns import PatternMatch
+
+
+# regex trafarets, their strings are checked against `Budget.max_string`
+REGEX_TRAFARETS = (PatternMatch, t.RegexpRaw)
+# clock is read once per this many steps
+CLOCK_EVERY = 256
+
+
+class BudgetExceeded(t.DataError):
+    """Validation is aborted because `Budget` limit named `limit` is exceeded, the document is not checked"""
+    def __init__(self, limit, value):
+        super(BudgetExceeded, self).__init__('Validation budget is exceeded: %s is %s' % (limit, value))
+        self.limit = limit
+
+
+class Budget(object):
+    """
+    Limits of work of one validation for untrusted input: steps into nodes, nesting depth, length of strings
+    checked by regexes and seconds. Parallel workers get the same limits for each chunk.
+    """
+    __slots__ = ('max_nodes', 'max_depth', 'max_string', 'max_seconds')
+
+    def __init__(self, max_nodes=None, max_depth=None, max_string=None, max_seconds=None):
+        self.max_nodes = max_nodes
+        self.max_depth = max_depth
+        self.max_string = max_string
+        self.max_seconds = max_seconds
+
+
+class Run(object):
+    """
+    One validation pass over a document with an explicit work stack.
+
+    Nodes that contain other trafarets provide `walk(value, run)` generator. It yields
+    `(trafaret, value, nested)` steps and gets back step result or `DataError` instance,
+    like `t.catch_error` gives. `nested` marks a step into document child, it is what
+    `max_depth` counts. Everything else is called as plain trafaret.
+
+    With `validate_only` nodes do not build output containers and return given value, so
+    validation result is the same object and `format` conversions are not applied.
+
+    With `fill_defaults` missing object properties that have `default` are put into the
+    document in place and validated in the same pass. Every change is recorded in `filled`
+    by `fill`, nodes whose value fails take back changes made under them with `rollback`,
+    so only values that pass as a whole keep their defaults.
+
+    With `parallel` options items of big arrays are validated by a pool, see `parallel.Parallel`.
+    With `budget` every step is counted and validation raises `BudgetExceeded` when a limit is hit.
+    `depth` is the depth of the step that runs now, `schemas` is registry snapshot of `Ref` nodes.
+    """
+    def __init__(self, context=None, max_depth=None, validate_only=False, fill_defaults=False, parallel=None,
+                 budget=None):
+        self.context = context
+        self.max_depth = max_depth
+        self.validate_only = validate_only
+        self.fill_defaults = fill_defaults
+        self.parallel = parallel
+        self.budget = budget
+        self.depth = 0
+        self.schemas = None
+        self.filled = []
+        self.visited = 0
+        self.clock_at = CLOCK_EVERY
+        self.deadline = None
+        if budget is not None and budget.max_seconds is not None:
+            self.deadline = time.monotonic() + budget.max_seconds
+
+    def spend(self, steps=1):
+        """Counts steps against `budget`, the clock is read only once per `CLOCK_EVERY` steps"""
+        self.visited += steps
+        budget = self.budget
+        if budget.max_nodes is not None and self.visited > budget.max_nodes:
+            raise BudgetExceeded('max_nodes', budget.max_nodes)
+        if self.deadline is not None and self.visited >= self.clock_at:
+            self.clock_at = self.visited + CLOCK_EVERY
+            if time.monotonic() > self.deadline:
+                raise BudgetExceeded('max_seconds', budget.max_seconds)
+
+    def check_string(self, value):
+        max_string = self.budget.max_string
+        if max_string is not None and isinstance(value, str) and len(value) > max_string:
+            raise BudgetExceeded('max_string', max_string)
+
+    def fill(self, container, key, value):
+        """Puts default into the document, `key` is a property name or a slice of array items"""
+        self.filled.append((container, key, container[key] if isinstance(key, slice) else None))
+        container[key] = value
+
+    def rollback(self, mark):
+        """Takes back changes made by `fill` after `len(self.filled)` was `mark`"""
+        for container, key, previous in reversed(self.filled[mark:]):
+            if isinstance(key, slice):
+                container[key] = previous
+            else:
+                del container[key]
+        del self.filled[mark:]
+
+    def split(self, value):
+        """Tells if items of array `value` go to `parallel` pool"""
+        return self.parallel is not None and len(value) >= self.parallel.threshold
+
+    def start(self, trafaret, value):
+        walk = getattr(trafaret, 'walk', None)
+        if walk is not None:
+            return walk(value, self)
+        walker = WALKERS.get(type(trafaret))
+        if walker is not None:
+            return walker(trafaret, value, self)
+        return None
+
+    def validate(self, trafaret, value):
+        mark = len(self.filled)
+        try:
+            result = self.walk(trafaret, value)
+        except t.DataError:
+            if len(self.filled) > mark:
+                self.rollback(mark)
+            raise
+        return result
+
+    def walk(self, trafaret, value):
+        walker = self.start(trafaret, value)
+        if walker is None:
+            return trafaret(value, context=self.context)
+        stack = [(walker, 0)]
+        result = None
+        while stack:
+            walker, depth = stack[-1]
+            self.depth = depth
+            try:
+                trafaret, value, nested = walker.send(result)
+            except StopIteration as stop:
+                stack.pop()
+                result = stop.value
+                continue
+            except BudgetExceeded:
+                raise
+            except t.DataError as error:
+                stack.pop()
+                result = error
+                continue
+            if nested:
+                depth += 1
+                if self.max_depth is not None and depth > self.max_depth:
+                    raise t.DataError('Maximum nesting depth %s is exceeded' % self.max_depth)
+            if self.budget is not None:
+                self.spend()
+                if nested and self.budget.max_depth is not None and depth > self.budget.max_depth:
+                    raise BudgetExceeded('max_depth', self.budget.max_depth)
+                if isinstance(trafaret, REGEX_TRAFARETS):
+                    self.check_string(value)
+            walker = self.start(trafaret, value)
+            if walker is None:
+                result = t.catch_error(trafaret, value, context=self.context)
+            else:
+                stack.append((walker, depth))
+                result = None
+        if isinstance(result, t.DataError):
+            raise result
+        return result
+
+
+def validate(trafaret, value, context=None, max_depth=None, validate_only=False, fill_defaults=False, parallel=None,
+             budget=None):
+    run = Run(
+        context=context,
+        max_depth=max_depth,
+        validate_only=validate_only,
+        fill_defaults=fill_defaults,
+        parallel=parallel,
+        budget=budget,
+    )
+    return run.validate(trafaret, value)
+
+
+def walk_and(trafaret, value, run):
+    res = yield trafaret.trafaret, value, False
+    if isinstance(res, t.DataError):
+        raise res
+    res = yield trafaret.other, res, False
+    if isinstance(res, t.DataError):
+        raise res
+    return res
+
+
+def walk_or(trafaret, value, run):
+    errors = []
+    for branch in trafaret.trafarets:
+        res = yield branch, value, False
+        if not isinstance(res, t.DataError):
+            return res
+        errors.append(res)
+    raise t.DataError(dict(enumerate(errors)))
+
+
+def walk_list(trafaret, value, run):
+    trafaret.check_common(value)
+    if run.split(value):
+        lst = run.parallel.validate_items(trafaret.trafaret, value, 0, run)
+        return value if lst is None else lst
+    lst = None if run.validate_only else []
+    errors = {}
+    for index, item in enumerate(value):
+        res = yield trafaret.trafaret, item, True
+        if isinstance(res, t.DataError):
+            errors[index] = res
+        elif lst is not None:
+            lst.append(res)
+    if errors:
+        raise t.DataError(error=errors)
+    return value if lst is None else lst
+
+
+WALKERS = {
+    t.And: walk_and,
+    t.Or: walk_or,
+    t.List: walk_list,
+}
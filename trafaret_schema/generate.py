@@ -0,0 +1,551 @@
+"""
+Synthetic documents from compiled schemas, for load tests and fuzzing.
+
+    for document in generate(check_order, count=1000000, seed=1):
+        ...
+
+Generator reads constraints from compiled nodes: types, bounds, `multipleOf`, `enum`, `const`, lengths,
+`pattern`, `format`, `items`, `properties`, `required` and `$ref`s, picks a branch of every `anyOf`/`oneOf`,
+builds a value and checks it with the schema. With `invalid=True` one value of a valid document is
+replaced by a value that breaks one of its constraints, or one required property is removed.
+"""
+import random
+from fractions import Fraction
+
+import trafaret as t
+
+from . import Register, check_number
+from .nodes import (
+    All,
+    Any,
+    ArrayLength,
+    Contains,
+    Enum,
+    Items,
+    Nothing,
+    ObjectSize,
+    Properties,
+    Ref,
+    Required,
+    Schema,
+    StringLength,
+    UniqueItems,
+)
+from .number import Bound, ExclusiveMaximum, ExclusiveMinimum, Integer, Minimum, MultipleOf, Number
+from .patterns import PatternMatch
+
+try:
+    import re._parser as sre_parse
+except ImportError:  # before 3.11
+    import sre_parse
+
+
+KINDS = ('null', 'boolean', 'integer', 'number', 'string', 'array', 'object')
+SCALARS = ('null', 'boolean', 'integer', 'number', 'string')
+LETTERS = 'abcdefghijklmnopqrstuvwxyz'
+# skipped documents in a row that stop a stream
+MAX_FAILURES = 10
+# parsed patterns of `from_regex`
+PARSED = {}
+MAX_PARSED = 256
+# one of them is taken for a string with `format`, the first that format accepts
+FORMAT_SAMPLES = (
+    '2020-01-02T03:04:05',
+    '2020-01-02',
+    '12:30',
+    'user@example.com',
+    'http://example.com/path',
+    '192.0.2.1',
+    '2001:db8::1',
+    '+1 555 0100',
+)
+
+
+def kinds_of(trafaret):
+    if isinstance(trafaret, t.Null):
+        return {'null'}
+    if isinstance(trafaret, t.Bool):
+        return {'boolean'}
+    if isinstance(trafaret, t.Type) and trafaret.type_ is dict:
+        return {'object'}
+    if isinstance(trafaret, t.Type) and trafaret.type_ is list:
+        return {'array'}
+    if isinstance(trafaret, t.String):
+        return {'string'}
+    if isinstance(trafaret, (Integer, t.Int)):
+        return {'integer'}
+    if isinstance(trafaret, Number) or trafaret is check_number:
+        return {'number', 'integer'}
+    if isinstance(trafaret, Any):
+        kinds = [kinds_of(branch) for branch in trafaret.trafarets]
+        if None in kinds:
+            return None
+        return set().union(*kinds)
+    return None
+
+
+class Constraints(object):
+    """Constraints of one value, collected from all keywords of its schema"""
+    def __init__(self):
+        self.kinds = None
+        self.enum = None
+        self.minimum = None
+        self.maximum = None
+        self.exclusive_minimum = False
+        self.exclusive_maximum = False
+        self.multiple_of = None
+        self.min_length = 1  # blank strings are never valid here
+        self.max_length = None
+        self.patterns = []
+        self.formats = []
+        self.min_items = 0
+        self.max_items = None
+        self.unique = False
+        self.items = ()
+        self.additional_items = None
+        self.closed_items = False
+        self.contains = []
+        self.properties = {}
+        self.pattern_properties = []
+        self.additional = None
+        self.required = set()
+        self.min_props = 0
+        self.max_props = None
+        self.nothing = False
+        # worked out on the first value, constraints are shared by values of a node
+        self.steps = None
+        self.sample = None
+
+    def restrict(self, kinds):
+        self.kinds = set(kinds) if self.kinds is None else self.kinds & kinds
+
+    def bound(self, value, low, exclusive):
+        if low:
+            if self.minimum is None or value > self.minimum or value == self.minimum and exclusive:
+                self.minimum, self.exclusive_minimum = value, exclusive
+        elif self.maximum is None or value < self.maximum or value == self.maximum and exclusive:
+            self.maximum, self.exclusive_maximum = value, exclusive
+
+    def add(self, trafaret):
+        kinds = kinds_of(trafaret)
+        if kinds is not None:
+            self.restrict(kinds)
+        if isinstance(trafaret, Enum):
+            self.enum = list(trafaret.values) if self.enum is None else [v for v in self.enum if v in trafaret.values]
+        elif isinstance(trafaret, t.Atom):
+            self.enum = [trafaret.value]
+        elif isinstance(trafaret, Bound):
+            low = isinstance(trafaret, (Minimum, ExclusiveMinimum))
+            self.bound(trafaret.limit, low, isinstance(trafaret, (ExclusiveMinimum, ExclusiveMaximum)))
+        elif type(trafaret) is t.Float:
+            for value, low, exclusive in ((trafaret.gte, True, False), (trafaret.gt, True, True),
+                                          (trafaret.lte, False, False), (trafaret.lt, False, True)):
+                if value is not None:
+                    self.bound(value, low, exclusive)
+        elif isinstance(trafaret, MultipleOf):
+            self.multiple_of = trafaret.multiplier
+        elif isinstance(trafaret, StringLength):
+            if trafaret.min_length is not None:
+                self.min_length = max(self.min_length, trafaret.min_length)
+            if trafaret.max_length is not None:
+                self.max_length = min(self.max_length or trafaret.max_length, trafaret.max_length)
+        elif isinstance(trafaret, PatternMatch):
+            self.patterns.append(trafaret.matcher.pattern)
+        elif isinstance(trafaret, ArrayLength):
+            if trafaret.min_length is not None:
+                self.min_items = max(self.min_items, trafaret.min_length)
+            if trafaret.max_length is not None:
+                self.max_items = min(self.max_items or trafaret.max_length, trafaret.max_length)
+        elif isinstance(trafaret, UniqueItems):
+            self.unique = True
+        elif isinstance(trafaret, Items):
+            self.items = trafaret.items
+            self.additional_items = trafaret.additional
+            self.closed_items = trafaret.additional is None
+        elif isinstance(trafaret, t.List):
+            self.additional_items = trafaret.trafaret
+        elif isinstance(trafaret, Contains):
+            self.contains.append(trafaret.trafaret)
+        elif isinstance(trafaret, Properties):
+            self.properties.update(dict(trafaret.properties))
+            self.pattern_properties.extend(trafaret.patterns)
+            self.additional = trafaret.additional
+        elif isinstance(trafaret, Required):
+            self.required.update(trafaret.names)
+        elif isinstance(trafaret, ObjectSize):
+            if trafaret.min_props is not None:
+                self.min_props = max(self.min_props, trafaret.min_props)
+            if trafaret.max_props is not None:
+                self.max_props = min(self.max_props or trafaret.max_props, trafaret.max_props)
+        elif isinstance(trafaret, Nothing):
+            self.nothing = True
+
+
+class Generator(object):
+    """
+    Makes documents for compiled `schema`, or for schema `schema_id` of `Register`. Same `seed` gives
+    the same documents. Documents that can not pass the schema after `attempts` tries are skipped,
+    `stream` raises `ValueError` after `MAX_FAILURES` skipped documents in a row.
+
+    Constraints of every schema node are collected once, only `anyOf`/`oneOf` branches are picked again
+    for every value, so `$ref`s are resolved as they were on first use.
+    """
+    def __init__(self, schema, schema_id=None, seed=None, max_depth=6, max_items=4, attempts=20, verify=True):
+        if isinstance(schema, Register):
+            schema = schema.get_schema(schema_id)
+        self.schema = schema
+        self.random = random.Random(seed)
+        self.max_depth = max_depth
+        self.max_items = max_items
+        self.attempts = attempts
+        self.verify = verify
+        # `(container, key, constraints)` of values of the last document, places for invalid values
+        self.places = []
+        # schema node id to `(node, plan)`, see `plan`
+        self.plans = {}
+
+    def plan(self, schema):
+        """
+        Returns `(keywords, formats, choices, constraints)` of schema node: keyword trafarets and formats
+        of it and of nodes it is made of, `Any` nodes whose branch is picked for every value, and
+        `Constraints` that are the same for every value when there is nothing to pick.
+        """
+        cached = self.plans.get(id(schema))
+        if cached is not None:
+            return cached[1]
+        keywords = []
+        formats = []
+        choices = []
+        nodes = [schema]
+        seen = set()
+        while nodes:
+            node = nodes.pop()
+            if id(node) in seen:
+                continue
+            seen.add(id(node))
+            if isinstance(node, Ref):
+                nodes.append(node.register.get_schema(node.reference))
+            elif isinstance(node, Schema):
+                nodes.extend(node.trafarets)
+                if node.format is not None:
+                    formats.append(node.format)
+            elif isinstance(node, All):
+                nodes.extend(node.trafarets)
+            elif isinstance(node, Any) and kinds_of(node) is None:
+                choices.append(node)
+            else:
+                keywords.append(node)
+        constraints = None
+        if not choices:
+            constraints = Constraints()
+            for keyword in keywords:
+                constraints.add(keyword)
+            constraints.formats.extend(formats)
+        plan = (keywords, formats, choices, constraints)
+        # the node is kept, so its id is not given to another object
+        self.plans[id(schema)] = (schema, plan)
+        return plan
+
+    def collect(self, schema):
+        """Constraints of a value, they are shared by values and must not be changed"""
+        constraints = self.plan(schema)[3]
+        if constraints is None:
+            constraints = Constraints()
+            self.pick(schema, constraints, set())
+        return constraints
+
+    def pick(self, schema, constraints, seen):
+        if id(schema) in seen:
+            return
+        seen.add(id(schema))
+        keywords, formats, choices, _ = self.plan(schema)
+        for keyword in keywords:
+            constraints.add(keyword)
+        constraints.formats.extend(formats)
+        for node in choices:
+            self.pick(self.random.choice(node.trafarets), constraints, seen)
+
+    def valid(self, schema, value):
+        if not self.verify:
+            return True
+        try:
+            schema.validate(value, validate_only=True)
+        except t.DataError:
+            return False
+        return True
+
+    def document(self):
+        """Returns valid document or None"""
+        for _ in range(self.attempts):
+            self.places = []
+            value = self.value(self.schema, 0, None, None)
+            if self.valid(self.schema, value):
+                return value
+        return None
+
+    def invalid_document(self):
+        """Returns valid document with one broken value, or None"""
+        for _ in range(self.attempts):
+            document = self.document()
+            if document is None or not self.places:
+                continue
+            holder = [document]
+            container, key, constraints = self.random.choice(self.places)
+            if container is None:
+                container, key = holder, 0
+            if not self.breaks(container, key, constraints):
+                continue
+            if not self.verify:
+                return holder[0]
+            try:
+                self.schema.validate(holder[0], validate_only=True)
+            except t.DataError:
+                return holder[0]
+        return None
+
+    def __iter__(self):
+        return self.stream()
+
+    def stream(self, count=None, invalid=False):
+        made = 0
+        failed = 0
+        make = self.invalid_document if invalid else self.document
+        while count is None or made < count:
+            document = make()
+            if document is None:
+                failed += 1
+                if failed >= MAX_FAILURES:
+                    raise ValueError('Can not make %s documents for schema, it may be unsatisfiable' % (
+                        'invalid' if invalid else 'valid'
+                    ))
+                continue
+            failed = 0
+            made += 1
+            yield document
+
+    def value(self, schema, depth, container, key):
+        constraints = self.collect(schema)
+        self.places.append((container, key, constraints))
+        if constraints.enum:
+            return self.random.choice(constraints.enum)
+        kind = self.kind(constraints, depth)
+        if kind == 'null':
+            return None
+        if kind == 'boolean':
+            return self.random.random() < 0.5
+        if kind in ('integer', 'number'):
+            return self.number(constraints, kind == 'integer')
+        if kind == 'string':
+            return self.string(constraints)
+        if kind == 'array':
+            return self.array(constraints, depth)
+        return self.object(constraints, depth)
+
+    def kind(self, constraints, depth):
+        kinds = constraints.kinds
+        if kinds is None:
+            if constraints.properties or constraints.required or constraints.pattern_properties:
+                kinds = {'object'}
+            elif constraints.items or constraints.additional_items is not None or constraints.contains:
+                kinds = {'array'}
+            elif constraints.patterns or constraints.formats or constraints.max_length is not None:
+                kinds = {'string'}
+            elif constraints.minimum is not None or constraints.maximum is not None or constraints.multiple_of:
+                kinds = {'number'}
+            else:
+                kinds = set(SCALARS) if depth >= self.max_depth else set(KINDS)
+        if not kinds:
+            return 'null'
+        if depth >= self.max_depth and kinds - {'array', 'object'}:
+            kinds = kinds - {'array', 'object'}
+        return self.random.choice(sorted(kinds))
+
+    def number(self, constraints, integer):
+        low, high = constraints.minimum, constraints.maximum
+        if low is None:
+            low = 0 if high is None or high > 0 else high - 100
+        if high is None:
+            high = low + 100
+        if integer or constraints.multiple_of:
+            if constraints.steps is None:
+                constraints.steps = {}
+            steps = constraints.steps.get(integer)
+            if steps is None:
+                steps = constraints.steps[integer] = self.steps(constraints, low, high, integer)
+            unit, first, last = steps
+            value = unit * self.random.randint(first, last)
+            return int(value) if integer or value.denominator == 1 else float(value)
+        value = round(self.random.uniform(low, high), 2)
+        if constraints.exclusive_minimum and value <= low or constraints.exclusive_maximum and value >= high:
+            value = (low + high) / 2.0
+        return value
+
+    def steps(self, constraints, low, high, integer):
+        """Returns `(unit, first, last)`, numbers are multiples of `unit` from `first` to `last` of them"""
+        step = Fraction(repr(constraints.multiple_of)) if constraints.multiple_of else None
+        unit = step or Fraction(1)
+        if integer and step is not None and step.denominator != 1:
+            unit = Fraction(step.numerator)  # multiples of numerator are integers
+        low, high = Fraction(repr(low)), Fraction(repr(high))
+        first = -(-low // unit) + (1 if constraints.exclusive_minimum and low % unit == 0 else 0)
+        last = high // unit - (1 if constraints.exclusive_maximum and high % unit == 0 else 0)
+        return unit, int(first), max(int(first), int(last))
+
+    def string(self, constraints):
+        if constraints.formats:
+            if constraints.sample is None:
+                constraints.sample = ''
+                for sample in FORMAT_SAMPLES:
+                    if not any(isinstance(t.catch_error(fmt, sample), t.DataError) for fmt in constraints.formats):
+                        constraints.sample = sample
+                        break
+            if constraints.sample:
+                return constraints.sample
+        if constraints.patterns:
+            return from_regex(constraints.patterns[0], self.random)
+        low = constraints.min_length
+        high = constraints.max_length if constraints.max_length is not None else low + 8
+        return ''.join(self.random.choice(LETTERS) for _ in range(self.random.randint(low, max(low, high))))
+
+    def array(self, constraints, depth):
+        low = max(constraints.min_items, len(constraints.items) if constraints.closed_items else 0)
+        high = constraints.max_items if constraints.max_items is not None else low + self.max_items
+        if constraints.closed_items:
+            high = min(high, len(constraints.items))
+        if depth + 1 >= self.max_depth:
+            high = low
+        length = self.random.randint(low, max(low, high))
+        array = []
+        for index in range(length):
+            if index < len(constraints.items):
+                schema = constraints.items[index]
+            elif constraints.additional_items is not None:
+                schema = constraints.additional_items
+            else:
+                schema = Schema(())
+            if index == 0 and constraints.contains:
+                schema = constraints.contains[0]
+            for _ in range(self.attempts if constraints.unique else 1):
+                item = self.value(schema, depth + 1, array, index)
+                if not constraints.unique or item not in array:
+                    break
+            array.append(item)
+        return array
+
+    def object(self, constraints, depth):
+        names = set(constraints.required)
+        if depth + 1 < self.max_depth:
+            names.update(name for name in constraints.properties if self.random.random() < 0.5)
+        while len(names) < constraints.min_props:
+            optional = [name for name in constraints.properties if name not in names]
+            names.add(optional[0] if optional else 'x%s' % len(names))
+        document = {}
+        for name in sorted(names):
+            schema = constraints.properties.get(name)
+            if schema is None:
+                patterns = [s for matcher, s in constraints.pattern_properties if matcher.match(name)]
+                schema = patterns[0] if patterns else constraints.additional or Schema(())
+            document[name] = self.value(schema, depth + 1, document, name)
+        return document
+
+    def breaks(self, container, key, constraints):
+        """Puts into `container[key]` a value that fails `constraints`"""
+        choices = []
+        kinds = constraints.kinds
+        if kinds is not None:
+            wrong = [kind for kind in ('string', 'integer', 'boolean', 'null', 'object') if kind not in kinds]
+            if 'number' in kinds:
+                wrong = [kind for kind in wrong if kind != 'integer']
+            choices.extend(('kind', kind) for kind in wrong)
+        if constraints.enum:
+            choices.append(('value', '%s-not-in-enum' % self.random.randint(0, 1 << 30)))
+        if constraints.maximum is not None:
+            choices.append(('value', constraints.maximum + 1))
+        if constraints.minimum is not None:
+            choices.append(('value', constraints.minimum - 1))
+        if constraints.max_length is not None:
+            choices.append(('value', 'z' * (constraints.max_length + 1)))
+        if isinstance(container[key], dict) and constraints.required:
+            choices.append(('drop', self.random.choice(sorted(constraints.required))))
+        if not choices:
+            return False
+        action, argument = self.random.choice(choices)
+        if action == 'kind':
+            container[key] = {'string': 'x', 'integer': 1, 'boolean': True, 'null': None, 'object': {}}[argument]
+        elif action == 'value':
+            container[key] = argument
+        else:
+            container[key].pop(argument, None)
+        return True
+
+
+def from_regex(pattern, rnd):
+    """Returns a string that matches `pattern` from its start"""
+    parsed = PARSED.get(pattern)
+    if parsed is None:
+        if len(PARSED) >= MAX_PARSED:
+            PARSED.clear()
+        parsed = PARSED[pattern] = sre_parse.parse(pattern)
+    return ''.join(emit(parsed, rnd))
+
+
+def emit(items, rnd):
+    for op, av in items:
+        if op is sre_parse.LITERAL:
+            yield chr(av)
+        elif op is sre_parse.ANY:
+            yield rnd.choice(LETTERS)
+        elif op is sre_parse.IN:
+            yield char_in(av, rnd)
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+            low, high, sub = av
+            high = min(high, low + 3)
+            for _ in range(rnd.randint(low, high)):
+                for part in emit(sub, rnd):
+                    yield part
+        elif op is sre_parse.SUBPATTERN:
+            for part in emit(av[-1], rnd):
+                yield part
+        elif op is sre_parse.BRANCH:
+            for part in emit(rnd.choice(av[1]), rnd):
+                yield part
+        elif op is sre_parse.CATEGORY:
+            yield category(av, rnd)
+        elif op is sre_parse.NOT_LITERAL:
+            yield 'a' if av != ord('a') else 'b'
+        # anchors and lookarounds give nothing
+
+
+def category(name, rnd):
+    if name is sre_parse.CATEGORY_DIGIT:
+        return rnd.choice('0123456789')
+    if name is sre_parse.CATEGORY_SPACE:
+        return ' '
+    if name is sre_parse.CATEGORY_WORD:
+        return rnd.choice(LETTERS)
+    return '#'
+
+
+def char_in(av, rnd):
+    if av and av[0][0] is sre_parse.NEGATE:
+        excluded = set()
+        for op, value in av[1:]:
+            if op is sre_parse.LITERAL:
+                excluded.add(chr(value))
+            elif op is sre_parse.RANGE:
+                excluded.update(chr(code) for code in range(value[0], value[1] + 1))
+        candidates = [char for char in LETTERS + '0123456789' if char not in excluded]
+        return rnd.choice(candidates) if candidates else '~'
+    op, value = rnd.choice(av)
+    if op is sre_parse.LITERAL:
+        return chr(value)
+    if op is sre_parse.RANGE:
+        return chr(rnd.randint(value[0], value[1]))
+    if op is sre_parse.CATEGORY:
+        return category(value, rnd)
+    return 'a'
+
+
+def generate(schema, count=None, seed=None, invalid=False, **options):
+    """Yields `count` documents, endless stream without `count`"""
+    return Generator(schema, seed=seed, **options).stream(count=count, invalid=invalid)
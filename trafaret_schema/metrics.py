@@ -0,0 +1,173 @@
+"""
+Always-on validation metrics per registered schema.
+
+Every thread counts into its own bucket without locks, buckets are summed only when metrics are read.
+Latency is measured for one of `sample_every` validations, so the hot path is a few counter updates.
+Array indexes of failing paths are counted as `*` and at most `max_paths` paths are kept per schema and
+thread, the rest are counted as `OTHER`, so documents can not grow the counters without a bound.
+"""
+import bisect
+import os
+import threading
+import time
+from collections import Counter
+
+import trafaret as t
+
+from .utils import error_paths
+
+
+# seconds
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0)
+OTHER = '<other>'
+
+
+class Stats(object):
+    __slots__ = ('validations', 'failures', 'latency', 'latency_sum', 'paths')
+
+    def __init__(self, buckets):
+        self.validations = 0
+        self.failures = 0
+        self.latency = [0] * (len(buckets) + 1)
+        self.latency_sum = 0.0
+        self.paths = Counter()
+
+    def add(self, other):
+        self.validations += other.validations
+        self.failures += other.failures
+        self.latency = [a + b for a, b in zip(self.latency, other.latency)]
+        self.latency_sum += other.latency_sum
+        self.paths.update(dict(other.paths))  # copy is atomic, owner thread may be counting
+
+
+class Metrics(object):
+    """
+    Pass to `Register(metrics=Metrics())`, then validations made with `Register.validate_by` are counted
+    by schema id.
+    """
+    def __init__(self, sample_every=16, buckets=LATENCY_BUCKETS, top=10, max_paths=1000):
+        self.sample_every = sample_every
+        self.buckets = tuple(buckets)
+        self.top = top
+        self.max_paths = max_paths
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.thread_buckets = []
+
+    def bucket(self):
+        bucket = getattr(self.local, 'bucket', None)
+        if bucket is None:
+            bucket = self.local.bucket = {}
+            with self.lock:
+                self.thread_buckets.append(bucket)
+        return bucket
+
+    def observe(self, schema_id, schema, value, options):
+        bucket = self.bucket()
+        stats = bucket.get(schema_id)
+        if stats is None:
+            stats = bucket[schema_id] = Stats(self.buckets)
+        stats.validations += 1
+        timed = stats.validations % self.sample_every == 0
+        if timed:
+            started = time.perf_counter()
+        try:
+            return schema.validate(value, **options)
+        except t.DataError as error:
+            stats.failures += 1
+            for path in set(map(normalize_path, error_paths(error))):
+                if path in stats.paths or len(stats.paths) < self.max_paths:
+                    stats.paths[path] += 1
+                else:
+                    stats.paths[OTHER] += 1
+            raise
+        finally:
+            if timed:
+                elapsed = time.perf_counter() - started
+                stats.latency[bisect.bisect_left(self.buckets, elapsed)] += 1
+                stats.latency_sum += elapsed
+
+    def collect(self):
+        total = {}
+        with self.lock:
+            buckets = list(self.thread_buckets)
+        for bucket in buckets:
+            for schema_id, stats in list(bucket.items()):
+                if schema_id not in total:
+                    total[schema_id] = Stats(self.buckets)
+                total[schema_id].add(stats)
+        return total
+
+    def as_dict(self):
+        result = {}
+        for schema_id, stats in self.collect().items():
+            result[schema_id] = {
+                'validations': stats.validations,
+                'failures': stats.failures,
+                'latency': {
+                    'buckets': list(zip(self.buckets + (float('inf'),), stats.latency)),
+                    'sum': stats.latency_sum,
+                    'count': sum(stats.latency),
+                },
+                'top_failures': stats.paths.most_common(self.top),
+            }
+        return result
+
+    def prometheus(self, prefix='trafaret_schema'):
+        """Metrics in Prometheus text exposition format"""
+        lines = []
+        collected = sorted(self.collect().items())
+
+        def family(name, kind, help):
+            lines.append('# HELP %s_%s %s' % (prefix, name, help))
+            lines.append('# TYPE %s_%s %s' % (prefix, name, kind))
+
+        family('validations_total', 'counter', 'Validations by schema.')
+        for schema_id, stats in collected:
+            lines.append('%s_validations_total{schema="%s"} %s' % (prefix, label(schema_id), stats.validations))
+        family('failures_total', 'counter', 'Failed validations by schema.')
+        for schema_id, stats in collected:
+            lines.append('%s_failures_total{schema="%s"} %s' % (prefix, label(schema_id), stats.failures))
+        family('validation_seconds', 'histogram', 'Sampled validation latency.')
+        for schema_id, stats in collected:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), stats.latency):
+                cumulative += count
+                lines.append('%s_validation_seconds_bucket{schema="%s",le="%s"} %s' % (
+                    prefix, label(schema_id), '+Inf' if bound == float('inf') else repr(bound), cumulative,
+                ))
+            lines.append('%s_validation_seconds_sum{schema="%s"} %r' % (prefix, label(schema_id), stats.latency_sum))
+            lines.append('%s_validation_seconds_count{schema="%s"} %s' % (prefix, label(schema_id), cumulative))
+        family('path_failures_total', 'counter', 'Most frequent failing paths by schema.')
+        for schema_id, stats in collected:
+            for path, count in stats.paths.most_common(self.top):
+                lines.append('%s_path_failures_total{schema="%s",path="%s"} %s' % (
+                    prefix, label(schema_id), label(path), count,
+                ))
+        return '\n'.join(lines) + '\n'
+
+    def export(self, path=None, callback=None, prefix='trafaret_schema'):
+        """Writes Prometheus text to `path` atomically (node exporter textfile collector) or gives it to `callback`"""
+        text = self.prometheus(prefix=prefix)
+        if path is not None:
+            temporary = '%s.%s.tmp' % (path, os.getpid())
+            with open(temporary, 'w') as f:
+                f.write(text)
+            os.replace(temporary, path)
+        if callback is not None:
+            callback(text)
+        return text
+
+    def reset(self):
+        with self.lock:
+            for bucket in self.thread_buckets:
+                bucket.clear()
+
+
+def normalize_path(path):
+    """`items/3/id` -> `items/*/id`, a property named by digits is counted as `*` too"""
+    return '/'.join('*' if part.isdigit() else part for part in path.split('/'))
+
+
+def label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
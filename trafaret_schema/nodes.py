@@ -0,0 +1,605 @@
+"""
+Node types of compiled schema tree.
+
+Every node keeps its parameters in `__slots__` and containers in tuples, so a node costs one small object
+and there is no closure or extra `t.Call` layer per keyword. `t.Trafaret` has no `__slots__`, so nodes
+still have a `__dict__` attribute, but the dict is made only when it is touched and compiling or validating
+never touches it. Nodes that contain other nodes provide `walk` for `engine.Run`.
+"""
+import copy
+import gc
+import sys
+import types
+import weakref
+from collections.abc import Mapping
+
+import trafaret as t
+
+from .engine import BudgetExceeded, validate
+
+
+class Node(t.Trafaret):
+    __slots__ = ()
+
+    def transform(self, value, context=None):
+        return validate(self, value, context=context)
+
+
+class All(Node):
+    __slots__ = ('trafarets',)
+
+    def __init__(self, trafarets):
+        self.trafarets = tuple(t.ensure_trafaret(trafaret) for trafaret in trafarets)
+
+    def walk(self, value, run):
+        errors = []
+        for trafaret in self.trafarets:
+            res = yield trafaret, value, False
+            if isinstance(res, t.DataError):
+                errors.append(res)
+        if errors:
+            raise t.DataError(errors)
+        return value
+
+    def __repr__(self):
+        return '<All trafarets=[%s]>' % ', '.join(repr(r) for r in self.trafarets)
+
+
+class Any(Node):
+    """
+    Passes if one of branches passes. With `stats` branches are tried in the order of their success,
+    result and errors do not depend on it, see `ordering`.
+    """
+    __slots__ = ('trafarets', 'stats')
+
+    def __init__(self, trafarets):
+        self.trafarets = tuple(t.ensure_trafaret(trafaret) for trafaret in trafarets)
+        self.stats = None
+
+    def walk(self, value, run):
+        # failed branches must not leave defaults in the document, so branches do not fill them
+        fill_defaults, run.fill_defaults = run.fill_defaults, False
+        try:
+            stats = self.stats
+            if stats is None:
+                errors = []
+                for trafaret in self.trafarets:
+                    res = yield trafaret, value, False
+                    if isinstance(res, t.DataError):
+                        errors.append(res)
+                    else:
+                        return value
+                raise t.DataError(errors)
+            errors = {}
+            for index in stats.order:
+                res = yield self.trafarets[index], value, False
+                if isinstance(res, t.DataError):
+                    errors[index] = res
+                else:
+                    stats.hit(index)
+                    return value
+            raise t.DataError([errors[index] for index in range(len(self.trafarets))])
+        finally:
+            run.fill_defaults = fill_defaults
+
+    def __repr__(self):
+        return '<Any trafarets=[%s]>' % ', '.join(repr(r) for r in self.trafarets)
+
+
+class BranchStats(object):
+    """Successes of `Any` branches, branches are sorted by them after every `every` successes"""
+    __slots__ = ('order', 'hits', 'seen', 'every')
+
+    def __init__(self, size, every, order=None):
+        self.order = tuple(range(size)) if order is None else tuple(order)
+        self.hits = [0] * size
+        self.seen = 0
+        self.every = every
+
+    def hit(self, index):
+        # counts of concurrent validations can be lost, they only tune the order
+        self.hits[index] += 1
+        self.seen += 1
+        if self.seen >= self.every:
+            self.reorder()
+
+    def reorder(self):
+        hits = self.hits
+        # sort is stable, branches with equal counts keep declared order
+        self.order = tuple(sorted(range(len(hits)), key=lambda index: -hits[index]))
+        # old counts fade, so order follows traffic changes
+        self.hits = [count // 2 for count in hits]
+        self.seen = 0
+
+
+class Not(Node):
+    __slots__ = ('trafaret',)
+
+    def __init__(self, trafaret):
+        self.trafaret = trafaret
+
+    def walk(self, value, run):
+        fill_defaults, run.fill_defaults = run.fill_defaults, False
+        try:
+            res = yield self.trafaret, value, False
+        finally:
+            run.fill_defaults = fill_defaults
+        if not isinstance(res, t.DataError):
+            raise t.DataError('Value must not be validated')
+        return value
+
+
+class NoDefault(object):
+    __slots__ = ()
+
+    def __repr__(self):
+        return '<NO_DEFAULT>'
+
+
+# `Schema.default` of schemas without `default` keyword, `None` is a proper default
+NO_DEFAULT = NoDefault()
+
+
+class Schema(All):
+    """
+    Compiled JSON schema. Keywords checks must all pass, then `format` transforms the value.
+    """
+    __slots__ = ('format', 'default')
+
+    def __init__(self, trafarets, format=None, default=NO_DEFAULT):
+        super(Schema, self).__init__(trafarets)
+        self.format = t.ensure_trafaret(format) if format is not None else None
+        self.default = default
+
+    def walk(self, value, run):
+        mark = len(run.filled)
+        errors = []
+        for trafaret in self.trafarets:
+            res = yield trafaret, value, False
+            if isinstance(res, t.DataError):
+                errors.append(res)
+        if errors:
+            # defaults filled by `properties` are taken back when `required` or other keyword fails
+            if len(run.filled) > mark:
+                run.rollback(mark)
+            raise t.DataError(errors)
+        if self.format is None:
+            return value
+        if run.budget is not None:
+            run.check_string(value)  # formats are parsed by regexes
+        res = yield self.format, value, False
+        if isinstance(res, t.DataError):
+            raise res
+        return value if run.validate_only else res
+
+    def validate(self, value, context=None, max_depth=None, validate_only=False, fill_defaults=False, parallel=None,
+                 budget=None):
+        return validate(
+            self,
+            value,
+            context=context,
+            max_depth=max_depth,
+            validate_only=validate_only,
+            fill_defaults=fill_defaults,
+            parallel=parallel,
+            budget=budget,
+        )
+
+    def validate_bytes(self, buf, context=None, max_depth=None, validate_only=False, fill_defaults=False,
+                       parallel=None, budget=None):
+        """
+        Parses JSON document and validates it. Parsing stops on the first violation it can see without
+        the rest of the document, see `stream.parse`.
+        """
+        from .stream import parse
+        value = parse(buf, self, max_depth=max_depth)
+        return self.validate(
+            value,
+            context=context,
+            max_depth=max_depth,
+            validate_only=validate_only,
+            fill_defaults=fill_defaults,
+            parallel=parallel,
+            budget=budget,
+        )
+
+    def project(self, pointers):
+        """Derives schema that validates only values at given JSON pointers, see `projection.project`"""
+        from .projection import project
+        return project(self, pointers)
+
+    def validate_columns(self, columns, context=None):
+        """
+        Validates flat records given as `{property: column}`, returns row validity mask and errors table,
+        see `columnar.validate_columns`.
+        """
+        from .columnar import validate_columns
+        return validate_columns(self, columns, context=context)
+
+    def __repr__(self):
+        return '<Schema trafarets=[%s]>' % ', '.join(repr(r) for r in self.trafarets)
+
+
+class Nothing(t.Trafaret):
+    """`false` schema"""
+    __slots__ = ()
+
+    def check_and_return(self, value):
+        self._failure('value is not allowed', value=value)
+
+    def __repr__(self):
+        return '<Nothing>'
+
+
+class Enum(t.Trafaret):
+    __slots__ = ('values', 'hashable')
+
+    def __init__(self, values):
+        self.values = tuple(values)
+        hashable = []
+        for value in self.values:
+            try:
+                hash(value)
+            except TypeError:
+                continue
+            hashable.append(value)
+        self.hashable = frozenset(hashable)
+
+    def check_and_return(self, value):
+        try:
+            if value in self.hashable:
+                return value
+        except TypeError:
+            pass
+        for const in self.values:
+            if const == value:
+                return value
+        self._failure('value is not one of %r' % (self.values,), value=value)
+
+    def __repr__(self):
+        return '<Enum(%r)>' % (self.values,)
+
+
+class StringLength(t.Trafaret):
+    __slots__ = ('min_length', 'max_length')
+
+    def __init__(self, min_length=None, max_length=None):
+        self.min_length = min_length
+        self.max_length = max_length
+
+    def check_and_return(self, value):
+        if not isinstance(value, str):
+            self._failure('value is not a string', value=value)
+        if len(value) == 0:
+            self._failure('blank value is not allowed', value=value)
+        if self.min_length is not None and len(value) < self.min_length:
+            self._failure('String is shorter than %s characters' % self.min_length, value=value)
+        if self.max_length is not None and len(value) > self.max_length:
+            self._failure('String is longer than %s characters' % self.max_length, value=value)
+        return value
+
+
+class ArrayLength(t.Trafaret):
+    __slots__ = ('min_length', 'max_length')
+
+    def __init__(self, min_length=None, max_length=None):
+        self.min_length = min_length
+        self.max_length = max_length
+
+    def check_and_return(self, value):
+        if not isinstance(value, list):
+            self._failure('value is not a list', value=value)
+        if self.min_length is not None and len(value) < self.min_length:
+            self._failure('list length is less than %s' % self.min_length, value=value)
+        if self.max_length is not None and len(value) > self.max_length:
+            self._failure('list length is greater than %s' % self.max_length, value=value)
+        return value
+
+
+def unique_key(value):
+    """
+    Hashable key of JSON value, equal for equal values: objects and arrays become frozensets and tuples,
+    `1` and `1.0` keep one key and booleans get keys of their own, as `true` is not `1` in JSON.
+    """
+    typ = type(value)
+    if typ is dict:
+        return ('object', frozenset((name, unique_key(item)) for name, item in value.items()))
+    if typ is list or typ is tuple:
+        return ('array', tuple(unique_key(item) for item in value))
+    if typ is bool:
+        return ('bool', value)
+    return value
+
+
+class UniqueItems(t.Trafaret):
+    __slots__ = ()
+
+    def check_and_return(self, value):
+        if not isinstance(value, list):
+            self._failure('value is not a list', value=value)
+        try:
+            # set takes `True` for `1`, so only its "unique" is final
+            uniq = len(set(value)) == len(value) or len(set(map(unique_key, value))) == len(value)
+        except TypeError:  # unhashable items
+            uniq = len(set(map(unique_key, value))) == len(value)
+        if not uniq:
+            self._failure('Array elements are not uniq', value=value)
+        return value
+
+
+class ObjectSize(t.Trafaret):
+    __slots__ = ('min_props', 'max_props')
+
+    def __init__(self, min_props=None, max_props=None):
+        self.min_props = min_props
+        self.max_props = max_props
+
+    def check_and_return(self, value):
+        if not isinstance(value, dict):
+            self._failure('value is not dict', value=value)
+        if self.max_props is not None and len(value) > self.max_props:
+            self._failure('Too many properties', value=value)
+        if self.min_props is not None and len(value) < self.min_props:
+            self._failure('Too few properties', value=value)
+        return value
+
+
+class Required(t.Trafaret):
+    __slots__ = ('names',)
+
+    def __init__(self, names):
+        self.names = tuple(names)
+
+    def check_and_return(self, value):
+        if not isinstance(value, dict):
+            self._failure('value is not dict', value=value)
+        errors = {}
+        for name in self.names:
+            if name not in value:
+                errors[name] = t.DataError('%s is required' % name)
+        if errors:
+            raise t.DataError(errors)
+        return value
+
+
+class Contains(Node):
+    __slots__ = ('trafaret',)
+
+    def __init__(self, trafaret):
+        self.trafaret = trafaret
+
+    def walk(self, data, run):
+        if run.split(data):
+            if run.parallel.contains(self.trafaret, data, run):
+                return data
+            raise t.DataError('Array does not contains any value that completes test')
+        for v in data:
+            mark = len(run.filled)
+            res = yield self.trafaret, v, True
+            if not isinstance(res, t.DataError):
+                return data
+            if len(run.filled) > mark:
+                run.rollback(mark)
+        raise t.DataError('Array does not contains any value that completes test')
+
+
+class PropertyNames(Node):
+    __slots__ = ('trafaret',)
+
+    def __init__(self, trafaret):
+        self.trafaret = trafaret
+
+    def walk(self, data, run):
+        names = None if run.validate_only else []
+        errors = {}
+        for index, name in enumerate(data.keys()):
+            res = yield self.trafaret, name, True
+            if isinstance(res, t.DataError):
+                errors[index] = res
+            elif names is not None:
+                names.append(res)
+        if errors:
+            raise t.DataError(errors)
+        return data if names is None else names
+
+
+class Items(Node):
+    __slots__ = ('items', 'additional')
+
+    def __init__(self, items, additional=None):
+        self.items = tuple(items)
+        self.additional = additional
+
+    def walk(self, data, run):
+        errors = {}
+        values = None if run.validate_only else []
+        for index, schema in enumerate(self.items):
+            try:
+                item = data[index]
+            except IndexError:
+                errors[index] = t.DataError('value with this index is required')
+                continue
+            res = yield schema, item, True
+            if isinstance(res, t.DataError):
+                errors[index] = res
+            elif values is not None:
+                values.append(res)
+        if len(self.items) < len(data):
+            if self.additional and run.split(data):
+                try:
+                    res = run.parallel.validate_items(self.additional, data, len(self.items), run)
+                except BudgetExceeded:
+                    raise
+                except t.DataError as error:
+                    if not isinstance(error.error, dict):  # the array as a whole failed, like `max_depth`
+                        raise
+                    errors.update(error.error)
+                else:
+                    if values is not None:
+                        values.extend(res)
+            elif self.additional:
+                for index in range(len(self.items), len(data)):
+                    res = yield self.additional, data[index], True
+                    if isinstance(res, t.DataError):
+                        errors[index] = res
+                    elif values is not None:
+                        values.append(res)
+            else:
+                raise t.DataError('Too many items in array')
+        if errors:
+            raise t.DataError(errors)
+        return data if values is None else values
+
+
+class Properties(Node):
+    """
+    `properties`, `patternProperties`, `additionalProperties` and `dependencies` of an object.
+    `properties` and `dependencies` are tuples of `(name, trafaret)`, `patterns` of `(matcher, trafaret)`.
+    `defaults` maps names of properties with `default` to default values.
+    """
+    __slots__ = ('properties', 'patterns', 'additional', 'dependencies', 'defaults')
+
+    def __init__(self, properties=(), patterns=(), additional=None, dependencies=()):
+        self.properties = tuple(properties)
+        self.patterns = tuple(patterns)
+        self.additional = additional
+        self.dependencies = tuple((name, t.ensure_trafaret(schema)) for name, schema in dependencies)
+        self.defaults = dict(
+            (name, schema.default)
+            for name, schema in self.properties
+            if isinstance(schema, Schema) and schema.default is not NO_DEFAULT
+        )
+
+    def walk(self, data, run):
+        if not isinstance(data, Mapping):
+            raise t.DataError('value is not a dict', value=data)
+        collect = None if run.validate_only else {}
+        errors = {}
+        touched = set()
+        filled = {}
+        for name, trafaret in self.properties:
+            if name in data:
+                value = data[name]
+            elif run.fill_defaults and name in self.defaults:
+                value = self.defaults[name]
+                if isinstance(value, (dict, list)):
+                    value = copy.deepcopy(value)
+                filled[name] = value
+            else:
+                continue
+            touched.add(name)
+            res = yield trafaret, value, True
+            if isinstance(res, t.DataError):
+                errors[name] = res
+            elif collect is not None:
+                collect[name] = res
+        pairs = data.items()
+        if filled:
+            pairs = list(pairs) + list(filled.items())
+        for matcher, trafaret in self.patterns:
+            for name, value in pairs:
+                if run.budget is not None:
+                    run.spend()
+                    run.check_string(name)
+                if not matcher.match(name):
+                    continue
+                touched.add(name)
+                res = yield trafaret, value, True
+                if isinstance(res, t.DataError):
+                    errors[name] = res
+                elif collect is not None:
+                    collect[name] = res
+        for name, value in data.items():
+            if name in touched:
+                continue
+            if self.additional is None:
+                if collect is not None:
+                    collect[name] = value
+                continue
+            res = yield self.additional, value, True
+            if isinstance(res, t.DataError):
+                errors[name] = res
+            elif collect is not None:
+                collect[name] = res
+        if errors:
+            raise t.DataError(errors)
+        # defaults go to the document only when the object is valid, enclosing schema takes them back
+        # if its other keywords fail
+        if filled and isinstance(data, dict):
+            for name, value in filled.items():
+                run.fill(data, name, value)
+        value = data if collect is None else collect
+        for name, schema in self.dependencies:
+            if name not in value:
+                continue
+            res = yield schema, value, False
+            if isinstance(res, t.DataError):
+                if isinstance(res.error, dict):
+                    errors.update(res.as_dict())
+                else:
+                    errors[name] = res
+        if errors:
+            raise t.DataError(errors)
+        return value
+
+
+class Ref(Node):
+    __slots__ = ('reference', 'register')
+
+    def __init__(self, reference, register):
+        self.reference = reference
+        self.register = register
+
+    def resolve(self, run):
+        """
+        Other schemas are looked up in registry as it was on the first such `$ref` of the run, so
+        validation does not see half of a schema reloaded in the middle of it. The snapshot is taken
+        before the lookup, which may poll resolvers and reload schemas.
+        """
+        if self.reference.startswith('#'):
+            return self.register.get_schema(self.reference)
+        schema_id, _, local = self.reference.partition('#')
+        register = self.register.get_register()
+        if run.schemas is None:
+            run.schemas = register.schemas
+        if schema_id in run.schemas:
+            return run.schemas[schema_id].get_schema('#' + local)
+        # inherited or not loaded yet, it is kept for the rest of the run
+        schema = self.register.get_schema(self.reference)
+        run.schemas = dict(run.schemas)
+        run.schemas[schema_id] = register.lookup(schema_id)
+        return schema
+
+    def walk(self, value, run):
+        schema = self.resolve(run)
+        res = yield schema, value, False
+        if isinstance(res, t.DataError):
+            raise res
+        return res
+
+
+# objects that belong to the program or to the register, not to the compiled tree
+NOT_OWNED = (type, types.ModuleType, types.CodeType, types.BuiltinFunctionType, weakref.ref)
+
+
+def deep_sizeof(roots, skip=()):
+    """Returns `(objects count, bytes)` of compiled trees reachable from `roots`, shared objects are counted once"""
+    seen = set()
+    stack = list(roots)
+    count = 0
+    size = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, NOT_OWNED) or isinstance(obj, skip):
+            continue
+        seen.add(id(obj))
+        count += 1
+        size += sys.getsizeof(obj)
+        if isinstance(obj, types.FunctionType):
+            stack.extend(cell.cell_contents for cell in obj.__closure__ or ())
+            stack.extend(obj.__defaults__ or ())
+        elif isinstance(obj, types.MethodType):
+            stack.append(obj.__self__)
+        else:
+            stack.extend(gc.get_referents(obj))
+    return count, size
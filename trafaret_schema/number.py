@@ -0,0 +1,140 @@
+import decimal
+import math
+import operator
+from fractions import Fraction
+
+import trafaret as t
+
+
+# `bool` is not here on purpose, `type(True) in NUMBERS` is false
+NUMBERS = frozenset((int, float, decimal.Decimal))
+
+
+class Number(t.Trafaret):
+    """Strict JSON number, accepts only values that `json.loads` gives and never converts them"""
+    __slots__ = ()
+
+    def check_and_return(self, value):
+        if type(value) not in NUMBERS:
+            self._failure('Not a number', value=value)
+        return value
+
+
+class Integer(t.Trafaret):
+    __slots__ = ()
+
+    def check_and_return(self, value):
+        typ = type(value)
+        if typ is int:
+            return value
+        if typ is float and value.is_integer():
+            return value
+        if typ is decimal.Decimal and value == value.to_integral_value():
+            return value
+        self._failure('value is not int', value=value)
+
+
+class Bound(t.Trafaret):
+    __slots__ = ('limit',)
+    compare = None
+    message = None
+
+    def __init__(self, limit):
+        self.limit = limit
+
+    def check_and_return(self, value):
+        if type(value) not in NUMBERS:
+            self._failure('Not a number', value=value)
+        if not self.compare(value, self.limit):
+            self._failure(self.message % self.limit, value=value)
+        return value
+
+    def __repr__(self):
+        return '<%s(%s)>' % (type(self).__name__, self.limit)
+
+
+class Maximum(Bound):
+    __slots__ = ()
+    compare = staticmethod(operator.le)
+    message = 'value is greater than %s'
+
+
+class ExclusiveMaximum(Bound):
+    __slots__ = ()
+    compare = staticmethod(operator.lt)
+    message = 'value should be less than %s'
+
+
+class Minimum(Bound):
+    __slots__ = ()
+    compare = staticmethod(operator.ge)
+    message = 'value is less than %s'
+
+
+class ExclusiveMinimum(Bound):
+    __slots__ = ()
+    compare = staticmethod(operator.gt)
+    message = 'value should be greater than %s'
+
+
+class MultipleOf(t.Trafaret):
+    """
+    Checks `multipleOf` exactly for decimal multipliers like `0.01`.
+
+    Multiplier and value are taken as fractions of their decimal notation, `repr` for floats,
+    so value is a multiple if `value * denominator` is an integer divisible by `numerator`.
+
+    Floats are checked in integers: `scale` is the power of 10 that makes the multiplier whole, and
+    a float below `limit` that has a decimal notation with so many digits is `n / scale` for `n` next
+    to `round(value * scale)`, floats closer to each other than `1 / scale` can not have two of them.
+    """
+    __slots__ = ('multiplier', 'numerator', 'denominator', 'scale', 'modulus', 'limit', 'coerce')
+
+    def __init__(self, multiplier, coerce=False):
+        fraction = Fraction(repr(multiplier))
+        self.multiplier = multiplier
+        self.numerator = fraction.numerator
+        self.denominator = fraction.denominator
+        scale = 1
+        while scale % self.denominator:  # denominator of a decimal notation divides a power of 10
+            scale *= 10
+        self.scale = scale
+        # `n / scale` is a multiple when `n * denominator / scale` is an integer divisible by `numerator`
+        self.modulus = scale * self.numerator
+        # floats below it are less than `1 / scale` apart, tiny multipliers always go the long way
+        self.limit = 2 ** 52 / scale if scale <= 10 ** 15 else 0.0
+        self.coerce = coerce
+
+    def check_and_return(self, value):
+        number = value
+        typ = type(value)
+        if typ not in NUMBERS:
+            if not self.coerce:
+                self._failure('Not a number', value=value)
+            number = t.Float().check(value)
+            typ = float
+        if typ is int:
+            exact = number * self.denominator % self.numerator == 0
+        elif typ is float and -self.limit < number < self.limit:
+            exact = self.float_is_multiple(number)
+        elif typ is float and not math.isfinite(number) or typ is decimal.Decimal and not number.is_finite():
+            exact = False
+        else:
+            fraction = Fraction(repr(number)) if typ is float else Fraction(number)
+            exact = fraction * self.denominator % self.numerator == 0
+        if not exact:
+            self._failure('%s is not devisible by %s' % (value, self.multiplier), value=value)
+        return value
+
+    def float_is_multiple(self, number):
+        scale = self.scale
+        scaled = round(number * scale)
+        # `number * scale` is rounded, so the integer can be one off
+        for n in (scaled, scaled - 1, scaled + 1):
+            if n / scale == number:
+                return n * self.denominator % self.modulus == 0
+        # decimal notation of the float has more digits than the multiplier
+        return False
+
+    def __repr__(self):
+        return '<MultipleOf(%s)>' % self.multiplier
@@ -0,0 +1,89 @@
+"""
+Adaptive order of `anyOf`, `oneOf` and `type` list branches.
+
+After `adapt(register)` every `Any` node of registered schemas counts successes of its branches and
+tries the most successful ones first. Accepted values, results and errors stay the same, only failed
+branches that are tried before the passing one are saved. Learned orders are kept with `export` and
+given back with `load`, so a restarted process starts warm.
+
+Nodes are named `<schema id><path>@<position>`, where `<path>` is the path of the nearest saved
+schema above the node and `<position>` is the `/` joined chain of child indexes from that schema
+down to the node. Names do not change while schema documents and this library stay the same.
+"""
+import trafaret as t
+
+from .nodes import All, Any, BranchStats, Contains, Items, Not, Properties, PropertyNames, Ref
+
+
+def children(node):
+    """Returns child trafarets of a compiled node in a fixed order, `$ref` targets are not followed"""
+    if isinstance(node, (All, Any)):
+        return node.trafarets
+    if isinstance(node, (Not, Contains, PropertyNames, t.List)):
+        return (node.trafaret,)
+    if isinstance(node, Items):
+        return node.items + ((node.additional,) if node.additional is not None else ())
+    if isinstance(node, Properties):
+        return (
+            tuple(trafaret for _, trafaret in node.properties + node.patterns)
+            + ((node.additional,) if node.additional is not None else ())
+            + tuple(trafaret for _, trafaret in node.dependencies)
+        )
+    if isinstance(node, t.And):
+        return (node.trafaret, node.other)
+    if isinstance(node, t.Or):
+        return node.trafarets
+    return ()
+
+
+def any_nodes(register):
+    """Yields `(name, node)` of `Any` nodes of registered schemas, shared nodes are given once"""
+    seen = set()
+    for schema_id, schema_register in sorted(register.schemas.items()):
+        saved = dict((id(schema), path) for path, schema in schema_register.schemas.items())
+        for path, schema in sorted(schema_register.schemas.items()):
+            # saved schemas below this one are walked on their own turn and named by their path
+            stack = [(child, (index,)) for index, child in reversed(tuple(enumerate(children(schema))))]
+            while stack:
+                node, position = stack.pop()
+                if id(node) in seen or id(node) in saved or isinstance(node, Ref):
+                    continue
+                seen.add(id(node))
+                if isinstance(node, Any):
+                    yield '%s%s@%s' % (schema_id, path, '/'.join(map(str, position))), node
+                stack.extend(
+                    (child, position + (index,)) for index, child in reversed(tuple(enumerate(children(node))))
+                )
+
+
+def adapt(register, every=1024):
+    """Turns on adaptive order, branches are sorted after every `every` successes of a node"""
+    for name, node in any_nodes(register):
+        if node.stats is None:
+            node.stats = BranchStats(len(node.trafarets), every)
+        else:
+            node.stats.every = every
+
+
+def export(register):
+    """Returns `{name: order}` of adapted nodes, it can be saved as JSON"""
+    return dict((name, list(node.stats.order)) for name, node in any_nodes(register) if node.stats is not None)
+
+
+def load(register, orders, every=1024):
+    """Sets orders from `export` and turns on adaptive order, returns names of nodes that are not found"""
+    orders = dict(orders)
+    for name, node in any_nodes(register):
+        order = orders.pop(name, None)
+        if order is not None and sorted(order) != list(range(len(node.trafarets))):
+            # schema was changed, the order is of some other node
+            orders[name] = order
+            order = None
+        node.stats = BranchStats(len(node.trafarets), every, order=order)
+    return sorted(orders)
+
+
+def reset(register):
+    """Turns off adaptive order"""
+    for name, node in any_nodes(register):
+        node.stats = None
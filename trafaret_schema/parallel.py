@@ -0,0 +1,206 @@
+"""
+Parallel validation of huge arrays.
+
+With `validate(..., parallel=Parallel())` arrays longer than `threshold` have their items (`items`,
+`additionalItems`, `contains`) validated in chunks by a pool of workers. Keywords about the array as a whole
+(`maxItems`, `minItems`, `uniqueItems`) are still checked on the whole array, so they see all chunks.
+
+On free-threaded builds workers are threads. Otherwise they are processes forked for the call, they
+inherit compiled schemas, so only items and results cross process boundary and both must be picklable.
+Where fork is not available threads are used.
+"""
+import itertools
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import trafaret as t
+
+from .engine import Budget, BudgetExceeded, Run
+
+
+# trafarets of running parallel validations by key, forked workers find them here
+JOBS = {}
+job_keys = itertools.count()
+jobs_lock = threading.Lock()
+
+
+def free_threaded():
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', None)
+    return is_gil_enabled is not None and not is_gil_enabled()
+
+
+def dump_error(error):
+    """`DataError` as plain nested dicts, lists and strings"""
+    if not isinstance(error, t.DataError):
+        return error
+    if isinstance(error.error, dict):
+        return dict((key, dump_error(nested)) for key, nested in error.error.items())
+    if isinstance(error.error, list):
+        return [dump_error(nested) for nested in error.error]
+    return str(error.error)
+
+
+def load_error(dumped):
+    if isinstance(dumped, dict):
+        return t.DataError(dict((key, load_error(nested)) for key, nested in dumped.items()))
+    if isinstance(dumped, list):
+        return t.DataError([load_error(nested) for nested in dumped])
+    return t.DataError(dumped)
+
+
+def validate_chunk(key, start, chunk, options, return_items):
+    """
+    Returns `(values, errors, items, filled, exceeded)` of a chunk, errors are dumped and keyed by index in
+    whole array, `filled` are changes of filled defaults of thread workers, `exceeded` is the name of exhausted
+    budget limit.
+    """
+    trafaret, context = JOBS[key]
+    run = Run(context=context, **options)
+    values = None if run.validate_only else []
+    errors = {}
+    for index, item in enumerate(chunk, start):
+        try:
+            res = run.validate(trafaret, item)
+        except BudgetExceeded as error:
+            return None, {}, None, None, error.limit
+        except t.DataError as error:
+            errors[index] = dump_error(error)
+            continue
+        if values is not None:
+            values.append(res)
+    if return_items:
+        return values, errors, chunk, None, None
+    return values, errors, None, run.filled, None
+
+
+def contains_chunk(key, chunk, options):
+    """Returns `(found, exceeded)`"""
+    trafaret, context = JOBS[key]
+    run = Run(context=context, **options)
+    for item in chunk:
+        try:
+            run.validate(trafaret, item)
+        except BudgetExceeded as error:
+            return False, error.limit
+        except t.DataError:
+            continue
+        return True, None
+    return False, None
+
+
+class Parallel(object):
+    """
+    Options of parallel validation. `mode` is `'threads'` or `'fork'`, by default threads are used on
+    free-threaded builds and fork elsewhere. `executor` can be given to use own thread pool.
+    """
+    def __init__(self, threshold=100000, chunk_size=None, workers=None, mode=None, executor=None):
+        self.threshold = threshold
+        self.chunk_size = chunk_size
+        self.workers = workers or os.cpu_count() or 1
+        if mode is None:
+            fork = 'fork' in multiprocessing.get_all_start_methods()
+            mode = 'threads' if free_threaded() or not fork else 'fork'
+        self.mode = mode
+        self.executor = executor
+
+    def chunks(self, array, offset=0):
+        """Yields `(start, chunk)` of `array[offset:]`"""
+        size = self.chunk_size or max(1, -(-(len(array) - offset) // (self.workers * 4)))
+        for start in range(offset, len(array), size):
+            yield start, array[start:start + size]
+
+    def pool(self):
+        if self.executor is not None:
+            return self.executor, False
+        if self.mode == 'threads':
+            return ThreadPoolExecutor(self.workers), True
+        return ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('fork')), True
+
+    def map(self, run, trafaret, function, arguments):
+        """Yields results of `function(key, *args)` for every args in order"""
+        # trafaret must be registered before the pool forks its workers
+        with jobs_lock:
+            key = next(job_keys)
+            JOBS[key] = (trafaret, run.context)
+        executor, own = self.pool()
+        futures = []
+        try:
+            futures = [executor.submit(function, key, *args) for args in arguments]
+            for future in futures:
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+            if own:
+                executor.shutdown(wait=True)
+            with jobs_lock:
+                JOBS.pop(key, None)
+
+    def options(self, run, items):
+        max_depth = None if run.max_depth is None else run.max_depth - run.depth - 1
+        if max_depth is not None and max_depth < 0:
+            raise t.DataError('Maximum nesting depth %s is exceeded' % run.max_depth)
+        budget = run.budget
+        if budget is not None:
+            # items count as steps here, so huge arrays hit `max_nodes` before they go to workers
+            run.spend(items)
+            if budget.max_depth is not None and budget.max_depth - run.depth - 1 < 0:
+                raise BudgetExceeded('max_depth', budget.max_depth)
+            budget = Budget(
+                max_nodes=budget.max_nodes,
+                max_depth=None if budget.max_depth is None else budget.max_depth - run.depth - 1,
+                max_string=budget.max_string,
+                max_seconds=None if run.deadline is None else max(0.0, run.deadline - time.monotonic()),
+            )
+        return {
+            'max_depth': max_depth,
+            'validate_only': run.validate_only,
+            'fill_defaults': run.fill_defaults,
+            'budget': budget,
+        }
+
+    def validate_items(self, trafaret, array, offset, run):
+        """
+        Validates items of `array` from `offset`, returns list of values or None in `validate_only` mode,
+        raises `DataError` with errors of all chunks keyed by index in `array`.
+        """
+        options = self.options(run, len(array) - offset)
+        # forked workers fill defaults in their copies, so filled items are sent back
+        return_items = run.fill_defaults and self.mode == 'fork' and self.executor is None
+        chunks = list(self.chunks(array, offset))
+        values = None if run.validate_only else []
+        errors = {}
+        results = self.map(run, trafaret, validate_chunk, [
+            (start, chunk, options, return_items) for start, chunk in chunks
+        ])
+        for (start, chunk), (chunk_values, chunk_errors, chunk_items, filled, exceeded) in zip(chunks, results):
+            if exceeded is not None:
+                results.close()
+                raise BudgetExceeded(exceeded, getattr(run.budget, exceeded))
+            errors.update((index, load_error(error)) for index, error in chunk_errors.items())
+            if values is not None:
+                values.extend(chunk_values)
+            if chunk_items is not None:
+                run.fill(array, slice(start, start + len(chunk_items)), chunk_items)
+            elif filled:
+                # thread workers changed shared items, so the caller can take the changes back
+                run.filled.extend(filled)
+        if errors:
+            raise t.DataError(error=errors)
+        return values
+
+    def contains(self, trafaret, array, run):
+        options = self.options(run, len(array))
+        results = self.map(run, trafaret, contains_chunk, [(chunk, options) for start, chunk in self.chunks(array)])
+        for found, exceeded in results:
+            if exceeded is not None:
+                results.close()
+                raise BudgetExceeded(exceeded, getattr(run.budget, exceeded))
+            if found:
+                results.close()
+                return True
+        return False
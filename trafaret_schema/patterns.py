@@ -0,0 +1,132 @@
+import re
+import threading
+from collections import OrderedDict
+
+import trafaret as t
+
+
+METACHARS = frozenset('.^$*+?{}[]\\|()')
+
+# simple character classes with `str` methods that give exactly the same answer for values without newline
+CLASSES = {
+    '[0-9]': lambda value: value.isascii() and value.isdigit(),
+    '\\d': lambda value: value.isdecimal(),
+    '[a-zA-Z]': lambda value: value.isascii() and value.isalpha(),
+    '[A-Za-z]': lambda value: value.isascii() and value.isalpha(),
+    '[a-z]': lambda value: value.isascii() and value.isalpha() and value.islower(),
+    '[A-Z]': lambda value: value.isascii() and value.isalpha() and value.isupper(),
+    '[a-zA-Z0-9]': lambda value: value.isascii() and value.isalnum(),
+    '[A-Za-z0-9]': lambda value: value.isascii() and value.isalnum(),
+}
+
+
+def is_literal(text):
+    return not any(char in METACHARS for char in text)
+
+
+def fast_check(pattern):
+    """
+    Returns `str` based check with the same result as `re.match(pattern, value)` for values
+    without newlines, or None if pattern is not trivial.
+    """
+    body = pattern[1:] if pattern.startswith('^') else pattern
+    end = body.endswith('$') and not body.endswith('\\$')
+    if end:
+        body = body[:-1]
+    if is_literal(body):
+        if end:
+            return lambda value: value == body
+        return lambda value: value.startswith(body)
+    if body.startswith('.*') and is_literal(body[2:]):
+        suffix = body[2:]
+        if end:
+            return lambda value: value.endswith(suffix)
+        return lambda value: suffix in value
+    if end and body[-1:] in ('+', '*') and body[:-1] in CLASSES:
+        check = CLASSES[body[:-1]]
+        if body[-1] == '+':
+            return check
+        return lambda value: not value or check(value)
+    return None
+
+
+class Matcher(object):
+    __slots__ = ('pattern', 'regexp', 'fast')
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.regexp = re.compile(pattern)
+        self.fast = fast_check(pattern)
+
+    def match(self, value):
+        if self.fast is not None and '\n' not in value:
+            return self.fast(value)
+        return self.regexp.match(value) is not None
+
+
+class PatternPool(object):
+    """
+    Process-wide LRU of compiled patterns, so one regexp is compiled once for all schemas and registers.
+    """
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.matchers = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def matcher(self, pattern):
+        with self.lock:
+            matcher = self.matchers.get(pattern)
+            if matcher is not None:
+                self.matchers.move_to_end(pattern)
+                self.hits += 1
+                return matcher
+        matcher = Matcher(pattern)  # re.error goes to caller
+        with self.lock:
+            self.misses += 1
+            self.matchers[pattern] = matcher
+            while len(self.matchers) > self.maxsize:
+                self.matchers.popitem(last=False)
+                self.evictions += 1
+        return matcher
+
+    def compile(self, pattern):
+        return self.matcher(pattern).regexp
+
+    def stats(self):
+        with self.lock:
+            return {
+                'size': len(self.matchers),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'fast': sum(1 for matcher in self.matchers.values() if matcher.fast is not None),
+            }
+
+    def clear(self):
+        with self.lock:
+            self.matchers.clear()
+            self.hits = self.misses = self.evictions = 0
+
+
+pool = PatternPool()
+
+
+class PatternMatch(t.Trafaret):
+    __slots__ = ('matcher',)
+
+    def __init__(self, pattern):
+        self.matcher = pool.matcher(pattern)
+
+    def check_and_return(self, value):
+        if not isinstance(value, str):
+            self._failure('value is not a string', value=value)
+        if not self.matcher.match(value):
+            self._failure('does not match pattern %s' % self.matcher.pattern, value=value)
+        return value
+
+    def __repr__(self):
+        return '<PatternMatch(%s)>' % self.matcher.pattern
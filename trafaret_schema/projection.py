@@ -0,0 +1,179 @@
+"""
+Validation of selected parts of documents.
+
+`project(schema, ['/customer/id', '/items/*/sku'])` derives a schema that validates only values at these
+JSON pointers. On the way to them it keeps type checks and `required` of the selected names, follows
+`properties`, `items`, `$ref` and `allOf`/`anyOf`/`oneOf`, and visits only the selected keys, so work
+depends on the number of selected values and not on document size. `*` selects every item or property.
+"""
+from collections.abc import Mapping
+
+import trafaret as t
+
+from .nodes import All, Any, Items, Node, Properties, Ref, Required, Schema
+from .stream import type_hint
+
+
+# marks the end of a selected pointer in a trie
+SELECTED = object()
+EVERY = '*'
+
+
+def parse_pointer(pointer):
+    if pointer == '':
+        return []
+    if not pointer.startswith('/'):
+        raise ValueError('JSON pointer must start with `/`: %r' % pointer)
+    return [part.replace('~1', '/').replace('~0', '~') for part in pointer[1:].split('/')]
+
+
+def make_trie(pointers):
+    trie = {}
+    for pointer in pointers:
+        node = trie
+        for part in parse_pointer(pointer):
+            if SELECTED in node:
+                break
+            node = node.setdefault(part, {})
+        else:
+            node.clear()
+            node[SELECTED] = True
+    return trie
+
+
+def merge(*tries):
+    merged = {}
+    for trie in tries:
+        if trie is None:
+            continue
+        if SELECTED in trie:
+            return trie
+        for key, nested in trie.items():
+            merged[key] = merge(merged.get(key), nested)
+    return merged
+
+
+class Pick(Node):
+    """Validates values of selected keys of object or indexes of array, other values are not touched"""
+    __slots__ = ('fields',)
+
+    def __init__(self, fields):
+        self.fields = tuple(fields)
+
+    def walk(self, data, run):
+        errors = {}
+        for name, trafaret in self.fields:
+            if isinstance(data, Mapping):
+                if name not in data:
+                    continue
+                key = name
+            elif isinstance(data, list) and name.isdigit() and int(name) < len(data):
+                key = int(name)
+            else:
+                continue
+            res = yield trafaret, data[key], True
+            if isinstance(res, t.DataError):
+                errors[key] = res
+        if errors:
+            raise t.DataError(errors)
+        return data
+
+
+class Projection(object):
+    """Derives projected nodes, None is a node that has nothing to check on the way to selected values"""
+    def __init__(self):
+        self.projected = {}
+
+    def project(self, node, trie):
+        if SELECTED in trie:
+            return node
+        key = (id(node), id(trie))
+        if key in self.projected:
+            # `$ref` cycle that does not go deeper into document gives None
+            return self.projected[key][1]
+        # trie is kept, so its id is not reused by other trie
+        self.projected[key] = (trie, None)
+        projected = self.project_node(node, trie)
+        self.projected[key] = (trie, projected)
+        return projected
+
+    def subschema(self, node, trie):
+        projected = self.project(node, trie)
+        return Schema(()) if projected is None else projected
+
+    def project_node(self, node, trie):
+        if isinstance(node, Ref):
+            return self.project(node.register.get_schema(node.reference), trie)
+        if isinstance(node, All):  # `Schema` too
+            children = [self.project(child, trie) for child in node.trafarets]
+            children = [child for child in children if child is not None]
+            if not children:
+                return None
+            return Schema(children) if isinstance(node, Schema) else All(children)
+        if isinstance(node, Any):
+            children = [self.project(child, trie) for child in node.trafarets]
+            if any(child is None for child in children):
+                return None
+            return Any(children)
+        if isinstance(node, Required):
+            if EVERY in trie:
+                return node
+            names = [name for name in node.names if name in trie]
+            return Required(names) if names else None
+        if isinstance(node, Properties):
+            return self.project_properties(node, trie)
+        if isinstance(node, Items):
+            return self.project_items(node.items, node.additional, trie)
+        if isinstance(node, t.List):
+            return self.project_items((), node.trafaret, trie)
+        if type_hint(node) is not None:
+            return node
+        return None
+
+    def project_properties(self, node, trie):
+        every = trie.get(EVERY)
+        if every is not None:
+            return Properties(
+                [(name, self.subschema(schema, merge(trie.get(name), every))) for name, schema in node.properties],
+                [(matcher, self.subschema(schema, every)) for matcher, schema in node.patterns],
+                None if node.additional is None else self.subschema(node.additional, every),
+            )
+        fields = []
+        for name, nested in trie.items():
+            schemas = [schema for prop, schema in node.properties if prop == name]
+            schemas.extend(schema for matcher, schema in node.patterns if matcher.match(name))
+            if not schemas and node.additional is not None:
+                schemas.append(node.additional)
+            for schema in schemas:
+                projected = self.project(schema, nested)
+                if projected is not None:
+                    fields.append((name, projected))
+        return Pick(fields) if fields else None
+
+    def project_items(self, items, additional, trie):
+        every = trie.get(EVERY)
+        if every is not None:
+            if not items:
+                return t.List(self.subschema(additional, every))
+            return Items(
+                [self.subschema(schema, merge(trie.get(str(index)), every)) for index, schema in enumerate(items)],
+                None if additional is None else self.subschema(additional, every),
+            )
+        fields = []
+        for name, nested in trie.items():
+            if not name.isdigit():
+                continue
+            index = int(name)
+            schema = items[index] if index < len(items) else additional
+            projected = None if schema is None else self.project(schema, nested)
+            if projected is not None:
+                fields.append((name, projected))
+        return Pick(fields) if fields else None
+
+
+def project(schema, pointers):
+    """Returns compiled schema that validates only values at given JSON pointers"""
+    projected = Projection().project(schema, make_trie(pointers))
+    if projected is None:
+        return Schema(())
+    return projected if isinstance(projected, Schema) else Schema((projected,))
@@ -0,0 +1,84 @@
+import json
+import mmap
+import os
+import os.path as op
+
+import trafaret as t
+
+
+def read_text(path, mmap_threshold):
+    """Big files are decoded straight from mapped pages, without reading them into intermediate bytes"""
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0 or size < mmap_threshold:
+            return f.read().decode('utf-8')
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            view = memoryview(mapped)
+            try:
+                return str(view, 'utf-8')
+            finally:
+                view.release()
+        finally:
+            mapped.close()
+
+
+class DirectoryResolver(object):
+    """
+    Maps schema ids under `base_uri` to files in `directory`, so `http://example.com/schemas/address`
+    is loaded from `directory/address` or `directory/address.json`.
+
+    Resolver is a callable that gets schema id and returns parsed document or None.
+    Parsed documents are cached until file mtime changes. File that is not valid JSON raises `DataError`.
+    """
+    def __init__(self, base_uri, directory, suffixes=('', '.json'), mmap_threshold=64 * 1024):
+        self.base_uri = base_uri
+        self.directory = op.abspath(directory)
+        self.suffixes = suffixes
+        self.mmap_threshold = mmap_threshold
+        self.documents = {}
+        self.loaded = {}
+
+    def path(self, schema_id):
+        if not schema_id.startswith(self.base_uri):
+            return None
+        relative = schema_id[len(self.base_uri):].lstrip('/')
+        path = op.normpath(op.join(self.directory, *relative.split('/')))
+        if not path.startswith(self.directory + os.sep):
+            return None
+        return path
+
+    def __call__(self, schema_id):
+        path = self.path(schema_id)
+        if path is None:
+            return None
+        for suffix in self.suffixes:
+            if op.isfile(path + suffix):
+                return self.load(schema_id, path + suffix)
+        return None
+
+    def load(self, schema_id, path):
+        mtime = os.stat(path).st_mtime
+        cached = self.documents.get(path)
+        if cached is not None and cached[0] == mtime:
+            document = cached[1]
+        else:
+            try:
+                document = json.loads(read_text(path, self.mmap_threshold))
+            except ValueError as error:  # also UnicodeDecodeError
+                raise t.DataError('Schema %s is not valid JSON: %s' % (schema_id, error))
+            self.documents[path] = (mtime, document)
+        self.loaded[schema_id] = (path, mtime)
+        return document
+
+    def changed(self):
+        """Ids of loaded schemas whose files were modified since load"""
+        changed = []
+        for schema_id, (path, mtime) in list(self.loaded.items()):
+            try:
+                current = os.stat(path).st_mtime
+            except OSError:
+                continue
+            if current != mtime:
+                changed.append(schema_id)
+        return changed
@@ -0,0 +1,101 @@
+"""
+Validation of a deterministic sample of records, to watch high volume streams for schema drift.
+"""
+import threading
+import zlib
+from collections import Counter
+
+import trafaret as t
+
+from .utils import error_paths
+
+
+def stable_hash(value):
+    """Same in every process, unlike `hash` of strings"""
+    return zlib.crc32(str(value).encode('utf-8')) & 0xffffffff
+
+
+class SampledValidator(object):
+    """
+    Validates `rate` part of records. Record is picked by hash of its `key` field, so the same
+    record is always picked or always skipped; without `key` every `1 / rate` record is picked.
+    Records with a set of top level keys that was not seen yet and records for which `always(record)`
+    is true are validated anyway. Up to `max_key_sets` key sets are remembered, after that records with
+    new key sets are sampled as the others.
+
+    Failures are counted per error path, `stats()` gives failure rates of validated records.
+    """
+    def __init__(self, schema, rate, key=None, always=None, max_key_sets=1024, context=None):
+        self.schema = schema
+        self.rate = rate
+        self.threshold = int(rate * 0x100000000)
+        self.key = key
+        self.always = always
+        self.max_key_sets = max_key_sets
+        self.context = context
+        self.key_sets = set()
+        self.lock = threading.Lock()
+        self.seen = 0
+        self.validated = 0
+        self.failed = 0
+        self.failures = Counter()
+
+    def picked(self, record, number):
+        if isinstance(record, dict):
+            key_set = frozenset(record)
+            if key_set not in self.key_sets:
+                with self.lock:
+                    remembered = len(self.key_sets) < self.max_key_sets
+                    if remembered:
+                        self.key_sets.add(key_set)
+                # when the limit is reached new key sets are sampled like the others
+                if remembered:
+                    return True
+        if self.always is not None and self.always(record):
+            return True
+        if self.key is not None and isinstance(record, dict) and self.key in record:
+            return stable_hash(record[self.key]) < self.threshold
+        # records without key are picked evenly by their number
+        return int(number * self.rate) != int((number - 1) * self.rate)
+
+    def validate(self, record):
+        """Returns record, raises `DataError` if record was picked and it is not valid"""
+        with self.lock:
+            self.seen += 1
+            number = self.seen
+        if not self.picked(record, number):
+            return record
+        try:
+            self.schema.validate(record, context=self.context, validate_only=True)
+        except t.DataError as error:
+            paths = list(error_paths(error))
+            with self.lock:
+                self.validated += 1
+                self.failed += 1
+                self.failures.update(set(paths))
+            raise
+        with self.lock:
+            self.validated += 1
+        return record
+
+    def __call__(self, record):
+        return self.validate(record)
+
+    def stats(self, top=10):
+        with self.lock:
+            validated = self.validated
+            return {
+                'seen': self.seen,
+                'validated': validated,
+                'failed': self.failed,
+                'failure_rate': float(self.failed) / validated if validated else 0.0,
+                'paths': dict(
+                    (path, float(count) / validated)
+                    for path, count in self.failures.most_common(top)
+                ),
+            }
+
+    def reset(self):
+        with self.lock:
+            self.seen = self.validated = self.failed = 0
+            self.failures.clear()
@@ -0,0 +1,270 @@
+"""
+Parse JSON and check compiled schema constraints while parsing.
+
+Parser builds containers itself and uses `json` scanner only for scalars, so on the first value that
+can not pass the schema it stops and the rest of the document is not even tokenized. Checked on the fly:
+value types from `type`, `maxLength`, `maxItems`, closed objects (`additionalProperties: false`) and
+`max_depth`. Everything else is left to full validation of the parsed value.
+"""
+import json
+import json.decoder
+import json.scanner
+
+import trafaret as t
+
+from .nodes import (
+    Any,
+    ArrayLength,
+    Items,
+    Nothing,
+    Properties,
+    Ref,
+    Schema,
+    StringLength,
+)
+from .number import NUMBERS, Number, Integer
+
+
+WHITESPACE = ' \t\n\r'
+scan_once = json.scanner.make_scanner(json.JSONDecoder())
+scanstring = json.decoder.scanstring
+
+
+def type_hint(trafaret):
+    if isinstance(trafaret, t.Null):
+        return frozenset((type(None),))
+    if isinstance(trafaret, t.Bool):
+        return frozenset((bool,))
+    if isinstance(trafaret, t.Type) and trafaret.type_ in (dict, list):
+        return frozenset((trafaret.type_,))
+    if isinstance(trafaret, t.String):
+        return frozenset((str,))
+    if isinstance(trafaret, (Number, Integer)):
+        return NUMBERS
+    if isinstance(trafaret, Any):
+        hints = [type_hint(branch) for branch in trafaret.trafarets]
+        if None in hints:
+            return None
+        return frozenset().union(*hints)
+    return None
+
+
+class Hints(object):
+    """What can be checked on a value of compiled `Schema` before it is parsed to the end"""
+    __slots__ = ('types', 'max_length', 'max_items', 'properties', 'patterns', 'additional', 'closed', 'items',
+                 'additional_items')
+
+    def __init__(self):
+        self.types = None
+        self.max_length = None
+        self.max_items = None
+        self.properties = {}
+        self.patterns = ()
+        self.additional = None
+        self.closed = False
+        self.items = ()
+        self.additional_items = None
+
+    def update(self, trafaret):
+        types = type_hint(trafaret)
+        if types is not None:
+            self.types = types if self.types is None else self.types & types
+        elif isinstance(trafaret, StringLength) and trafaret.max_length is not None:
+            self.max_length = min(self.max_length or trafaret.max_length, trafaret.max_length)
+        elif isinstance(trafaret, ArrayLength) and trafaret.max_length is not None:
+            self.max_items = min(self.max_items or trafaret.max_length, trafaret.max_length)
+        elif isinstance(trafaret, Properties):
+            self.properties = dict(trafaret.properties)
+            self.patterns = trafaret.patterns
+            self.additional = trafaret.additional
+            self.closed = is_false(trafaret.additional)
+        elif isinstance(trafaret, Items):
+            self.items = trafaret.items
+            self.additional_items = trafaret.additional
+        elif isinstance(trafaret, t.List):
+            self.additional_items = trafaret.trafaret
+
+    def allows(self, value):
+        return self.types is None or type(value) in self.types
+
+    def property(self, name):
+        """Returns subschema for property or False if property is not allowed"""
+        schema = self.properties.get(name)
+        if schema is not None:
+            return schema
+        for matcher, schema in self.patterns:
+            if matcher.match(name):
+                return schema
+        if self.closed:
+            return False
+        return self.additional
+
+    def item(self, index):
+        if index < len(self.items):
+            return self.items[index]
+        return self.additional_items
+
+
+NO_HINTS = Hints()
+
+
+def is_false(schema):
+    return isinstance(schema, Schema) and any(isinstance(trafaret, Nothing) for trafaret in schema.trafarets)
+
+
+class HintsCache(object):
+    def __init__(self):
+        self.hints = {}
+
+    def get(self, schema):
+        if schema is None:
+            return NO_HINTS
+        cached = self.hints.get(id(schema))
+        if cached is not None:
+            return cached[1]
+        hints = Hints()
+        seen = set()
+        nodes = [schema]
+        while nodes:
+            node = nodes.pop()
+            if id(node) in seen:
+                continue
+            seen.add(id(node))
+            if isinstance(node, Ref):
+                try:
+                    nodes.append(node.register.get_schema(node.reference))
+                except t.DataError:
+                    pass
+            elif isinstance(node, Schema):
+                nodes.extend(node.trafarets)
+            else:
+                hints.update(node)
+        self.hints[id(schema)] = (schema, hints)
+        return hints
+
+
+class Frame(object):
+    __slots__ = ('container', 'hints', 'key')
+
+    def __init__(self, container, hints, key):
+        self.container = container
+        self.hints = hints
+        self.key = key
+
+
+def decode(buf):
+    if isinstance(buf, str):
+        return buf
+    # decodes straight from the buffer of bytes, bytearray, memoryview or mmap
+    return str(buf, 'utf-8')
+
+
+def fail(stack, error):
+    path = [frame.key for frame in stack]
+    error = t.DataError(error)
+    for key in reversed(path):
+        error = t.DataError({key: error})
+    raise error
+
+
+def skip(text, pos):
+    while pos < len(text) and text[pos] in WHITESPACE:
+        pos += 1
+    return pos
+
+
+def parse(buf, schema, max_depth=None):
+    text = decode(buf)
+    cache = HintsCache()
+    stack = []
+    hints = cache.get(schema)
+    pos = skip(text, 0)
+    while True:
+        # here we need a value at `pos` that satisfies `hints`
+        if max_depth is not None and len(stack) > max_depth:
+            raise t.DataError('Maximum nesting depth %s is exceeded' % max_depth)
+        char = text[pos:pos + 1]
+        if char == '{' or char == '[':
+            container = {} if char == '{' else []
+            if not hints.allows(container):
+                fail(stack, 'value type %s is not allowed' % type(container).__name__)
+            pos = skip(text, pos + 1)
+            if text[pos:pos + 1] == ('}' if char == '{' else ']'):
+                value = container
+                pos += 1
+            else:
+                frame = Frame(container, hints, None)
+                if char == '{':
+                    pos, hints = read_key(text, pos, stack, frame, cache)
+                else:
+                    frame.key = 0
+                    stack.append(frame)
+                    if hints.max_items is not None and hints.max_items < 1:
+                        fail(stack[:-1], 'list length is greater than %s' % hints.max_items)
+                    hints = cache.get(hints.item(0))
+                continue
+        else:
+            try:
+                value, pos = scan_once(text, pos)
+            except StopIteration as stop:
+                raise t.DataError('Invalid JSON, expecting value at position %s' % stop.value)
+            except ValueError as error:
+                raise t.DataError('Invalid JSON, %s' % error)
+            if not hints.allows(value):
+                fail(stack, 'value type %s is not allowed' % type(value).__name__)
+            if hints.max_length is not None and type(value) is str and len(value) > hints.max_length:
+                fail(stack, 'String is longer than %s characters' % hints.max_length)
+
+        # value is complete, put it into containers and close them while we can
+        while True:
+            if not stack:
+                pos = skip(text, pos)
+                if pos != len(text):
+                    raise t.DataError('Invalid JSON, extra data at position %s' % pos)
+                return value
+            frame = stack[-1]
+            container = frame.container
+            if type(container) is dict:
+                container[frame.key] = value
+                closing = '}'
+            else:
+                container.append(value)
+                closing = ']'
+            pos = skip(text, pos)
+            char = text[pos:pos + 1]
+            if char == ',':
+                pos = skip(text, pos + 1)
+                stack.pop()
+                if closing == '}':
+                    pos, hints = read_key(text, pos, stack, frame, cache)
+                else:
+                    frame.key += 1
+                    stack.append(frame)
+                    if frame.hints.max_items is not None and frame.key >= frame.hints.max_items:
+                        fail(stack[:-1], 'list length is greater than %s' % frame.hints.max_items)
+                    hints = cache.get(frame.hints.item(frame.key))
+                break
+            if char != closing:
+                raise t.DataError('Invalid JSON, expecting `,` or `%s` at position %s' % (closing, pos))
+            pos += 1
+            stack.pop()
+            value = container
+
+
+def read_key(text, pos, stack, frame, cache):
+    """Reads `"key":` of object `frame`, pushes frame and returns position and hints of the value"""
+    if text[pos:pos + 1] != '"':
+        raise t.DataError('Invalid JSON, expecting property name at position %s' % pos)
+    try:
+        key, pos = scanstring(text, pos + 1)
+    except ValueError as error:
+        raise t.DataError('Invalid JSON, %s' % error)
+    pos = skip(text, pos)
+    if text[pos:pos + 1] != ':':
+        raise t.DataError('Invalid JSON, expecting `:` at position %s' % pos)
+    frame.key = key
+    stack.append(frame)
+    schema = frame.hints.property(key)
+    if schema is False:
+        fail(stack, '%s is not allowed key' % key)
+    return skip(text, pos + 1), cache.get(schema)
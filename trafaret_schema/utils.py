@@ -1,7 +1,9 @@
 import re
-import sre_constants
 import trafaret as t
 
+from .nodes import All, Any, Not  # noqa: F401
+from .patterns import pool
+
 
 def then(trafaret_creator):
     """
@@ -19,59 +21,12 @@ def just(trafaret):
     return create
 
 
-class All(t.Trafaret):
-    def __init__(self, trafarets):
-        self.trafarets = [t.ensure_trafaret(trafaret) for trafaret in trafarets]
-
-    def transform(self, value, context=None):
-        errors = []
-        for trafaret in self.trafarets:
-            res = t.catch_error(trafaret, value, context=context)
-            if isinstance(res, t.DataError):
-                errors.append(res)
-        if errors:
-            raise t.DataError(errors)
-        return value
-
-    def __repr__(self):
-        return '<All trafarets=[%s]>' % ', '.join(repr(r) for r in self.trafarets)
-
-
-class Any(t.Trafaret):
-    def __init__(self, trafarets):
-        self.trafarets = [t.ensure_trafaret(trafaret) for trafaret in trafarets]
-
-    def transform(self, value, context=None):
-        errors = []
-        for trafaret in self.trafarets:
-            res = t.catch_error(trafaret, value, context=context)
-            if isinstance(res, t.DataError):
-                errors.append(res)
-            else:
-                return value
-        raise t.DataError(errors)
-
-    def __repr__(self):
-        return '<Any trafarets=[%s]>' % ', '.join(repr(r) for r in self.trafarets)
-
-
-class Not(t.Trafaret):
-    def __init__(self, trafaret):
-        self.trafaret = trafaret
-
-    def transform(self, value, context=None):
-        res = t.catch_error(self.trafaret, value, context=context)
-        if not isinstance(res, t.DataError):
-            raise t.DataError('Value must not be validated')
-        return value
-
-
 class Pattern(t.Trafaret):
     def check_and_return(self, value):
         try:
-            re.compile(value)
+            pool.compile(value)
             return value
-        except sre_constants.error as e:
+        except re.error as e:
             raise t.DataError('Pattern is invalid due ' + str(e))
 
 
@@ -86,3 +41,19 @@ unique_strings_list = t.List(t.String) >> all_strings_unique
 
 def ensure_list(typ):
     return t.List(typ) | typ & (lambda x: [x])
+
+
+def error_paths(error, path=''):
+    """Yields `/` separated paths of leaf errors"""
+    if not isinstance(error, t.DataError):  # `as_dict` leftovers
+        yield path
+    elif isinstance(error.error, dict):
+        for key, nested in error.error.items():
+            for leaf in error_paths(nested, '%s/%s' % (path, key) if path else str(key)):
+                yield leaf
+    elif isinstance(error.error, list):
+        for nested in error.error:
+            for leaf in error_paths(nested, path):
+                yield leaf
+    else:
+        yield path